@@ -0,0 +1,310 @@
+"""Benchmarks for the calendar hot paths.
+
+Builds synthetic events files (1k to 1M entries) and times loading and
+saving the store, the monthly view, the reminder check, single adds and
+removes and, against ``mock_ollama.MockOllama``, assistant round trips.
+Everything runs in a scratch directory, so the real events file and
+response cache are never touched.
+
+Results are written as JSON.  With ``--baseline`` every median is compared
+with the stored run and the exit status is 1 when one got slower than the
+tolerance allows, so a regression can fail a build.
+
+    python benchmark.py --sizes 1000,10000,100000 --output results.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from mock_ollama import MockOllama
+
+default_sizes = "1000,10000,100000"
+titles = [
+    "Standup", "Dentist", "Lunch with Sam", "Gym", "Project review", "Call mom", "Team sync",
+    "Piano lesson", "Flight to Berlin", "Book club", "Haircut", "1:1 with manager", "Yoga",
+    "Pay rent", "Car service", "Parents evening", "Budget meeting", "Date night",
+]
+
+
+# --- Synthetic data ---
+def synthetic_snapshot(size, seed=0, today=None):
+    """An ``events.json`` snapshot with ``size`` entries around ``today``.
+
+    Events spread over two years back and one ahead, a quarter of them
+    all-day; about 1% (at most 200) are recurring series.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    first = today - timedelta(days=730)
+    span = 1095
+    series = min(size // 100, 200)
+    snapshot = {}
+    for i in range(size):
+        key = (first + timedelta(days=rng.randrange(span))).isoformat()
+        title = f"{rng.choice(titles)} #{i}"
+        if i < series:
+            hour = rng.randrange(7, 20)
+            record = {
+                "title": title,
+                "start": f"{hour:02d}:00",
+                "end": f"{hour + 1:02d}:00",
+                "rrule": rng.choice(["FREQ=WEEKLY", "FREQ=DAILY;INTERVAL=2", "FREQ=MONTHLY", "FREQ=WEEKLY;BYDAY=MO,WE"]),
+            }
+        elif rng.random() < 0.25:
+            record = title
+        else:
+            record = f"{rng.randrange(6, 22):02d}:{rng.choice(['00', '15', '30', '45'])} {title}"
+        snapshot.setdefault(key, []).append(record)
+    return snapshot
+
+
+def write_snapshot(path, snapshot):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=4)
+
+
+# --- Timing ---
+def measure(fn, repeat, setup=None, per=1):
+    """Time ``fn`` ``repeat`` times; ``per`` divides each run into operations."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000 / per)
+    return _stats(times)
+
+
+def _stats(times):
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "runs": len(times)}
+
+
+def bench_store(results, backend, size, path, args):
+    # Project modules are imported here, after OLLAMA_HOST points at the mock.
+    from calendar_engine import CalendarEngine
+    from event_model import Event
+    from event_store import open_store
+    from reminders import ReminderScheduler
+
+    prefix = f"{backend}/{size}"
+
+    def load():
+        open_store(path).close()
+
+    results[f"{prefix}/load"] = measure(load, args.repeat)
+
+    engine = CalendarEngine(store=open_store(path))
+    store = engine.store
+    try:
+        engine.reminders  # subscribed like in the windows, so writes pay for it
+        today = date.today()
+
+        def touch():
+            store.add(today.isoformat(), Event("Benchmark save marker"))
+
+        results[f"{prefix}/save"] = measure(store.compact, args.repeat, setup=touch)
+        results[f"{prefix}/month_query"] = measure(lambda: engine.month(today.year, today.month), args.repeat)
+        results[f"{prefix}/month_view"] = measure(lambda: engine.month_lines(today.year, today.month), args.repeat)
+
+        delivered = os.path.abspath(f"reminders-{backend}-{size}.json")
+
+        def build_reminders():
+            ReminderScheduler(store, path=delivered).close()
+
+        results[f"{prefix}/reminders_build"] = measure(build_reminders, args.repeat)
+
+        def check_reminders():
+            # One pass of the window's reminder timer.
+            engine.reminders.pop_due()
+            engine.reminders.seconds_until_next()
+
+        results[f"{prefix}/reminders_check"] = measure(check_reminders, args.repeat * 10)
+
+        key = (today + timedelta(days=1)).isoformat()
+        added = [Event.from_text(f"{9 + i % 8:02d}:00 Benchmark event {i}") for i in range(args.ops)]
+
+        def add():
+            for event in added:
+                store.add(key, event)
+
+        def remove():
+            for event in added:
+                store.remove(key, event)
+
+        results[f"{prefix}/add"] = measure(add, args.repeat, setup=remove, per=args.ops)
+        results[f"{prefix}/remove"] = measure(remove, args.repeat, setup=add, per=args.ops)
+        remove()
+
+        if args.chat_rounds:
+            bench_chat(results, prefix, engine, args)
+    finally:
+        engine.close()
+
+
+def bench_chat(results, prefix, engine, args):
+    def ask(question):
+        # A fresh conversation each round, so every prompt has the same shape.
+        engine.context.conversation.clear()
+        started = time.perf_counter()
+        first = None
+        for _ in engine.ask(question):
+            if first is None:
+                first = time.perf_counter()
+        return (first - started) * 1000, (time.perf_counter() - started) * 1000
+
+    # The first question also builds the retrieval index.
+    results[f"{prefix}/chat_cold"] = _stats([ask("What is on my calendar this week?")[1]])
+    rounds = [ask(f"Do I have a dentist appointment soon? ({prefix} #{i})") for i in range(args.chat_rounds)]
+    results[f"{prefix}/chat_first_token"] = _stats([first for first, _ in rounds])
+    results[f"{prefix}/chat_total"] = _stats([total for _, total in rounds])
+    cached = [ask(f"Do I have a dentist appointment soon? ({prefix} #0)")[1] for _ in range(args.chat_rounds)]
+    results[f"{prefix}/chat_cached"] = _stats(cached)
+
+
+def run(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backends = args.backends.split(",")
+    workdir = tempfile.mkdtemp(prefix="orion-bench-", dir=args.workdir)
+    cwd = os.getcwd()
+    mock = MockOllama(first_token_ms=args.first_token_ms, token_ms=args.token_ms, tokens=args.tokens).start()
+    os.environ["OLLAMA_HOST"] = mock.host
+    results = {}
+    try:
+        # The response cache and delivered reminders live in the working
+        # directory.
+        os.chdir(workdir)
+        from event_store import migrate, open_store
+
+        for size in sizes:
+            json_path = os.path.join(workdir, f"events-{size}.json")
+            write_snapshot(json_path, synthetic_snapshot(size, args.seed))
+            for backend in backends:
+                if backend == "json":
+                    path = json_path
+                else:
+                    path = os.path.join(workdir, f"events-{size}.db")
+                    source, target = open_store(json_path), open_store(path)
+                    migrate(source, target)
+                    source.close()
+                    target.close()
+                print(f"{backend:>6} {size:>8,} events ...", file=sys.stderr, flush=True)
+                bench_store(results, backend, size, path, args)
+    finally:
+        os.chdir(cwd)
+        mock.stop()
+        if args.keep:
+            print(f"Benchmark files kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "sizes": sizes,
+            "backends": backends,
+            "repeat": args.repeat,
+            "ops": args.ops,
+            "seed": args.seed,
+            "chat_rounds": args.chat_rounds,
+            "first_token_ms": args.first_token_ms,
+            "token_ms": args.token_ms,
+            "tokens": args.tokens,
+        },
+        "results": results,
+    }
+
+
+# --- Baseline comparison ---
+def compare(results, baseline, tolerance=0.25, min_delta_ms=0.5):
+    """Compare medians with ``baseline``; returns ``{name: comparison}``.
+
+    A path regressed when it is slower by more than ``tolerance`` (a
+    fraction) and by more than ``min_delta_ms``, so timer noise on sub-
+    millisecond paths is not reported.
+    """
+    comparison = {}
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            comparison[name] = {"status": "new", "median_ms": current["median_ms"]}
+            continue
+        old, new = before["median_ms"], current["median_ms"]
+        change = (new - old) / old if old else 0.0
+        if change > tolerance and new - old > min_delta_ms:
+            status = "regression"
+        elif change < -tolerance and old - new > min_delta_ms:
+            status = "improved"
+        else:
+            status = "ok"
+        comparison[name] = {"status": status, "baseline_ms": old, "median_ms": new, "change": change}
+    return comparison
+
+
+def report(results, comparison=None):
+    for name, stats in results.items():
+        line = f"{name:<34} {stats['median_ms']:>10.3f} ms"
+        entry = (comparison or {}).get(name)
+        if entry and "baseline_ms" in entry:
+            line += f"  {entry['change']:>+7.1%} vs {entry['baseline_ms']:.3f} ms  {entry['status']}"
+        elif entry:
+            line += "  new"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the calendar hot paths.")
+    parser.add_argument("--sizes", default=default_sizes, help=f"comma-separated event counts (default: {default_sizes})")
+    parser.add_argument("--backends", default="json,sqlite", help="comma-separated stores: json, sqlite")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (default: 5)")
+    parser.add_argument("--ops", type=int, default=100, help="events per add/remove run (default: 100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chat-rounds", type=int, default=10, help="assistant questions per store, 0 to skip")
+    parser.add_argument("--first-token-ms", type=float, default=50, help="mock Ollama delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=5, help="mock Ollama delay between tokens")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens per mock reply")
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="compare with this earlier results file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also store the results as a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction (default: 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--workdir", help="directory for the scratch files (default: the system temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated events files")
+    args = parser.parse_args()
+
+    data = run(args)
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            comparison = compare(data["results"], json.load(f)["results"], args.tolerance, args.min_delta_ms)
+        data["baseline"] = args.baseline
+        data["comparison"] = comparison
+    report(data["results"], comparison)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, path)
+
+    regressions = [name for name, entry in (comparison or {}).items() if entry["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
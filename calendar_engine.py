@@ -0,0 +1,267 @@
+"""Headless calendar core.
+
+``CalendarEngine`` owns what the windows share: the event store,
+natural-language entry, queries, search, reminders and the assistant with
+its retrieval context and response cache.  Nothing here imports Qt, so
+scripts, batch jobs and benchmarks run the same code as the GUIs without a
+``QApplication``; the GUI scripts only connect widgets to it.
+
+    python calendar_engine.py add "dentist next Tuesday 3pm for an hour"
+    python calendar_engine.py list --month 2026-11
+    python calendar_engine.py search dentist
+    python calendar_engine.py import old-events.db
+    python calendar_engine.py export backup.ics
+    python calendar_engine.py ask "what do I have tomorrow?"
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+import metrics
+from event_index import DayCounts
+from event_model import Event, as_event
+from event_parser import parse, parse_event, summary
+from event_store import event_file, migrate, open_store
+from ics import export_ics, import_ics
+from llm_dispatcher import chat_model, get_dispatcher
+from ollama_client import OllamaError
+from reminders import ReminderScheduler
+from response_cache import get_response_cache
+from retrieval import AssistantContext
+
+
+class CalendarError(Exception):
+    pass
+
+
+def day_line(date, events):
+    """One day of the month view: ``2026-11-03: 09:00 dentist, gym``."""
+    return f"{date}: {', '.join(map(str, events))}"
+
+
+class CalendarEngine:
+    def __init__(self, path=event_file, store=None):
+        self.store = store or open_store(path)
+        # Subscribed before any write, so answers cached by an earlier
+        # session never outlive a change made here.
+        self.response_cache = get_response_cache()
+        self.store.subscribe(self.response_cache.invalidate)
+        self.context = AssistantContext(self.store)
+        self._reminders = None
+        self._day_counts = None
+
+    @property
+    def reminders(self):
+        # Only the windows need reminders; scripts never pay for the schedule.
+        if self._reminders is None:
+            self._reminders = ReminderScheduler(self.store)
+        return self._reminders
+
+    @property
+    def day_counts(self):
+        if self._day_counts is None:
+            self._day_counts = DayCounts(self.store)
+        return self._day_counts
+
+    # --- Events ---
+    def parse(self, text, llm=True):
+        """A ``ParsedEvent`` for ``text``; ``llm=False`` stays with the local rules."""
+        return parse_event(text) if llm else parse(text)
+
+    def add(self, event, date=None, llm=True):
+        """File ``event`` under the date its text names, else under ``date``.
+
+        ``event`` is free text or an ``Event``; returns ``(date, event)``.
+        """
+        if not isinstance(event, Event):
+            parsed = self.parse(event, llm)
+            if parsed is not None:
+                event, date = parsed.event, parsed.date or date
+            else:
+                event = as_event(event)
+        if not date:
+            raise CalendarError(f"no date for {event}")
+        self.store.add(date, event)
+        return date, event
+
+    def remove(self, date, event):
+        """Remove ``event`` on ``date``; for a series just that occurrence."""
+        return self.store.remove(date, event)
+
+    def remove_series(self, date, event):
+        return self.store.remove_series(date, event)
+
+    def clear(self):
+        self.store.clear()
+
+    # --- Queries ---
+    def events(self, date):
+        return self.store.get(date)
+
+    def between(self, start, end):
+        return self.store.between(start, end)
+
+    def month(self, year, month):
+        return self.store.month(year, month)
+
+    def month_lines(self, year, month):
+        with metrics.span("calendar.month_view"):
+            return [day_line(date, events) for date, events in self.store.month(year, month)]
+
+    def search(self, query, limit=50):
+        """Stored events matching every keyword of ``query``, by date."""
+        return self.context.retriever.search(query, limit)
+
+    # --- Import and export ---
+    def import_events(self, path, stats=None):
+        """Number of events imported; ``stats`` collects the .ics import stats."""
+        if path.lower().endswith(".ics"):
+            return import_ics(path, self.store, stats=stats)["events"]
+        source = open_store(path)
+        try:
+            return migrate(source, self.store)
+        finally:
+            source.close()
+
+    def export_events(self, path):
+        if path.lower().endswith(".ics"):
+            return export_ics(self.store, path)["events"]
+        target = open_store(path)
+        try:
+            return migrate(self.store, target)
+        finally:
+            target.close()
+
+    # --- Assistant ---
+    def ask(self, question, model=None, cancelled=None, on_stream=None):
+        """Stream an answer to ``question`` with the relevant calendar events.
+
+        Without a ``model`` the dispatcher picks one for the question.
+        Yields one ``("cached", reply)`` for a stored answer, otherwise
+        ``("token", text)`` chunks.  Finished answers are cached and kept in
+        the conversation; one stopped by ``cancelled()`` is not.
+        ``on_stream`` is handed the dispatcher stream before it is read, so
+        another thread can close it to stop even the wait for the first
+        token.  Raises ``OllamaError``.
+        """
+        model = model or get_dispatcher().route(question)
+        with metrics.span("assistant.context"):
+            messages, depends_on, key = self.context.build(question, model)
+            cached = self.response_cache.get(model, key)
+        if cached is not None:
+            metrics.count("assistant.cache_hit")
+            yield "cached", cached
+            self.context.record(question, cached, model)
+            return
+
+        metrics.count("assistant.cache_miss")
+        parts = []
+        stream = get_dispatcher().chat(model, messages, stream=True)
+        try:
+            if on_stream is not None:
+                on_stream(stream)
+            for chunk in stream:
+                if cancelled is not None and cancelled():
+                    return
+                content = chunk["message"]["content"]
+                if content:
+                    parts.append(content)
+                    yield "token", content
+        finally:
+            # Closing the stream leaves the request; the dispatcher stops
+            # the generation once no caller is left.
+            stream.close()
+        if cancelled is not None and cancelled():
+            return
+        response = "".join(parts)
+        if response:
+            self.response_cache.put(model, key, response, depends_on)
+        self.context.record(question, response, model)
+
+    def close(self):
+        if self._reminders is not None:
+            self._reminders.close()
+        if self._day_counts is not None:
+            self._day_counts.close()
+        self.store.close()
+
+
+def _month(text):
+    year, month = text.split("-")
+    return int(year), int(month)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the calendar without the GUI.")
+    parser.add_argument("--store", default=event_file, help="events file (.json or .db)")
+    parser.add_argument("--metrics", action="store_true", help="print operation timings when done")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add an event from natural language")
+    add.add_argument("text")
+    add.add_argument("--date", help="YYYY-MM-DD when the text names no date (default: today)")
+    add.add_argument("--no-llm", action="store_true", help="never ask the LLM to read the text")
+
+    listing = commands.add_parser("list", help="list events")
+    listing.add_argument("--date", help="one day, YYYY-MM-DD")
+    listing.add_argument("--month", type=_month, help="YYYY-MM")
+    listing.add_argument("--days", type=int, default=7, help="days from today (default: 7)")
+
+    search = commands.add_parser("search", help="find events by keyword")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=50)
+
+    for name, verb in (("import", "copy events from"), ("export", "copy events to")):
+        command = commands.add_parser(name, help=f"{verb} another events file (.json, .db or .ics)")
+        command.add_argument("path")
+
+    ask = commands.add_parser("ask", help="ask the assistant about the calendar")
+    ask.add_argument("question")
+    ask.add_argument("--model", help=f"default: {chat_model}, or the small model for simple questions")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.enable()
+    engine = CalendarEngine(args.store)
+    try:
+        if args.command == "add":
+            day, event = engine.add(args.text, args.date or date.today().isoformat(), llm=not args.no_llm)
+            print(f"{day}: {summary(event)}")
+        elif args.command == "list":
+            if args.date:
+                days = [(args.date, engine.events(args.date))]
+            elif args.month:
+                days = engine.month(*args.month)
+            else:
+                today = date.today()
+                days = engine.between(today, today + timedelta(days=args.days - 1))
+            for day, events in days:
+                for event in events:
+                    print(f"{day}: {event}")
+        elif args.command == "search":
+            for day, event in engine.search(args.query, args.limit):
+                print(f"{day}: {summary(event)}")
+        elif args.command == "import":
+            stats = {}
+            print(f"Imported {engine.import_events(args.path, stats)} events from {args.path}")
+            for error in stats.get("errors", ()):
+                print(f"skipped {error}", file=sys.stderr)
+        elif args.command == "export":
+            print(f"Exported {engine.export_events(args.path)} events to {args.path}")
+        elif args.command == "ask":
+            for _, text in engine.ask(args.question, args.model):
+                print(text, end="", flush=True)
+            print()
+    except (CalendarError, OllamaError, OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
+        if args.metrics:
+            print(metrics.get_metrics().report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+class ChatWorker(QThread):
+    """Runs one streamed assistant answer off the GUI thread.
+
+    The answer comes from ``CalendarEngine.ask``, which adds the relevant
+    calendar events and recent history to the prompt and replays cached
+    replies.  Tokens reach the UI through signals, so widgets are only
+    touched from the GUI thread.  ``cancel()`` closes the stream, which
+    also ends a wait for the first token.
+    """
+
+    token_received = pyqtSignal(str)
+    first_token = pyqtSignal(float)
+    response_complete = pyqtSignal(str)
+    response_cancelled = pyqtSignal(str)
+    response_failed = pyqtSignal(str)
+    cache_hit = pyqtSignal(dict)
+
+    def __init__(self, question, engine, model=None, parent=None):
+        super().__init__(parent)
+        self.question = question
+        self.engine = engine
+        self.model = model
+        self._cancelled = False
+        self._stream = None
+
+    def cancel(self):
+        self._cancelled = True
+        if self._stream is not None:
+            self._stream.close()
+
+    def _started(self, stream):
+        self._stream = stream
+        # A cancel() that came before the stream existed.
+        if self._cancelled:
+            stream.close()
+
+    def run(self):
+        started = time.perf_counter()
+        parts = []
+        try:
+            for kind, text in self.engine.ask(self.question, self.model, cancelled=lambda: self._cancelled, on_stream=self._started):
+                if not parts:
+                    self.first_token.emit(time.perf_counter() - started)
+                parts.append(text)
+                self.token_received.emit(text)
+                if kind == "cached":
+                    self.cache_hit.emit(self.engine.response_cache.stats())
+        except Exception as e:
+            self.response_failed.emit(str(e))
+            return
+
+        if self._cancelled:
+            self.response_cancelled.emit("".join(parts))
+        else:
+            self.response_complete.emit("".join(parts))
@@ -0,0 +1,62 @@
+"""Calendar grid that marks the days with events.
+
+Cells are painted with one dot per event (up to three, a number beyond
+that) from ``event_index.DayCounts``.  Only the cells on screen are ever
+asked for, and each month's counts are computed once and then kept up to
+date by the store, so turning pages costs a dictionary lookup per cell; a
+change repaints just the cells of the days that changed.
+"""
+
+from PyQt6.QtCore import QDate, QPointF, QRectF, Qt, pyqtSignal
+from PyQt6.QtGui import QPainter
+from PyQt6.QtWidgets import QCalendarWidget
+
+from event_index import parse_date
+
+
+class EventCalendar(QCalendarWidget):
+    days_changed = pyqtSignal(object)
+
+    def __init__(self, day_counts, parent=None):
+        super().__init__(parent)
+        self.day_counts = day_counts
+        # Counts change on whichever thread wrote to the store; the repaint
+        # is queued onto the GUI thread.
+        self.days_changed.connect(self.update_days)
+        listener = self._counts_listener = self.days_changed.emit
+        day_counts.add_listener(listener)
+        self.destroyed.connect(lambda: day_counts.remove_listener(listener))
+
+    def paintCell(self, painter, rect, date):
+        super().paintCell(painter, rect, date)
+        count = self.day_counts.count(date.toPyDate())
+        if not count:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        color = self.palette().highlight().color()
+        bottom = rect.bottom() - max(3, rect.height() // 8)
+        if count <= 3:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(color)
+            radius = max(1.5, rect.height() / 18)
+            for i in range(count):
+                x = rect.center().x() + (i - (count - 1) / 2) * radius * 3
+                painter.drawEllipse(QPointF(x, bottom), radius, radius)
+        else:
+            font = painter.font()
+            font.setPointSizeF(max(6.0, font.pointSizeF() * 0.7))
+            painter.setFont(font)
+            painter.setPen(color)
+            text_rect = QRectF(rect.left(), bottom - rect.height() / 4, rect.width() - 2, rect.height() / 4 + 2)
+            painter.drawText(text_rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom, str(count))
+        painter.restore()
+
+    def update_days(self, dates):
+        if dates is None:
+            self.updateCells()
+            return
+        for key in dates:
+            day = parse_date(key)
+            if day is not None:
+                self.updateCell(QDate(day.year, day.month, day.day))
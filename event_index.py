@@ -0,0 +1,145 @@
+"""Sorted date index over the event store keys.
+
+Keys in ``events.json`` are ``yyyy-MM-dd`` strings.  The index keeps the
+parsed dates in a sorted list so day/week/month/span lookups are a pair of
+bisects plus the matching slice, instead of a scan over every stored date.
+``DayCounts`` keeps the number of events per day for the calendar grid.
+``tokenize`` splits event text into the keywords that stores and the
+assistant's retriever index.
+"""
+
+import calendar
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import date, timedelta
+
+stopwords = frozenset(
+    "a an and are at be do for from have i in is it me my of on or the this "
+    "to was what when where which who will with you your".split()
+)
+word_pattern = re.compile(r"[\w']+")
+
+
+def tokenize(text):
+    # Bare numbers are left out so "2026-12-03" does not match "room 12".
+    return [
+        w for w in word_pattern.findall(text.casefold())
+        if len(w) > 1 and w not in stopwords and not w.isdigit()
+    ]
+
+
+def parse_date(key):
+    try:
+        return date.fromisoformat(key)
+    except (TypeError, ValueError):
+        return None
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def week_bounds(day):
+    start = day - timedelta(days=day.weekday())
+    return start, start + timedelta(days=6)
+
+
+class DateIndex:
+    def __init__(self, keys=()):
+        # Keys that are not valid dates (e.g. from an invalid QDate) stay in
+        # the store but are not reachable through range queries.
+        self._dates = sorted(d for d in map(parse_date, keys) if d)
+
+    def __len__(self):
+        return len(self._dates)
+
+    def add(self, key):
+        day = parse_date(key)
+        if day is None:
+            return
+        i = bisect_left(self._dates, day)
+        if i == len(self._dates) or self._dates[i] != day:
+            insort(self._dates, day, lo=i)
+
+    def discard(self, key):
+        day = parse_date(key)
+        if day is None:
+            return
+        i = bisect_left(self._dates, day)
+        if i < len(self._dates) and self._dates[i] == day:
+            del self._dates[i]
+
+    def clear(self):
+        self._dates.clear()
+
+    def between(self, start, end):
+        lo = bisect_left(self._dates, start)
+        hi = bisect_right(self._dates, end, lo=lo)
+        return [d.isoformat() for d in self._dates[lo:hi]]
+
+
+class DayCounts:
+    """Number of events per day, cached a month at a time.
+
+    A month is counted by ``store.day_counts`` (an index lookup, no events
+    are loaded) the first time it is asked for, then kept current from the
+    store's notifications: changed days are recounted, and a change to every
+    date (a recurring series, a clear) drops the cache.  Listeners get the
+    changed date keys, or None, once the counts are up to date.
+    """
+
+    def __init__(self, store, max_months=36):
+        self.store = store
+        self.max_months = max_months
+        self._months = OrderedDict()  # (year, month) -> {date key: count}
+        self._listeners = []
+        self._lock = threading.Lock()
+        store.subscribe(self.on_store_changed)
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def close(self):
+        self.store.unsubscribe(self.on_store_changed)
+
+    def month(self, year, month):
+        """``{date key: count}`` for the month; treat it as read-only."""
+        with self._lock:
+            counts = self._months.get((year, month))
+            if counts is None:
+                counts = self._months[(year, month)] = self.store.day_counts(*month_bounds(year, month))
+                if len(self._months) > self.max_months:
+                    self._months.popitem(last=False)
+            else:
+                self._months.move_to_end((year, month))
+            return counts
+
+    def count(self, day):
+        return self.month(day.year, day.month).get(day.isoformat(), 0)
+
+    def on_store_changed(self, dates):
+        with self._lock:
+            if dates is None:
+                self._months.clear()
+            else:
+                for key in dates:
+                    day = parse_date(key)
+                    counts = self._months.get((day.year, day.month)) if day else None
+                    if counts is None:
+                        continue
+                    count = len(self.store.get(key))
+                    if count:
+                        counts[key] = count
+                    else:
+                        counts.pop(key, None)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(dates)
@@ -0,0 +1,332 @@
+"""Structured calendar events and recurrence rules.
+
+An ``Event`` is a small slotted record: a title, an optional start and end
+time, an optional ``Recurrence`` (a subset of iCalendar RRULE: FREQ,
+INTERVAL, COUNT, UNTIL and BYDAY, with numbered days such as 2TU in monthly
+rules) and the dates excluded from it.  A series is stored once, under the
+date it starts on, and its occurrences are only computed for the range a
+caller asks about.
+
+Plain events keep the historical string form on disk ("Dentist",
+"09:30-10:00 Standup"), so existing ``events.json`` files load unchanged;
+``from_record`` reads either form and ``to_record`` writes the smallest one.
+"""
+
+import calendar
+import re
+from datetime import date, datetime, time, timedelta
+
+from event_index import parse_date
+
+weekday_codes = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+time_prefix = re.compile(r"^\s*(\d{1,2}:\d{2})(?:\s*[-–]\s*(\d{1,2}:\d{2}))?\s+(.+)$", re.DOTALL)
+rrule_suffix = re.compile(r"\s+RRULE:(\S+)\s*$", re.IGNORECASE)
+
+
+def _parse_clock(text):
+    try:
+        return time.fromisoformat(text.zfill(5))
+    except ValueError:
+        return None
+
+
+class Recurrence:
+    __slots__ = ("freq", "interval", "count", "until", "byday", "nth")
+
+    freqs = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=(), nth=()):
+        """``byday`` are weekdays (0 = Monday); ``nth`` are ``(n, weekday)``
+        pairs for monthly rules, "the 2nd Tuesday" or (-1) "the last Friday"."""
+        if freq not in self.freqs:
+            raise ValueError(f"unsupported FREQ {freq!r}")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("INTERVAL and COUNT must be positive")
+        if byday and freq == "YEARLY":
+            raise ValueError("BYDAY is not supported with FREQ=YEARLY")
+        if nth and freq != "MONTHLY":
+            raise ValueError("numbered BYDAY days need FREQ=MONTHLY")
+        if any(not 1 <= abs(n) <= 5 for n, _ in nth):
+            raise ValueError("numbered BYDAY days must be 1-5 or -1 to -5")
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = tuple(sorted(set(byday)))
+        self.nth = tuple(sorted(set(nth)))
+
+    @classmethod
+    def parse(cls, text):
+        """Parse an RRULE value; ``ValueError`` for anything it cannot express."""
+        parts = {}
+        for part in text.strip().upper().removeprefix("RRULE:").split(";"):
+            name, sep, value = part.partition("=")
+            if not sep:
+                raise ValueError(f"malformed RRULE part {part!r}")
+            parts[name] = value
+        # Weeks start on Monday here; WKST only matters for multi-day rules
+        # every other (third, ...) week.
+        wkst = parts.pop("WKST", "MO")
+        unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+        if unknown:
+            raise ValueError(f"unsupported RRULE parts {', '.join(sorted(unknown))}")
+        until = parts.get("UNTIL")
+        if until is not None:
+            until = until.split("T")[0].replace("-", "")
+            until = date(int(until[:4]), int(until[4:6]), int(until[6:8]))
+        byday, nth = [], []
+        for code in parts["BYDAY"].split(",") if "BYDAY" in parts else ():
+            if code[-2:] not in weekday_codes:
+                raise ValueError(f"malformed BYDAY day {code!r}")
+            weekday = weekday_codes.index(code[-2:])
+            if len(code) > 2:
+                nth.append((int(code[:-2]), weekday))
+            else:
+                byday.append(weekday)
+        rule = cls(
+            parts.get("FREQ"),
+            interval=int(parts.get("INTERVAL", 1)),
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=until,
+            byday=byday,
+            nth=nth,
+        )
+        if wkst != "MO" and rule.freq == "WEEKLY" and rule.interval > 1 and len(rule.byday) > 1:
+            raise ValueError(f"unsupported WKST {wkst}")
+        return rule
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday or self.nth:
+            days = [weekday_codes[d] for d in self.byday] + [f"{n}{weekday_codes[d]}" for n, d in self.nth]
+            parts.append("BYDAY=" + ",".join(days))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until:%Y%m%d}")
+        return ";".join(parts)
+
+    def _key(self):
+        return (self.freq, self.interval, self.count, self.until, self.byday, self.nth)
+
+    def __eq__(self, other):
+        return isinstance(other, Recurrence) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Recurrence({str(self)!r})"
+
+    def dates(self, dtstart, start, end):
+        """Occurrence dates of a series starting on ``dtstart`` within [start, end]."""
+        if self.until is not None:
+            end = min(end, self.until)
+        if end < dtstart or end < start:
+            return
+        for index, day in self._iter(dtstart, max(start, dtstart)):
+            if (self.count is not None and index >= self.count) or day > end:
+                return
+            if day >= start:
+                yield day
+
+    def _iter(self, dtstart, first):
+        # Yields (occurrence index, date) in order, starting at or shortly
+        # before ``first``; daily and weekly rules jump straight there.
+        if self.freq == "DAILY" and self.byday:
+            # The weekdays repeat every 7 steps, so whole cycles are skipped.
+            cycle = [k for k in range(7) if (dtstart + timedelta(days=k * self.interval)).weekday() in self.byday]
+            if not cycle:
+                return
+            cycles = max(0, (first - dtstart).days // (7 * self.interval))
+            index = cycles * len(cycle)
+            while True:
+                for k in cycle:
+                    yield index, dtstart + timedelta(days=(cycles * 7 + k) * self.interval)
+                    index += 1
+                cycles += 1
+        elif self.freq == "DAILY":
+            k = max(0, -(-(first - dtstart).days // self.interval))
+            while True:
+                yield k, dtstart + timedelta(days=k * self.interval)
+                k += 1
+        elif self.freq == "WEEKLY":
+            days = self.byday or (dtstart.weekday(),)
+            week0 = dtstart - timedelta(days=dtstart.weekday())
+            first_week = [d for d in days if d >= dtstart.weekday()]
+            period = max(0, (first - week0).days // (7 * self.interval))
+            index = 0 if period == 0 else len(first_week) + (period - 1) * len(days)
+            while True:
+                monday = week0 + timedelta(weeks=period * self.interval)
+                for d in (first_week if period == 0 else days):
+                    yield index, monday + timedelta(days=d)
+                    index += 1
+                period += 1
+        else:
+            # Months without the start day (the 31st, 29 February) or the
+            # numbered weekday (a 5th Monday) are skipped, as in RFC 5545.
+            step = self.interval if self.freq == "MONTHLY" else 12 * self.interval
+            index, months = 0, 0
+            while True:
+                year, month = divmod(dtstart.month - 1 + months, 12)
+                year += dtstart.year
+                for day in self._month_days(year, month + 1, dtstart):
+                    if day >= dtstart:
+                        yield index, day
+                        index += 1
+                months += step
+
+    def _month_days(self, year, month, dtstart):
+        length = calendar.monthrange(year, month)[1]
+        if not (self.byday or self.nth):
+            return [date(year, month, dtstart.day)] if dtstart.day <= length else []
+        days = set()
+        for weekday in self.byday:
+            first = (weekday - date(year, month, 1).weekday()) % 7 + 1
+            days.update(range(first, length + 1, 7))
+        for n, weekday in self.nth:
+            if n > 0:
+                day = (weekday - date(year, month, 1).weekday()) % 7 + 1 + (n - 1) * 7
+            else:
+                day = length - (date(year, month, length).weekday() - weekday) % 7 + (n + 1) * 7
+            if 1 <= day <= length:
+                days.add(day)
+        return [date(year, month, day) for day in sorted(days)]
+
+
+class Event:
+    __slots__ = ("title", "start", "end", "rrule", "exdates")
+
+    def __init__(self, title, start=None, end=None, rrule=None, exdates=(), duration=None):
+        if isinstance(rrule, str):
+            rrule = Recurrence.parse(rrule)
+        if duration is not None and start is not None and end is None:
+            end = (datetime.combine(date.min, start) + timedelta(minutes=duration)).time()
+        self.title = title
+        self.start = start
+        self.end = end
+        self.rrule = rrule
+        self.exdates = frozenset(exdates)
+
+    @classmethod
+    def from_text(cls, text):
+        """Parse "HH:MM[-HH:MM] title [RRULE:...]"; anything else is a title."""
+        text = text.strip()
+        rrule = None
+        match = rrule_suffix.search(text)
+        if match:
+            try:
+                rrule = Recurrence.parse(match[1])
+                text = text[:match.start()]
+            except (ValueError, IndexError):
+                pass
+        match = time_prefix.match(text)
+        if match:
+            start = _parse_clock(match[1])
+            end = _parse_clock(match[2]) if match[2] else None
+            if start is not None and (end is not None or not match[2]):
+                return cls(match[3].strip(), start, end, rrule)
+        return cls(text, rrule=rrule)
+
+    @classmethod
+    def from_record(cls, record):
+        if isinstance(record, str):
+            return cls.from_text(record)
+        return cls(
+            record["title"],
+            start=_parse_clock(record["start"]) if record.get("start") else None,
+            end=_parse_clock(record["end"]) if record.get("end") else None,
+            rrule=record.get("rrule"),
+            exdates=record.get("exdates", ()),
+        )
+
+    def to_record(self):
+        if self.rrule is None and not self.exdates:
+            return str(self)
+        record = {"title": self.title}
+        if self.start is not None:
+            record["start"] = f"{self.start:%H:%M}"
+        if self.end is not None:
+            record["end"] = f"{self.end:%H:%M}"
+        if self.rrule is not None:
+            record["rrule"] = str(self.rrule)
+        if self.exdates:
+            record["exdates"] = sorted(self.exdates)
+        return record
+
+    @property
+    def duration(self):
+        """Length in minutes, or None for an all-day event."""
+        if self.start is None or self.end is None:
+            return None
+        minutes = (self.end.hour - self.start.hour) * 60 + self.end.minute - self.start.minute
+        return minutes if minutes > 0 else minutes + 24 * 60
+
+    def __str__(self):
+        if self.start is None:
+            return self.title
+        if self.end is None:
+            return f"{self.start:%H:%M} {self.title}"
+        return f"{self.start:%H:%M}-{self.end:%H:%M} {self.title}"
+
+    def __repr__(self):
+        return f"Event({self.to_record()!r})"
+
+    def _key(self):
+        return (self.title, self.start, self.end, self.rrule, self.exdates)
+
+    def __eq__(self, other):
+        return isinstance(other, Event) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def without(self, key):
+        """The same series with the occurrence on ``key`` excluded."""
+        return Event(self.title, self.start, self.end, self.rrule, self.exdates | {key})
+
+    def occurrences(self, key, start, end):
+        """Date keys within [start, end] of the series stored under ``key``."""
+        dtstart = parse_date(key)
+        if self.rrule is None or dtstart is None:
+            return
+        for day in self.rrule.dates(dtstart, start, end):
+            occurrence = day.isoformat()
+            if occurrence not in self.exdates:
+                yield occurrence
+
+
+def as_event(event):
+    return event if isinstance(event, Event) else Event.from_text(event)
+
+
+def expand(fixed, series, start, end):
+    """Merge one-off ``(key, [events])`` days with occurrences of ``series``.
+
+    ``series`` is a list of ``(key, event)`` recurring events; the result is
+    sorted by date, one-off events first within a day.
+    """
+    days = {key: list(items) for key, items in fixed}
+    for key, event in series:
+        for occurrence in event.occurrences(key, start, end):
+            days.setdefault(occurrence, []).append(event)
+    return sorted(days.items())
+
+
+def count_days(fixed, series, start, end):
+    """``{key: number of events}`` for one-off ``(key, count)`` days plus ``series``."""
+    days = dict(fixed)
+    for key, event in series:
+        for occurrence in event.occurrences(key, start, end):
+            days[occurrence] = days.get(occurrence, 0) + 1
+    return days
+
+
+def find(items, event):
+    """The item in ``items`` equal to ``event``, or shown as that text."""
+    for item in items:
+        if item == event or (isinstance(event, str) and str(item) == event):
+            return item
+    return None
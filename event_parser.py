@@ -0,0 +1,418 @@
+"""Natural-language event entry.
+
+``parse`` turns phrases such as "dentist next Tuesday 3pm for an hour" or
+"standup every weekday 9:30-9:45" into a date key and an ``event_model.Event``
+with a handful of regular expressions, without the network and in well under
+a millisecond.  When the rules leave something they could not place in the
+title (a weekday or month name, "weekend", "evening" ...) the result is marked
+``ambiguous``, and only then does ``parse_event`` ask the LLM through an Ollama
+structured-output call, keeping the rule-based result if that fails.
+"""
+
+import calendar
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+
+from event_model import Event, Recurrence
+from llm_dispatcher import PARSE, get_dispatcher
+from ollama_client import OllamaError
+
+parser_model = os.environ.get("ORION_PARSER_MODEL", "mistral")
+
+weekday_names = r"(?:monday|mon|tuesday|tues|tue|wednesday|weds|wed|thursday|thurs|thur|thu|friday|fri|saturday|sunday)"
+month_names = (
+    r"(?:january|jan|february|feb|march|mar|april|apr|may|june|jun|july|jul|august|aug"
+    r"|september|sept|sep|october|oct|november|nov|december|dec)"
+)
+number_words = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+                "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12}
+count = r"(\d+|a|an|one|two|three|four|five|six|seven|eight|nine|ten|twelve)"
+meridiem = r"(am|pm|a\.m\.|p\.m\.)"
+connectors = r"(?:on|at|by|for|from|in|the|starting|beginning|and|,|-|@)"
+
+
+def _re(pattern):
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def _number(text):
+    return number_words[text.lower()] if text.lower() in number_words else int(text)
+
+
+def _weekday(name):
+    return ["mon", "tue", "wed", "thu", "fri", "sat", "sun"].index(name[:3].lower())
+
+
+def _month(name):
+    return ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"].index(name[:3].lower()) + 1
+
+
+def _clock(hour, minute=None, suffix=None, guess=False):
+    hour, minute = int(hour), int(minute or 0)
+    if suffix:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if suffix.lower().startswith("p") else 0)
+    elif guess and 1 <= hour <= 6:
+        # "at 3" on a calendar is nearly always the afternoon.
+        hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _on_or_after(today, month, day, year=None):
+    try:
+        if year is not None:
+            return date(year, month, day)
+        candidate = date(today.year, month, day)
+        return candidate if candidate >= today else date(today.year + 1, month, day)
+    except ValueError:
+        return None
+
+
+def _add_months(day, months):
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+
+def _next_weekday(today, weekday, include_today=False):
+    days = (weekday - today.weekday()) % 7
+    return today + timedelta(days=days if days or include_today else 7)
+
+
+# --- Dates ---
+def _iso(match, today):
+    try:
+        return date(int(match[1]), int(match[2]), int(match[3]))
+    except ValueError:
+        return None
+
+
+def _slashed(match, today):
+    year = match[3] and int(match[3])
+    if year is not None and year < 100:
+        year += 2000
+    return _on_or_after(today, int(match[1]), int(match[2]), year)
+
+
+def _day_month(match, today):
+    return _on_or_after(today, _month(match[2]), int(match[1]), match[3] and int(match[3]))
+
+
+def _month_day(match, today):
+    return _on_or_after(today, _month(match[1]), int(match[2]), match[3] and int(match[3]))
+
+
+def _relative_day(match, today):
+    word = match[1].lower()
+    offset = 2 if word.startswith("day after") else 1 if word == "tomorrow" else 0
+    return today + timedelta(days=offset)
+
+
+def _weekday_date(match, today):
+    # "Tuesday" and "next Tuesday" both mean the coming one; "this Tuesday"
+    # may be today.
+    return _next_weekday(today, _weekday(match[2]), include_today=(match[1] or "").lower() == "this")
+
+
+def _in_days(match, today):
+    n, unit = _number(match[1]), match[2].lower()
+    if unit.startswith("month"):
+        first = _add_months(today, n)
+        return first.replace(day=min(today.day, calendar.monthrange(first.year, first.month)[1]))
+    return today + timedelta(days=n * (7 if unit.startswith("week") else 1))
+
+
+def _next_period(match, today):
+    if match[1].lower() == "week":
+        return today + timedelta(days=7 - today.weekday())
+    return _add_months(today, 1)
+
+
+def _day_of_month(match, today):
+    day = int(match[1])
+    for months in range(3):
+        first = _add_months(today, months)
+        try:
+            candidate = first.replace(day=day)
+        except ValueError:
+            continue
+        if candidate >= today:
+            return candidate
+    return None
+
+
+date_prefix = r"(?:\b(?:on|by|starting|beginning|from)\s+)?"
+date_rules = [
+    (_re(date_prefix + r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), _iso),
+    (_re(date_prefix + r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b"), _slashed),
+    (_re(date_prefix + r"\b(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + month_names
+         + r")\b\.?(?:,?\s+(\d{4})\b)?"), _day_month),
+    (_re(date_prefix + r"\b(" + month_names + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b(?!\s*(?::|am|pm|a\.m|p\.m))"
+         + r"(?:,?\s+(\d{4})\b)?"), _month_day),
+    (_re(date_prefix + r"\b(day after tomorrow|today|tonight|tomorrow)\b"), _relative_day),
+    (_re(date_prefix + r"\b(?:(next|this|coming)\s+)?(" + weekday_names + r")\b"), _weekday_date),
+    (_re(r"\bin\s+" + count + r"\s+(days?|weeks?|months?)\b"), _in_days),
+    (_re(r"\bnext\s+(week|month)\b"), _next_period),
+    (_re(date_prefix + r"\b(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)\b"), _day_of_month),
+]
+
+
+# --- Times ---
+def _range(match, today):
+    has_colon = match[3] is not None or match[6] is not None
+    if not (has_colon or match[4] or match[7] or match[1]):
+        return None
+    end = _clock(match[5], match[6], match[7], guess=not match[7] and match[6] is None)
+    start_suffix = match[4]
+    if start_suffix is None and match[7]:
+        start_suffix = match[7]
+        if end is not None and int(match[2]) % 12 > int(match[5]) % 12:
+            # "11-1pm" starts in the morning.
+            start_suffix = "am" if match[7].lower().startswith("p") else "pm"
+    start = _clock(match[2], match[3], start_suffix, guess=not start_suffix and match[3] is None)
+    return None if start is None or end is None else (start, end)
+
+
+def _single(match, today):
+    start = _clock(match[1], match[2], match[3], guess=not match[3] and not match[2])
+    return None if start is None else (start, None)
+
+
+def _named(match, today):
+    return (time(0, 0) if match[1].lower() == "midnight" else time(12, 0)), None
+
+
+time_prefix = r"(?:\b(?:at|from)\s+|@\s*)?"
+time_rules = [
+    (_re(r"(?:\b(from|at)\s+)?\b(\d{1,2})(?::(\d{2}))?\s*" + meridiem + r"?\s*(?:-|–|to|until|till)\s*"
+         + r"(\d{1,2})(?::(\d{2}))?\s*" + meridiem + r"?(?![\w:/])"), _range),
+    (_re(time_prefix + r"\b(\d{1,2})(?::(\d{2}))?\s*" + meridiem + r"(?!\w)"), _single),
+    (_re(time_prefix + r"\b(\d{1,2}):(\d{2})()\b"), _single),
+    (_re(time_prefix + r"\b(\d{1,2})()()\s*o'?clock\b"), _single),
+    (_re(r"(?:\bat\s+|@\s*)\b(\d{1,2})()()\b(?!\s*(?:st|nd|rd|th|/|-|:|%|\.\d))"), _single),
+    (_re(r"(?:\bat\s+)?\b(noon|midday|midnight)\b"), _named),
+]
+
+duration_rule = _re(
+    r"\bfor\s+(half\s+an?|" + count[1:-1] + r"|\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?|m)\b"
+    r"(\s+and\s+a\s+half)?"
+)
+
+
+def _duration(match):
+    amount = 0.5 if match[1].lower().startswith("half") else float(number_words.get(match[1].lower(), match[1]))
+    minutes = amount * (60 if match[2].lower().startswith("h") else 1)
+    if match[3]:
+        minutes += 30
+    return int(minutes)
+
+
+# --- Recurrence ---
+every_rule = _re(r"\b(?:every|each)\s+(other\s+)?(?:" + count + r"\s+)?(day|week|month|year)s?\b")
+every_weekday_rule = _re(r"\b(?:every|each)\s+(weekday|weekend)s?\b")
+weekday_list = weekday_names + r"s?(?:\s*(?:,|and|&)\s*" + weekday_names + r"s?)*"
+every_days_rule = _re(r"\b(?:every|each)\s+(other\s+)?(" + weekday_list + r")\b")
+plural_days_rule = _re(r"(?:\bon\s+)?\b(" + weekday_names + r"s(?:\s*(?:,|and|&)\s*" + weekday_names + r"s)*)\b")
+# The adverbs only count at the end of a clause, so "weekly report" stays a title.
+adverb_rule = _re(
+    r"\b(daily|weekly|biweekly|fortnightly|monthly|yearly|annually)\b(?=\s*(?:$|,|at\b|on\b|from\b|until\b|"
+    r"starting\b|for\b|\d))"
+)
+until_rule = _re(r"\b(?:until|till|through|thru)\s+")
+until_time_rule = _re(r"\b(?:until|till)\s+(?=\d|noon|midday|midnight)")
+times_rule = _re(r"\b" + count + r"\s+times\b")
+for_periods_rule = _re(r"\bfor\s+" + count + r"\s+(days|weeks|months|years)\b")
+
+
+def _days_in(text):
+    return sorted({_weekday(name) for name in re.findall(weekday_names, text, re.IGNORECASE)})
+
+
+# Words that mean the rules missed part of the date or time.
+leftover_rule = _re(
+    r"\b(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday|january|february|april|june|july|august"
+    r"|september|october|november|december|today|tonight|tomorrow|yesterday|weekend|morning|afternoon|evening"
+    r"|noon|midnight|o'?clock|every|(?:next|this|last|coming)\s+(?:week|month|year)|\d{1,2}(?::\d{2})?\s*(?:am|pm))\b"
+)
+
+
+class _Scanner:
+    # Each rule takes the first match that does not overlap text already
+    # claimed by an earlier rule.
+    def __init__(self, text):
+        self.text = text
+        self.used = [False] * len(text)
+
+    def take(self, pattern, resolve=None, today=None, pos=None):
+        matches = [pattern.match(self.text, pos)] if pos is not None else pattern.finditer(self.text)
+        for match in matches:
+            if match is None or any(self.used[match.start():match.end()]):
+                continue
+            value = resolve(match, today) if resolve is not None else match
+            if value is None:
+                continue
+            self.used[match.start():match.end()] = [True] * (match.end() - match.start())
+            return value
+        return None
+
+    def first(self, rules, today, pos=None):
+        for pattern, resolve in rules:
+            value = self.take(pattern, resolve, today, pos)
+            if value is not None:
+                return value
+        return None
+
+    def rest(self):
+        text = "".join(" " if used else c for c, used in zip(self.text, self.used))
+        text = re.sub(r"\s+", " ", text)
+        edge = r"(?:\s*\b" + connectors + r"\b\s*|\s*[,@-]\s*)+"
+        text = re.sub(r"^" + edge + r"|" + edge + r"$", "", " " + text + " ", flags=re.IGNORECASE)
+        return text.strip()
+
+
+@dataclass(frozen=True)
+class ParsedEvent:
+    date: str  # date key, or None when the text named no date
+    event: Event
+    ambiguous: bool = False
+    source: str = "rules"
+
+
+def _recurrence(scanner, today):
+    match = scanner.take(every_rule)
+    if match:
+        n = 2 if match[1] else _number(match[2]) if match[2] else 1
+        return Recurrence({"day": "DAILY", "week": "WEEKLY", "month": "MONTHLY", "year": "YEARLY"}[match[3].lower()], n)
+    match = scanner.take(every_weekday_rule)
+    if match:
+        return Recurrence("WEEKLY", byday=range(5) if match[1].lower() == "weekday" else (5, 6))
+    match = scanner.take(every_days_rule)
+    if match:
+        return Recurrence("WEEKLY", 2 if match[1] else 1, byday=_days_in(match[2]))
+    match = scanner.take(plural_days_rule)
+    if match:
+        return Recurrence("WEEKLY", byday=_days_in(match[1]))
+    match = scanner.take(adverb_rule)
+    if match:
+        word = match[1].lower()
+        freq = {"daily": "DAILY", "monthly": "MONTHLY", "yearly": "YEARLY", "annually": "YEARLY"}.get(word, "WEEKLY")
+        return Recurrence(freq, 2 if word in ("biweekly", "fortnightly") else 1)
+    return None
+
+
+def parse(text, today=None):
+    """Rule-based parse of ``text``; None if nothing but a date or time is left."""
+    today = today or date.today()
+    scanner = _Scanner(text)
+    rrule = _recurrence(scanner, today)
+    until = repeats = periods = None
+    if rrule is not None:
+        match = scanner.take(until_rule)
+        if match:
+            until = scanner.first(date_rules, today, pos=match.end())
+            if until is None:
+                # "until 5pm" is the end of the meeting, not of the series.
+                scanner.used[match.start():match.end()] = [False] * (match.end() - match.start())
+        match = scanner.take(times_rule)
+        repeats = _number(match[1]) if match else None
+        match = scanner.take(for_periods_rule)
+        periods = (_number(match[1]), match[2].lower()) if match else None
+
+    span = scanner.first(time_rules, today)
+    match = scanner.take(duration_rule)
+    minutes = _duration(match) if match else None
+    day = scanner.first(date_rules, today)
+    # An end time no range took ("yoga every monday until 5pm") has no start.
+    dangling = scanner.take(until_time_rule) is not None
+
+    title = scanner.rest()
+    if not title:
+        return None
+    start, end = span or (None, None)
+    ambiguous = bool(leftover_rule.search(title)) or (minutes is not None and start is None) or dangling
+
+    if rrule is not None:
+        if day is None:
+            # A series with no start date begins with its next occurrence.
+            day = min((_next_weekday(today, d, include_today=True) for d in rrule.byday), default=today)
+        if periods is not None:
+            n, unit = periods
+            if unit == "days":
+                until = day + timedelta(days=n - 1)
+            elif unit == "weeks":
+                until = day + timedelta(weeks=n) - timedelta(days=1)
+            else:
+                months = n * (12 if unit == "years" else 1)
+                until = _add_months(day, months) - timedelta(days=1)
+        rrule = Recurrence(rrule.freq, rrule.interval, count=repeats, until=until, byday=rrule.byday, nth=rrule.nth)
+
+    event = Event(title, start, end, rrule, duration=minutes)
+    return ParsedEvent(day.isoformat() if day is not None else None, event, ambiguous)
+
+
+# --- LLM fallback ---
+llm_schema = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "date": {"type": ["string", "null"], "description": "YYYY-MM-DD"},
+        "start": {"type": ["string", "null"], "description": "HH:MM, 24-hour clock"},
+        "end": {"type": ["string", "null"], "description": "HH:MM, 24-hour clock"},
+        "rrule": {"type": ["string", "null"], "description": "iCalendar RRULE such as FREQ=WEEKLY;BYDAY=TU"},
+    },
+    "required": ["title", "date", "start", "end", "rrule"],
+}
+
+
+def parse_with_llm(text, today=None, model=parser_model):
+    today = today or date.today()
+    messages = [
+        {
+            "role": "system",
+            "content": (
+                f"Extract one calendar event from the user's text. Today is {today:%A %Y-%m-%d}. "
+                "Use null for anything the text does not say."
+            ),
+        },
+        {"role": "user", "content": text},
+    ]
+    try:
+        reply = get_dispatcher().chat(model, messages, priority=PARSE, format=llm_schema, options={"temperature": 0})
+        fields = json.loads(reply["message"]["content"])
+        title = fields["title"].strip()
+        day = date.fromisoformat(fields["date"]).isoformat() if fields.get("date") else None
+        start = time.fromisoformat(fields["start"].zfill(5)) if fields.get("start") else None
+        end = time.fromisoformat(fields["end"].zfill(5)) if fields.get("end") and start else None
+        rrule = Recurrence.parse(fields["rrule"]) if fields.get("rrule") else None
+    except (OllamaError, ValueError, KeyError, TypeError, AttributeError, IndexError):
+        return None
+    if not title:
+        return None
+    return ParsedEvent(day, Event(title, start, end, rrule), source="llm")
+
+
+def parse_event(text, today=None, model=parser_model, llm=True):
+    """``parse``, asking the LLM only when the rules were unsure."""
+    parsed = parse(text, today)
+    if llm and (parsed is None or parsed.ambiguous):
+        return parse_with_llm(text, today, model) or parsed
+    return parsed
+
+
+def summary(event):
+    """How a parsed event is echoed back: its text plus any recurrence."""
+    return str(event) if event.rrule is None else f"{event} 🔁 {event.rrule}"
+
+
+command_rule = _re(r"^\s*(?:please\s+)?(?:add|schedule|book|put|remind me(?:\s+to|\s+about)?)\s+(.+?)(?:\s+(?:to|on|in)\s+(?:my\s+)?calendar)?\s*$")
+
+
+def event_command(text):
+    """The event part of a spoken "add dentist tomorrow 3pm", or None."""
+    match = command_rule.match(text)
+    return match[1] if match else None
@@ -0,0 +1,351 @@
+"""Journaled event storage.
+
+Events live in a plain ``date -> [event, ...]`` JSON snapshot (the historical
+``events.json`` format, with recurring series stored as ``event_model``
+records under their first date) plus an append-only journal of changes next
+to it.  Each add/remove/clear appends one line to the journal, so a write
+costs the size of the change rather than the size of the calendar.  Once
+the journal grows past ``compact_every`` records it is folded back into the
+snapshot on a background thread, written to a temporary file and renamed
+into place.
+
+``open_store`` picks the backend from the file name: ``.db``/``.sqlite``
+paths use ``SqliteEventStore`` instead, and ``migrate`` copies events between
+any two stores in bulk.
+
+Readers get ``event_model.Event`` objects.  Range queries merge the one-off
+events of the range with the occurrences of the (few) recurring series, which
+are expanded only for that range; ``records`` and ``iter_events`` return the
+stored events themselves.
+"""
+
+import argparse
+import json
+import os
+import threading
+
+import metrics
+from event_index import DateIndex, month_bounds, parse_date, week_bounds
+from event_model import Event, as_event, count_days, expand, find
+
+event_file = os.environ.get("ORION_EVENT_STORE", "events.json")
+sqlite_suffixes = (".db", ".sqlite", ".sqlite3")
+
+
+def _fsync_dir(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JsonEventStore:
+    def __init__(self, path=event_file, compact_every=1000):
+        self.path = path
+        self.journal_path = path + ".journal"
+        # Journal that is being folded into the snapshot by a compaction.
+        self.compacting_path = path + ".journal.compacting"
+        # Marker meaning the snapshot in ``tmp_path`` already contains it.
+        self.compacted_path = path + ".journal.compacted"
+        self.tmp_path = path + ".tmp"
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._compaction = None
+        self._journal = None
+        self._journal_records = 0
+        self._listeners = []
+        self.events = {}  # date -> one-off events
+        self.series = []  # (first date, recurring event)
+        self.index = DateIndex()
+        self.load()
+
+    # --- Loading ---
+    def load(self):
+        with metrics.span("store.load"), self._lock:
+            self._recover()
+            self.events, self.series = {}, []
+            for date, records in self._read_snapshot().items():
+                for record in records:
+                    self._add_event(date, Event.from_record(record))
+            self.index = DateIndex(self.events)
+            self._journal_records = 0
+            for path in (self.compacting_path, self.journal_path):
+                self._journal_records += self._replay(path)
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return self.events
+
+    def _recover(self):
+        # A compaction commits by renaming ``.compacting`` to ``.compacted``
+        # once the new snapshot is fully written to ``tmp_path``.  Finish any
+        # compaction that got that far; otherwise the old journal is replayed.
+        if os.path.exists(self.compacted_path):
+            if os.path.exists(self.tmp_path):
+                os.replace(self.tmp_path, self.path)
+            os.remove(self.compacted_path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def _read_snapshot(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _replay(self, path):
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return 0
+        count = 0
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append.
+                    break
+                self._apply(record)
+                count += 1
+        return count
+
+    def _add_event(self, date, event):
+        if event.rrule is not None:
+            self.series.append((date, event))
+            return
+        items = self.events.setdefault(date, [])
+        if not items:
+            self.index.add(date)
+        items.append(event)
+
+    def _apply(self, record):
+        """Apply one journal record; return the changed dates, None for all."""
+        op = record["op"]
+        if op == "clear":
+            self.events.clear()
+            self.series.clear()
+            self.index.clear()
+            return None
+        date, event = record["date"], Event.from_record(record["event"])
+        if op == "add":
+            self._add_event(date, event)
+            return None if event.rrule is not None else {date}
+        if event.rrule is not None:
+            for i, (key, item) in enumerate(self.series):
+                if item == event:
+                    # Removing one date, the first included, excludes that
+                    # occurrence; only "remove_series" drops the series.
+                    if op == "remove_series":
+                        del self.series[i]
+                        return None
+                    self.series[i] = (key, item.without(date))
+                    return {date, key}
+            return set()
+        items = self.events.get(date, [])
+        if event in items:
+            items.remove(event)
+            if not items:
+                del self.events[date]
+                self.index.discard(date)
+        return {date}
+
+    # --- Changes ---
+    def subscribe(self, listener):
+        # ``listener(dates)`` gets the set of changed date keys after each
+        # write, or None when every date changed.
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, dates):
+        for listener in list(self._listeners):
+            listener(dates)
+
+    # Readers take the lock too: the chat worker queries the store from its
+    # own thread while the GUI thread writes to it.
+    def get(self, date):
+        day = parse_date(date)
+        with self._lock:
+            if day is None or not self.series:
+                return list(self.events.get(date, []))
+            days = expand([(date, self.events.get(date, []))], self.series, day, day)
+        return [event for _, items in days for event in items]
+
+    def records(self, date):
+        """Events stored under ``date``: its one-offs and the series starting there."""
+        with self._lock:
+            return self.events.get(date, []) + [event for key, event in self.series if key == date]
+
+    def iter_events(self):
+        with self._lock:
+            pairs = [(date, event) for date, items in self.events.items() for event in items]
+            pairs.extend(self.series)
+        yield from pairs
+
+    # --- Range queries ---
+    def between(self, start, end):
+        with metrics.span("store.between"), self._lock:
+            fixed = [(key, list(self.events[key])) for key in self.index.between(start, end)]
+            if not self.series:
+                return fixed
+            return expand(fixed, self.series, start, end)
+
+    def day_counts(self, start, end):
+        """``{date key: number of events}`` for the days in [start, end] with any."""
+        with metrics.span("store.day_counts"), self._lock:
+            fixed = [(key, len(self.events[key])) for key in self.index.between(start, end)]
+            return count_days(fixed, self.series, start, end)
+
+    def day(self, day):
+        return self.between(day, day)
+
+    def week(self, day):
+        return self.between(*week_bounds(day))
+
+    def month(self, year, month):
+        return self.between(*month_bounds(year, month))
+
+    def add(self, date, event):
+        self._write({"op": "add", "date": date, "event": as_event(event).to_record()})
+
+    def remove(self, date, event):
+        # ``event`` may also be the text shown for it; removing one date of
+        # a series excludes just that occurrence.
+        item = find(self.get(date), event)
+        if item is None:
+            return False
+        self._write({"op": "remove", "date": date, "event": item.to_record()})
+        return True
+
+    def remove_series(self, date, event):
+        """Delete the whole series that ``event`` on ``date`` belongs to."""
+        item = find(self.get(date), event)
+        if item is None or item.rrule is None:
+            return False
+        self._write({"op": "remove_series", "date": date, "event": item.to_record()})
+        return True
+
+    def clear(self):
+        self._write({"op": "clear"})
+
+    def add_many(self, pairs):
+        # One journal append and one fsync for the whole batch.
+        records = [{"op": "add", "date": date, "event": as_event(event).to_record()} for date, event in pairs]
+        if records:
+            self._write(*records)
+        return len(records)
+
+    def _write(self, *records):
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with metrics.span("store.write"), self._lock:
+            self._journal.write(data)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            changed = set()
+            for record in records:
+                dates = self._apply(record)
+                changed = None if changed is None or dates is None else changed | dates
+            self._journal_records += len(records)
+            due = self._journal_records >= self.compact_every
+        self._notify(changed)
+        if due:
+            self.compact(wait=False)
+
+    # --- Compaction ---
+    def compact(self, wait=True):
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                thread = self._compaction
+            elif not self._journal_records:
+                return
+            else:
+                thread = self._start_compaction()
+        if wait:
+            thread.join()
+
+    def _start_compaction(self):
+        # Called with the lock held: rotate the journal and copy the event
+        # lists, then serialize and write the snapshot off the caller's thread.
+        self._journal.close()
+        if os.path.exists(self.compacting_path):
+            # A previous compaction failed; fold its journal in too.
+            with open(self.compacting_path, "a", encoding="utf-8") as dst, \
+                    open(self.journal_path, "r", encoding="utf-8") as src:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.compacting_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_records = 0
+        snapshot = {date: [event.to_record() for event in items] for date, items in self.events.items()}
+        for date, event in self.series:
+            snapshot.setdefault(date, []).append(event.to_record())
+
+        thread = threading.Thread(target=self._write_snapshot, args=(snapshot,), daemon=True)
+        self._compaction = thread
+        thread.start()
+        return thread
+
+    def _write_snapshot(self, snapshot):
+        try:
+            with metrics.span("store.snapshot"), open(self.tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.compacting_path, self.compacted_path)
+            os.replace(self.tmp_path, self.path)
+            os.remove(self.compacted_path)
+            _fsync_dir(self.path)
+        except OSError as e:
+            print(f"Event store compaction failed: {e}")
+
+    def close(self):
+        self.compact(wait=True)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+def open_store(path=event_file):
+    if path.endswith(sqlite_suffixes):
+        from sqlite_store import SqliteEventStore
+        return SqliteEventStore(path)
+    return JsonEventStore(path)
+
+
+def migrate(src, dst, batch_size=10000):
+    count = 0
+    batch = []
+    for pair in src.iter_events():
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            count += dst.add_many(batch)
+            batch = []
+    count += dst.add_many(batch)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy calendar events between stores.")
+    parser.add_argument("source", help="events file to read (.json or .db)")
+    parser.add_argument("target", help="events file to append to (.json or .db)")
+    args = parser.parse_args()
+
+    src, dst = open_store(args.source), open_store(args.target)
+    try:
+        print(f"Migrated {migrate(src, dst)} events from {args.source} to {args.target}")
+    finally:
+        src.close()
+        dst.close()
@@ -0,0 +1,129 @@
+"""Deferred loading of the heavy optional subsystems.
+
+Image generation (torch, diffusers and the Stable Diffusion weights) and
+speech recognition are registered here instead of being imported at module
+level.  Each is loaded the first time it is needed, or warmed on a
+background thread once the window is on screen.  Listeners get
+``(name, state, detail)`` progress updates, where state is "loading",
+"ready" or "failed".
+"""
+
+import importlib
+import os
+import threading
+import time
+
+import metrics
+
+startup_target = float(os.environ.get("ORION_STARTUP_TARGET", "1.5"))
+
+
+class FeatureError(Exception):
+    pass
+
+
+class FeatureLoader:
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._errors = {}
+        self._locks = {}
+        self._describers = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, describe=None):
+        # ``loader(progress)`` returns the loaded object; ``progress(detail)``
+        # reports what it is doing.  ``describe(value)`` names what was
+        # loaded in the "ready" update.
+        self._loaders[name] = loader
+        self._describers[name] = describe
+        self._locks[name] = threading.Lock()
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, name, state, detail=""):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(name, state, detail)
+
+    def is_ready(self, name):
+        return name in self._values
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        with self._locks[name]:
+            if name not in self._values and name not in self._errors:
+                self._load(name)
+        if name in self._errors:
+            raise FeatureError(f"{name} is unavailable: {self._errors[name]}")
+        return self._values[name]
+
+    def _load(self, name):
+        started = time.perf_counter()
+        self._notify(name, "loading", "starting")
+        try:
+            value = self._loaders[name](lambda detail: self._notify(name, "loading", detail))
+        except Exception as e:
+            self._errors[name] = e
+            self._notify(name, "failed", str(e))
+            return
+        self._values[name] = value
+        elapsed = time.perf_counter() - started
+        metrics.record(f"feature.{name}.load", elapsed)
+        detail = f"loaded in {elapsed:.1f}s"
+        if self._describers[name] is not None:
+            detail = f"{self._describers[name](value)}, {detail}"
+        self._notify(name, "ready", detail)
+
+    def warm(self, names):
+        """Load ``names`` one after another on a background thread."""
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except FeatureError:
+                    pass
+
+        thread = threading.Thread(target=run, name="feature-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+def _load_voice(progress):
+    # The recognizer keeps its model loaded, so only the first utterance
+    # pays for it.
+    return importlib.import_module("speech").load_recognizer(progress)
+
+
+def _load_image(progress):
+    # The pipeline lives in the image worker process; this waits for it.
+    return importlib.import_module("image_worker").get_image_worker().wait_ready(progress)
+
+
+features = FeatureLoader()
+features.register("voice", _load_voice, lambda recognizer: f"{recognizer.name} engine")
+features.register("image", _load_image)
+
+
+def warm_features(default):
+    names = os.environ.get("ORION_WARM_FEATURES")
+    names = default if names is None else [n.strip() for n in names.split(",") if n.strip()]
+    return features.warm(names)
+
+
+def report_time_to_window(started, target=startup_target):
+    elapsed = time.perf_counter() - started
+    verdict = "within" if elapsed <= target else "OVER"
+    print(f"Window shown {elapsed:.2f}s after start ({verdict} the {target:.1f}s target)")
+    return elapsed
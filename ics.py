@@ -0,0 +1,341 @@
+"""Streaming iCalendar (.ics) import and export.
+
+``read_events`` walks a feed line by line and yields one ``(date key,
+Event)`` per VEVENT, so memory stays flat however large the file is;
+``import_ics`` hands them to the store in ``add_many`` batches.
+``write_events`` streams the other way from ``store.iter_events()``, with
+recurring series written once as RRULE/EXDATE rather than expanded.
+
+Supported: SUMMARY, DTSTART/DTEND or DURATION (dates, floating times, UTC
+times converted to local time, TZID times taken as wall-clock), RRULE within
+``event_model.Recurrence`` (see ``parse_rule``) and EXDATE.  RECURRENCE-ID
+overrides are skipped; a series whose rule the model cannot express is
+imported as its first occurrence.  Both are counted in the stats, and the
+reasons for skipped events are kept there for the caller to report.
+
+    python ics.py import calendar.ics
+    python ics.py export backup.ics --store events.db
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from event_model import Event, Recurrence
+from event_store import event_file, open_store
+
+duration_pattern = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+product_id = "-//Orion//AI Calendar Assistant//EN"
+error_limit = 20  # skipped-event reasons kept in the import stats
+
+
+class IcsError(Exception):
+    pass
+
+
+# --- Reading ---
+def unfold(lines):
+    """Join folded content lines (continuations start with a space or tab)."""
+    pending = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if pending is not None:
+                pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+
+def split_property(line):
+    """``(NAME, {PARAM: value}, value)`` for one unfolded content line."""
+    i = line.find(":")
+    if i < 0:
+        raise IcsError(f"malformed line {line[:40]!r}")
+    if '"' in line[:i]:
+        # The value starts at the first colon outside a quoted parameter.
+        quoted = False
+        for i, c in enumerate(line):
+            if c == '"':
+                quoted = not quoted
+            elif c == ":" and not quoted:
+                break
+    head, value = line[:i], line[i + 1:]
+    if ";" not in head:
+        return head.upper(), {}, value
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+
+def unescape(text):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m[1] in "nN" else m[1], text)
+
+
+def parse_when(value, params):
+    """A ``datetime`` for date-times, a ``date`` for all-day values."""
+    value = value.strip()
+    day = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    if params.get("VALUE", "").upper() == "DATE" or "T" not in value:
+        return day
+    if value[8] != "T":
+        raise ValueError(f"malformed date-time {value!r}")
+    moment = datetime(day.year, day.month, day.day, int(value[9:11]), int(value[11:13]), int(value[13:15] or 0))
+    if value.endswith("Z"):
+        # UTC instants become local wall-clock time; TZID and floating
+        # times are already wall-clock time.
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return moment
+
+
+def parse_duration(value):
+    match = duration_pattern.match(value.strip())
+    if not match:
+        raise IcsError(f"malformed DURATION {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == "-" else delta
+
+
+def parse_rule(value, start):
+    """``Recurrence`` for an RRULE of a series starting at ``start``.
+
+    Parts that only restate the start date, as Outlook writes them
+    (BYMONTHDAY=19;BYMONTH=10 on a yearly rule starting 19 October), are
+    dropped, and a BYSETPOS picking one weekday of the month becomes a
+    numbered day (BYDAY=TU;BYSETPOS=2 is 2TU).  Raises ``ValueError`` for
+    anything else the model cannot express.
+    """
+    parts = dict(part.partition("=")[::2] for part in value.strip().upper().split(";"))
+    freq = parts.get("FREQ")
+    if freq in ("MONTHLY", "YEARLY") and parts.get("BYMONTHDAY") == str(start.day):
+        del parts["BYMONTHDAY"]
+    if freq == "YEARLY" and parts.get("BYMONTH") == str(start.month):
+        del parts["BYMONTH"]
+    if freq == "MONTHLY" and "BYSETPOS" in parts and parts.get("BYDAY", ",").isalpha():
+        parts["BYDAY"] = parts.pop("BYSETPOS") + parts["BYDAY"]
+    return Recurrence.parse(";".join(f"{name}={value}" for name, value in parts.items()))
+
+
+def _event(props, stats):
+    if "RECURRENCE-ID" in props:
+        # Edited occurrences of a series; the series itself still imports.
+        stats["skipped"] += 1
+        return None
+    if "DTSTART" not in props:
+        stats["skipped"] += 1
+        return None
+    start = parse_when(*props["DTSTART"])
+    title = unescape(props.get("SUMMARY", ("", {}))[0]).strip() or "(no title)"
+    rrule = exdates = None
+    if "RRULE" in props:
+        try:
+            rrule = parse_rule(props["RRULE"][0], start)
+        except (ValueError, KeyError, IndexError):
+            stats["unsupported_rules"] += 1
+    if rrule is not None and "EXDATE" in props:
+        exdates = [
+            parse_when(item, params).strftime("%Y-%m-%d")
+            for values, params in props["EXDATE"]
+            for item in values.split(",")
+        ]
+    if not isinstance(start, datetime):
+        return start.isoformat(), Event(title, rrule=rrule, exdates=exdates or ())
+
+    end = None
+    if "DTEND" in props:
+        end = parse_when(*props["DTEND"])
+    elif "DURATION" in props:
+        end = start + parse_duration(props["DURATION"][0])
+    end = end.time() if isinstance(end, datetime) and end > start else None
+    return start.date().isoformat(), Event(title, start.time(), end, rrule, exdates or ())
+
+
+def _skip(stats, error):
+    stats["skipped"] += 1
+    if len(stats["errors"]) < error_limit:
+        stats["errors"].append(str(error))
+
+
+def read_events(lines, stats=None):
+    """Yield ``(date key, Event)`` for each VEVENT in ``lines``.
+
+    ``stats`` (a dict) collects "events", "skipped" (events and malformed
+    lines passed over) and "unsupported_rules", and in "errors" why the
+    first ``error_limit`` skipped items failed.
+    """
+    stats = stats if stats is not None else {}
+    for key in ("events", "skipped", "unsupported_rules"):
+        stats.setdefault(key, 0)
+    stats.setdefault("errors", [])
+    props = None
+    depth = 0
+    for line in unfold(lines):
+        if not line:
+            continue
+        try:
+            name, params, value = split_property(line)
+        except IcsError as e:
+            # One stray line must not end a long import half way.
+            _skip(stats, e)
+            continue
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and props is None:
+                props, depth = {}, 0
+            elif props is not None:
+                # VALARM and other components nested in the event.
+                depth += 1
+            continue
+        if name == "END" and props is not None:
+            if depth:
+                depth -= 1
+                continue
+            try:
+                pair = _event(props, stats)
+            except (IcsError, ValueError) as e:
+                _skip(stats, f"{props.get('SUMMARY', ('(no title)',))[0]}: {e}")
+                pair = None
+            props = None
+            if pair is not None:
+                stats["events"] += 1
+                yield pair
+            continue
+        if props is not None and not depth:
+            if name == "EXDATE":
+                props.setdefault(name, []).append((value, params))
+            else:
+                props.setdefault(name, (value, params))
+
+
+# --- Writing ---
+def escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def fold(line):
+    """Fold a content line at 75 octets without splitting a UTF-8 sequence."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def vevent(key, event, stamp):
+    day = date.fromisoformat(key)
+    uid = hashlib.sha1(f"{key}\0{event.to_record()}".encode("utf-8")).hexdigest()
+    lines = ["BEGIN:VEVENT", f"UID:{uid}@orion", f"DTSTAMP:{stamp}"]
+    if event.start is None:
+        lines.append(f"DTSTART;VALUE=DATE:{day:%Y%m%d}")
+    else:
+        start = datetime.combine(day, event.start)
+        lines.append(f"DTSTART:{start:%Y%m%dT%H%M%S}")
+        if event.duration is not None:
+            lines.append(f"DTEND:{start + timedelta(minutes=event.duration):%Y%m%dT%H%M%S}")
+    lines.append("SUMMARY:" + escape(event.title))
+    if event.rrule is not None:
+        lines.append(f"RRULE:{event.rrule}")
+        for exdate in sorted(event.exdates):
+            exday = date.fromisoformat(exdate)
+            if event.start is None:
+                lines.append(f"EXDATE;VALUE=DATE:{exday:%Y%m%d}")
+            else:
+                lines.append(f"EXDATE:{datetime.combine(exday, event.start):%Y%m%dT%H%M%S}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def write_events(pairs, f, stats=None):
+    """Write ``(date key, event)`` pairs as a VCALENDAR.
+
+    ``stats`` (a dict) collects "events" and "skipped" (keys that are not
+    dates).
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("events", 0)
+    stats.setdefault("skipped", 0)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    f.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{product_id}\r\nCALSCALE:GREGORIAN\r\n")
+    for key, event in pairs:
+        try:
+            f.write(vevent(key, event, stamp))
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        stats["events"] += 1
+    f.write("END:VCALENDAR\r\n")
+    return stats
+
+
+# --- Store import and export ---
+def import_ics(path, store, batch_size=10000, stats=None):
+    """Stream ``path`` into ``store``; returns the stats with timing."""
+    started = time.perf_counter()
+    stats = stats if stats is not None else {}
+    batch = []
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for pair in read_events(f, stats):
+            batch.append(pair)
+            if len(batch) >= batch_size:
+                store.add_many(batch)
+                batch = []
+        store.add_many(batch)
+    return _timed(stats, started)
+
+
+def export_ics(store, path):
+    started = time.perf_counter()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        stats = write_events(store.iter_events(), f)
+    os.replace(tmp_path, path)
+    return _timed(stats, started)
+
+
+def _timed(stats, started):
+    stats["seconds"] = time.perf_counter() - started
+    stats["events_per_second"] = stats["events"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def describe(stats):
+    text = f"{stats['events']} events in {stats['seconds']:.2f}s ({stats['events_per_second']:,.0f}/s)"
+    if stats.get("skipped"):
+        text += f", {stats['skipped']} skipped"
+    if stats.get("unsupported_rules"):
+        text += f", {stats['unsupported_rules']} unsupported RRULEs imported as single events"
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export calendar events as iCalendar.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help=".ics file")
+    parser.add_argument("--store", default=event_file, help="events file (.json or .db)")
+    args = parser.parse_args()
+
+    store = open_store(args.store)
+    try:
+        if args.command == "import":
+            stats = import_ics(args.path, store)
+            print(f"Imported {describe(stats)}")
+            for error in stats["errors"]:
+                print(f"  skipped {error}")
+        else:
+            print(f"Exported {describe(export_ics(store, args.path))}")
+    finally:
+        store.close()
@@ -0,0 +1,148 @@
+"""Content-addressed cache of generated images.
+
+An image is keyed on everything that determines its pixels: the model, the
+prompt, the seed, the scheduler, the pipeline arguments (steps, size,
+guidance...) and the precision it was computed in (bf16 autocast or the
+weights' own dtype).  The PNG and a small thumbnail are written under
+``image_cache/<key[:2]>/`` and indexed in a SQLite file, so asking for the
+same image again skips the pipeline entirely.  The cache is trimmed to
+``max_bytes``, least recently used first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+image_cache_dir = os.environ.get("ORION_IMAGE_CACHE", "image_cache")
+image_cache_mb = int(os.environ.get("ORION_IMAGE_CACHE_MB", "1024"))
+thumbnail_size = 256
+
+schema = """
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_by_access ON images (accessed);
+"""
+
+
+def image_key(model_id, prompt, seed, scheduler, params, dtype):
+    payload = json.dumps(
+        [model_id, " ".join(prompt.split()), seed, scheduler, params, dtype],
+        ensure_ascii=False, separators=(",", ":"), sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def image_path(key, directory=image_cache_dir):
+    return os.path.join(directory, key[:2], key + ".png")
+
+
+def thumbnail_path(key, directory=image_cache_dir):
+    return os.path.join(directory, key[:2], key + ".thumb.png")
+
+
+class ImageCache:
+    def __init__(self, directory=image_cache_dir, max_bytes=image_cache_mb * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(schema)
+        self.hits = 0
+        self.misses = 0
+
+    def image_path(self, key):
+        return image_path(key, self.directory)
+
+    def thumbnail_path(self, key):
+        return thumbnail_path(key, self.directory)
+
+    def get(self, key):
+        """Return the cached image as an RGB PIL image, or None."""
+        from PIL import Image
+
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM images WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                try:
+                    with Image.open(self.image_path(key)) as image:
+                        image = image.convert("RGB")
+                except OSError:
+                    # The file went missing or is damaged; forget the entry.
+                    with self._db:
+                        self._db.execute("DELETE FROM images WHERE key = ?", (key,))
+                else:
+                    with self._db:
+                        self._db.execute("UPDATE images SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self.hits += 1
+                    return image
+            self.misses += 1
+            return None
+
+    def put(self, key, image, prompt, seed):
+        path = self.image_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((thumbnail_size, thumbnail_size))
+        thumbnail.save(tmp_path, format="PNG")
+        os.replace(tmp_path, self.thumbnail_path(key))
+
+        size = os.path.getsize(path) + os.path.getsize(self.thumbnail_path(key))
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, prompt, seed, image.width, image.height, size, now, now),
+            )
+            self._trim()
+        return path
+
+    def _trim(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM images").fetchone()
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._db.execute("SELECT key, bytes FROM images ORDER BY accessed"):
+            stale.append(key)
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._db.executemany("DELETE FROM images WHERE key = ?", [(key,) for key in stale])
+        for key in stale:
+            for path in (self.image_path(key), self.thumbnail_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM images").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": total,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
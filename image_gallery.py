@@ -0,0 +1,138 @@
+"""Scrolling strip of generated images.
+
+The model only holds each image's cache key and prompt.  ``QListView`` asks
+for the thumbnails of the rows on screen, which are read from the image
+cache and kept in an LRU capped by pixmap bytes, so a session with hundreds
+of generations holds a fixed amount of image memory.  The full-resolution
+file is loaded only when an image is opened.
+"""
+
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSize, Qt
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtWidgets import QDialog, QLabel, QListView, QScrollArea, QVBoxLayout
+
+from image_cache import image_cache_dir, image_path, thumbnail_path, thumbnail_size
+
+gallery_cache_mb = int(os.environ.get("ORION_GALLERY_CACHE_MB", "64"))
+
+
+def _pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+class PixmapCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._pixmaps = OrderedDict()
+
+    def get(self, key):
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self.bytes -= _pixmap_bytes(old)
+        self._pixmaps[key] = pixmap
+        self.bytes += _pixmap_bytes(pixmap)
+        while self.bytes > self.max_bytes and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self.bytes -= _pixmap_bytes(evicted)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.bytes = 0
+
+
+class GalleryModel(QAbstractListModel):
+    KeyRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None, max_bytes=gallery_cache_mb * 1024 * 1024, cache_dir=image_cache_dir):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.pixmaps = PixmapCache(max_bytes)
+        self._entries = []  # (cache key, prompt)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        key, prompt = self._entries[index.row()]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnail(key)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return prompt
+        if role == self.KeyRole:
+            return key
+        return None
+
+    def thumbnail(self, key):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(thumbnail_path(key, self.cache_dir))
+            if pixmap.isNull():
+                # Evicted from the image cache since it was generated.
+                return None
+            self.pixmaps.put(key, pixmap)
+        return pixmap
+
+    def add_image(self, key, prompt, image=None):
+        # A freshly delivered QImage seeds the thumbnail, so a new row does
+        # not read back the file the worker just wrote.
+        if image is not None:
+            thumbnail = image.scaled(
+                thumbnail_size, thumbnail_size,
+                Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation,
+            )
+            self.pixmaps.put(key, QPixmap.fromImage(thumbnail))
+        row = len(self._entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._entries.append((key, prompt))
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries.clear()
+        self.pixmaps.clear()
+        self.endResetModel()
+
+
+class GalleryView(QListView):
+    def __init__(self, model, parent=None, icon_size=160):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(False)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setIconSize(QSize(icon_size, icon_size))
+        self.setGridSize(QSize(icon_size + 8, icon_size + 8))
+        self.setFixedHeight(icon_size + 32)
+        self.model().rowsInserted.connect(lambda parent, first, last: self.scrollToBottom())
+        self.doubleClicked.connect(self.open_image)
+
+    def open_image(self, index):
+        pixmap = QPixmap(image_path(index.data(GalleryModel.KeyRole), self.model().cache_dir))
+        if pixmap.isNull():
+            return
+        dialog = QDialog(self)
+        dialog.setWindowTitle(index.data(Qt.ItemDataRole.ToolTipRole))
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        label = QLabel()
+        label.setPixmap(pixmap)
+        scroll = QScrollArea()
+        scroll.setWidget(label)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(scroll)
+        dialog.resize(min(pixmap.width() + 40, 1000), min(pixmap.height() + 40, 800))
+        dialog.show()
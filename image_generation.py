@@ -0,0 +1,20 @@
+sd_model_id = "CompVis/stable-diffusion-v1-4"
+
+
+def load_pipeline(progress=None, model_id=sd_model_id):
+    report = progress or (lambda detail: None)
+    # torch and diffusers take seconds to import, so they are only pulled in
+    # when a pipeline is actually needed.
+    report("importing torch")
+    import torch
+    report("importing diffusers")
+    from diffusers import StableDiffusionPipeline
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    report(f"loading {model_id} weights")
+    pipeline = StableDiffusionPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32
+    )
+    report(f"moving pipeline to {device}")
+    return pipeline.to(device)
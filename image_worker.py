@@ -0,0 +1,350 @@
+"""Stable Diffusion job queue served by a separate worker process.
+
+The worker process loads the pipeline once and keeps it resident, then runs
+queued prompts one at a time.  Step progress, results and errors come back
+over a queue and are handed to listeners from a pump thread in the GUI
+process, as ``(kind, job_id, payload)``:
+
+    "loading"      None, detail        pipeline load progress
+    "ready"        None, None          pipeline loaded
+    "unavailable"  None, error         pipeline could not be loaded
+    "started"      job_id, None
+    "progress"     job_id, (step, total)
+    "image"        job_id, (index, prompt, width, height, rgb_bytes, cache_key)
+    "done"         job_id, timing
+    "cancelled"    job_id, None
+    "failed"       job_id, error
+
+A job takes one prompt or a list of them, and ``variants=`` images of each
+(at most ``max_variants``; larger requests fail without being queued).
+They are run through the pipeline in batches sized to the memory available
+at the time (``batch_size=`` overrides), and each image is sent back as soon
+as its batch finishes.  Variant n of a prompt is drawn with ``seed + n``
+(``seed=`` defaults to 0), and images already in the ``image_cache`` are sent
+back without running the pipeline.  With ``save_path=`` the worker also
+copies the files out of the cache, numbered ``name_1.png``, ``name_2.png``...
+when there is more than one.
+
+Cancelling takes effect before a queued job starts or at the next denoising
+step of a running one.  Each job runs under an ``sd_profiles`` profile
+(``profile=`` on submit); ``timing`` reports its seconds per image and peak
+RSS, which are also recorded per profile.
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+
+import metrics
+from image_cache import ImageCache, image_key
+from image_generation import load_pipeline, sd_model_id
+from sd_profiles import (
+    ProfileApplier, auto_batch_size, get_profile, peak_rss_mb, record_run, reset_peak_rss
+)
+
+max_variants = 8
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _worker_main(requests, control, events, model_id):
+    try:
+        pipeline = load_pipeline(lambda detail: events.put(("loading", None, detail)), model_id)
+    except Exception as e:
+        events.put(("unavailable", None, str(e)))
+        return
+    applier = ProfileApplier(pipeline)
+    cache = ImageCache()
+    events.put(("ready", None, None))
+
+    cancelled = set()
+
+    def drain_cancels():
+        while True:
+            try:
+                cancelled.add(control.get_nowait())
+            except queue.Empty:
+                return
+
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        job_id, params = message
+        drain_cancels()
+        if job_id in cancelled:
+            cancelled.discard(job_id)
+            events.put(("cancelled", job_id, None))
+            continue
+
+        events.put(("started", job_id, None))
+        params = dict(params)
+        prompts = params.pop("prompt")
+        prompts = [prompts] if isinstance(prompts, str) else list(prompts)
+        variants = params.pop("variants", 1)
+        seed = params.pop("seed", 0)
+        save_path = params.pop("save_path", None)
+        profile = get_profile(params.pop("profile", None))
+        batch_size = params.pop("batch_size", None) or auto_batch_size(profile)
+        # Explicit pipeline arguments override the profile's defaults.
+        params = {**applier.call_kwargs(profile), **params}
+        steps = params["num_inference_steps"]
+
+        # Variant n of a prompt uses seed + n, so repeating a request
+        # reproduces (and hits the cache for) the same images.
+        items = [(prompt, seed + n) for prompt in prompts for n in range(variants)]
+        if not items:
+            events.put(("failed", job_id, "no prompts to generate"))
+            continue
+        dtype = applier.dtype(profile)
+        keys = [image_key(model_id, prompt, item_seed, profile.scheduler, params, dtype) for prompt, item_seed in items]
+
+        def deliver(index, image):
+            key = keys[index]
+            if save_path:
+                shutil.copyfile(cache.image_path(key), _numbered(save_path, index) if len(items) > 1 else save_path)
+            payload = (index, items[index][0], image.width, image.height, image.tobytes(), key)
+            events.put(("image", job_id, payload))
+
+        pending = []
+        offset = 0
+
+        def on_step_end(pipe, step, timestep, callback_kwargs):
+            drain_cancels()
+            if job_id in cancelled:
+                raise JobCancelled()
+            events.put(("progress", job_id, (offset + step + 1, total)))
+            return callback_kwargs
+
+        # Everything that can fail for this job (a cache file evicted under
+        # it, an unwritable save_path) fails the job, not the worker.
+        try:
+            # Items with the same key (a recurring event's occurrences) are
+            # drawn once and the image sent back for each of them.
+            same = {}
+            for index, key in enumerate(keys):
+                same.setdefault(key, []).append(index)
+            for key, indexes in same.items():
+                image = cache.get(key)
+                if image is None:
+                    pending.append(indexes[0])
+                else:
+                    for index in indexes:
+                        deliver(index, image)
+            batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+            total = steps * len(batches)
+            if pending:
+                applier.apply(profile)
+                reset_peak_rss()
+            started = time.perf_counter()
+            for batch in batches:
+                batch_prompts = [items[index][0] for index in batch]
+                generator = [applier.generator(items[index][1]) for index in batch]
+                # Variants of one prompt share a single text encoding.
+                if len(set(batch_prompts)) == 1:
+                    call = {"prompt": batch_prompts[0], "num_images_per_prompt": len(batch)}
+                else:
+                    call = {"prompt": batch_prompts}
+                with applier.autocast(profile):
+                    images = pipeline(callback_on_step_end=on_step_end, generator=generator, **call, **params).images
+                for index, image in zip(batch, images):
+                    image = image.convert("RGB")
+                    cache.put(keys[index], image, *items[index])
+                    for copy in same[keys[index]]:
+                        deliver(copy, image)
+                offset += steps
+            elapsed = time.perf_counter() - started
+        except JobCancelled:
+            cancelled.discard(job_id)
+            events.put(("cancelled", job_id, None))
+            continue
+        except Exception as e:
+            events.put(("failed", job_id, str(e)))
+            continue
+
+        timing = {
+            "profile": profile.name,
+            "images": len(items),
+            "cached": len(items) - sum(len(same[keys[index]]) for index in pending),
+            "batch_size": batch_size,
+            "seconds_per_image": elapsed / len(pending) if pending else 0.0,
+            "peak_rss_mb": peak_rss_mb() if pending else 0.0,
+        }
+        if pending:
+            try:
+                record_run(profile.name, timing["seconds_per_image"], timing["peak_rss_mb"])
+            except OSError as e:
+                print(f"Could not record profile stats: {e}")
+        events.put(("done", job_id, timing))
+
+
+def _numbered(path, index):
+    root, ext = os.path.splitext(path)
+    return f"{root}_{index + 1}{ext}"
+
+
+class ImageWorker:
+    def __init__(self, model_id=sd_model_id):
+        self.model_id = model_id
+        self.error = None
+        self.ready = threading.Event()
+        self.jobs = {}
+        self._submitted = {}  # job id -> perf_counter() at submit
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._pump = None
+        self._ids = itertools.count(1)
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        # Called from the pump thread; Qt code should pass a signal's emit.
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _notify(self, kind, job_id=None, payload=None):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(kind, job_id, payload)
+            except Exception as e:
+                print(f"Image job listener failed: {e}")
+
+    # --- Process lifetime ---
+    def start(self):
+        with self._lock:
+            if self._process is not None:
+                return self
+            self._requests = self._context.Queue()
+            self._control = self._context.Queue()
+            self._events = self._context.Queue()
+            self._process = self._context.Process(
+                target=_worker_main,
+                args=(self._requests, self._control, self._events, self.model_id),
+                name="image-worker",
+                daemon=True,
+            )
+            self._process.start()
+            self._pump = threading.Thread(target=self._pump_events, name="image-events", daemon=True)
+            self._pump.start()
+        return self
+
+    def wait_ready(self, progress=None):
+        """Block until the pipeline is loaded, forwarding load progress."""
+
+        def forward(kind, job_id, payload):
+            if kind == "loading" and progress is not None:
+                progress(payload)
+
+        self.add_listener(forward)
+        try:
+            self.start()
+            while not self.ready.wait(0.5):
+                if self.error is not None:
+                    break
+        finally:
+            self.remove_listener(forward)
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self
+
+    def shutdown(self, timeout=5.0):
+        with self._lock:
+            process, self._process = self._process, None
+        if process is None:
+            return
+        self._requests.put(None)
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+
+    def _pump_events(self):
+        while True:
+            process = self._process
+            try:
+                kind, job_id, payload = self._events.get(timeout=1.0)
+            except queue.Empty:
+                if process is None:
+                    return
+                if not process.is_alive():
+                    self._worker_died(f"image worker exited with code {process.exitcode}")
+                    return
+                continue
+            if kind == "ready":
+                self.ready.set()
+            elif kind == "unavailable":
+                self._worker_died(payload)
+                return
+            elif kind in ("done", "cancelled", "failed"):
+                self.jobs.pop(job_id, None)
+                self._record(kind, job_id, payload)
+            self._notify(kind, job_id, payload)
+
+    def _worker_died(self, error):
+        self.error = error
+        self._notify("unavailable", None, error)
+        for job_id in list(self.jobs):
+            self.jobs.pop(job_id, None)
+            self._record("failed", job_id, error)
+            self._notify("failed", job_id, error)
+
+    def _record(self, kind, job_id, payload):
+        # The pipeline runs in the worker process, so its timings are
+        # recorded here from the job events.
+        submitted = self._submitted.pop(job_id, None)
+        if submitted is not None:
+            metrics.record("image.job", time.perf_counter() - submitted, status=kind)
+        if kind == "done":
+            metrics.count("image.cached", payload["cached"])
+            if payload["images"] > payload["cached"]:
+                metrics.record("image.per_image", payload["seconds_per_image"], profile=payload["profile"])
+
+    # --- Jobs ---
+    def submit(self, prompt, **params):
+        job_id = next(self._ids)
+        if self.error is not None:
+            self._notify("failed", job_id, self.error)
+            return job_id
+        if not 1 <= params.get("variants", 1) <= max_variants:
+            self._notify("failed", job_id, f"variants must be between 1 and {max_variants}")
+            return job_id
+        self.start()
+        params["prompt"] = prompt
+        self._submitted[job_id] = time.perf_counter()
+        self.jobs[job_id] = params
+        self._requests.put((job_id, params))
+        return job_id
+
+    def cancel(self, job_id):
+        if job_id in self.jobs:
+            self._control.put(job_id)
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_image_worker():
+    # Created unstarted; the process is spawned by the first submit() or by
+    # warming the "image" feature.
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ImageWorker()
+        return _worker
@@ -0,0 +1,297 @@
+"""Queued, shared access to the Ollama chat models.
+
+Every chat request in the app goes through one ``LLMDispatcher``:
+
+- Requests wait in a bounded priority queue and are sent one at a time, so
+  a question typed while an event is being parsed or a conversation
+  summarized goes first (INTERACTIVE before PARSE before BACKGROUND).
+  Ollama generates one answer at a time anyway; the queue only decides who
+  waits.
+- A request identical to one already queued or running (same model,
+  messages and options) joins it instead of starting a second generation.
+  Every caller gets the whole answer, streamed from the first chunk.
+- The configured models are loaded as soon as Ollama is up (and again
+  after it restarts), and every request carries ``keep_alive``, so the
+  first question after start-up or a quiet spell does not wait for a
+  model load.
+- ``route`` sends short, simple questions to ``ORION_SMALL_MODEL`` when
+  one is configured.
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+import metrics
+from ollama_client import OllamaError, get_client, get_monitor
+
+chat_model = os.environ.get("ORION_CHAT_MODEL", "mistral")
+small_model = os.environ.get("ORION_SMALL_MODEL", "")  # e.g. "llama3.2:1b"; empty turns routing off
+keep_alive = os.environ.get("ORION_KEEP_ALIVE", "30m")
+preload_models = os.environ.get("ORION_PRELOAD_MODELS", f"{chat_model},{small_model}")
+queue_limit = int(os.environ.get("ORION_LLM_QUEUE", "16"))
+
+INTERACTIVE, PARSE, BACKGROUND = 0, 1, 2
+
+simple_words = 12
+complex_pattern = re.compile(
+    r"\b(why|how|explain|plan|summari[sz]e|compare|suggest|recommend|write|draft|organi[sz]e|optimi[sz]e)\b",
+    re.IGNORECASE,
+)
+
+
+def is_simple(question):
+    """Short lookups ("what's on friday?") rather than reasoning or writing."""
+    return len(question.split()) <= simple_words and not complex_pattern.search(question)
+
+
+def request_key(model, messages, stream, fields):
+    data = json.dumps([model, messages, stream, fields], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class _Request:
+    def __init__(self, key, model, messages, stream, fields, priority):
+        self.key = key
+        self.model = model
+        self.messages = messages
+        self.stream = stream
+        self.fields = fields
+        self.priority = priority
+        self.queued = time.perf_counter()
+        self.callers = 0
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.changed = threading.Condition()
+
+    def push(self, chunk):
+        with self.changed:
+            self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    def finish(self, error=None):
+        with self.changed:
+            self.error = error
+            self.done = True
+            self.changed.notify_all()
+
+
+class _Reply:
+    def __init__(self, dispatcher, request):
+        self._dispatcher = dispatcher
+        self._request = request
+        self._left = False
+
+    @property
+    def done(self):
+        return self._request.done
+
+    def result(self):
+        request = self._request
+        try:
+            with request.changed:
+                while not request.done:
+                    request.changed.wait()
+            if request.error is not None:
+                raise OllamaError(str(request.error))
+            return request.chunks[0]
+        finally:
+            self.close()
+
+    def close(self):
+        # A stream may be closed from another thread (a Stop button) while
+        # its reader waits, so leaving is checked and done under the lock.
+        with self._dispatcher._lock:
+            if self._left:
+                return
+            self._left = True
+            self._dispatcher._leave(self._request)
+
+    def __del__(self):
+        self.close()
+
+
+class _Stream(_Reply):
+    def __init__(self, dispatcher, request):
+        super().__init__(dispatcher, request)
+        self._seen = 0
+
+    def close(self):
+        super().close()
+        # Wake a reader still waiting for its next chunk.
+        with self._request.changed:
+            self._request.changed.notify_all()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        request = self._request
+        if self._left:
+            raise StopIteration
+        with request.changed:
+            while self._seen == len(request.chunks) and not request.done and not self._left:
+                request.changed.wait()
+            if self._left:
+                raise StopIteration
+            if self._seen < len(request.chunks):
+                self._seen += 1
+                return request.chunks[self._seen - 1]
+        self.close()
+        if request.error is not None:
+            raise OllamaError(str(request.error))
+        raise StopIteration
+
+
+class LLMDispatcher:
+    def __init__(self, client=None, limit=queue_limit, keep_alive=keep_alive):
+        self.client = client or get_client()
+        self.limit = limit
+        self.keep_alive = keep_alive
+        self._heap = []  # (priority, seq, request)
+        self._inflight = {}  # request key -> request, queued or running
+        self._seq = itertools.count()
+        # Re-entrant: a reply dropped by the garbage collector leaves its
+        # request from whatever thread is running, possibly under the lock.
+        self._lock = threading.RLock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    # --- Routing and preloading ---
+    def route(self, question, model=chat_model):
+        if small_model and is_simple(question):
+            return small_model
+        return model
+
+    def preload(self, models=None):
+        """Queue a load of ``models`` (default: ``ORION_PRELOAD_MODELS``)."""
+        names = models or [name.strip() for name in preload_models.split(",")]
+        for model in dict.fromkeys(name for name in names if name):
+            try:
+                # An empty chat loads the model and starts its keep-alive.
+                self._submit(model, [], False, {}, BACKGROUND, detached=True)
+            except OllamaError as e:
+                print(f"Could not preload {model}: {e}")
+
+    def preload_when_running(self, monitor):
+        # Loaded once Ollama answers, and again whenever it comes back.
+        monitor.add_listener(lambda running: running and self.preload())
+
+    # --- Requests ---
+    def chat(self, model, messages, stream=False, priority=INTERACTIVE, **fields):
+        """``OllamaClient.chat`` through the queue.
+
+        A stream is an iterator of chunks; closing it (or dropping it), even
+        before the first chunk, leaves the request, which is cancelled once
+        no caller is left.  It may be closed from another thread, which ends
+        a wait for the next chunk.  Raises ``OllamaError``, also when the queue is
+        full.
+        """
+        if stream:
+            return _Stream(self, self._submit(model, messages, True, fields, priority))
+        return self.submit(model, messages, priority, **fields).result()
+
+    def submit(self, model, messages, priority=BACKGROUND, **fields):
+        """Queue a chat without waiting; ``reply.result()`` waits for the answer."""
+        return _Reply(self, self._submit(model, messages, False, fields, priority))
+
+    def _submit(self, model, messages, stream, fields, priority, detached=False):
+        key = request_key(model, messages, stream, fields)
+        with self._lock:
+            request = self._inflight.get(key)
+            if request is not None and not request.cancelled:
+                if not detached:
+                    request.callers += 1
+                    metrics.count("llm.coalesced")
+                return request
+            if len(self._heap) >= self.limit:
+                raise OllamaError(f"{len(self._heap)} requests are already waiting for the model")
+            request = _Request(key, model, messages, stream, fields, priority)
+            request.callers = 0 if detached else 1
+            self._inflight[key] = request
+            heapq.heappush(self._heap, (priority, next(self._seq), request))
+            self._wake.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-dispatcher", daemon=True)
+                self._thread.start()
+        return request
+
+    def _leave(self, request):
+        with self._lock:
+            request.callers -= 1
+            if request.callers <= 0 and not request.done:
+                # Nobody is waiting for the answer any more.
+                request.cancelled = True
+                if self._inflight.get(request.key) is request:
+                    del self._inflight[request.key]
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._heap:
+                    self._wake.wait()
+                _, _, request = heapq.heappop(self._heap)
+            if request.cancelled:
+                request.finish()
+                continue
+            metrics.record("llm.queue_wait", time.perf_counter() - request.queued, priority=request.priority)
+            self._execute(request)
+
+    def _execute(self, request):
+        error = None
+        fields = {"keep_alive": self.keep_alive, **request.fields}
+        try:
+            if request.stream:
+                stream = self.client.chat(request.model, request.messages, stream=True, **fields)
+                try:
+                    for chunk in stream:
+                        request.push(chunk)
+                        if request.cancelled:
+                            break
+                finally:
+                    # Dropping the stream stops the generation server-side.
+                    stream.close()
+            else:
+                request.push(self.client.chat(request.model, request.messages, **fields))
+        except OllamaError as e:
+            error = e
+        except Exception as e:
+            error = OllamaError(str(e))
+        with self._lock:
+            if self._inflight.get(request.key) is request:
+                del self._inflight[request.key]
+        request.finish(error)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+_watching = False
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = LLMDispatcher()
+        return _dispatcher
+
+
+def watch_ollama():
+    """The shared health monitor, started with the chat models preloaded
+    whenever Ollama comes up, so the first question skips the model load."""
+    global _watching
+    monitor = get_monitor()
+    with _dispatcher_lock:
+        if _watching:
+            return monitor
+        _watching = True
+    get_dispatcher().preload_when_running(monitor)
+    return monitor
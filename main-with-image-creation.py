@@ -1,37 +1,102 @@
-import sys
+import time
+app_started = time.perf_counter()
+
 import os
-import json
-import torch
-import speech_recognition as sr
+import sys
 from datetime import datetime
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QLineEdit,
-    QWidget, QCalendarWidget, QMessageBox, QLabel
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
+    QWidget, QMessageBox, QLabel
 )
-from PyQt6.QtCore import QTimer
-from PyQt6.QtGui import QIcon
-from diffusers import StableDiffusionPipeline
-from PIL import Image
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QIcon, QKeySequence, QShortcut
+from calendar_engine import CalendarEngine
+from chat_worker import ChatWorker
+from event_calendar import EventCalendar
+from feature_loader import features, report_time_to_window, warm_features
+from image_worker import get_image_worker, max_variants
+from llm_dispatcher import watch_ollama
+from metrics_panel import MetricsPanel
+from panes import LogView
+from parse_worker import ParseWorker
+from sd_profiles import default_profile, describe, profiles
+from event_model import as_event
+from event_parser import event_command, summary
+from voice_worker import ContinuousVoiceWorker, VoiceWorker
 
 class CalendarAI(QMainWindow):
+    ollama_status_changed = pyqtSignal(bool)
+    feature_progress = pyqtSignal(str, str, str)
+    reminders_changed = pyqtSignal()
+    image_event = pyqtSignal(str, object, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("AI Calendar Assistant")
         self.setGeometry(100, 100, 800, 600)
 
+        self.engine = CalendarEngine()
         self.init_ui()
-        self.events = self.load_events()
-        self.pipeline = None
-
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_reminders)
-        self.timer.start(3600000)  # check every hour
+        self.image_files = {}
+        self.image_profile = default_profile
+        self.chat_worker = None
+        self.parse_workers = []
+        self.voice_worker = None
+        self.voice_listener = None
+
+        self.reminders = self.engine.reminders
+        self.reminders_changed.connect(self.arm_reminder_timer)
+        self._reminder_listener = self.reminders_changed.emit
+        self.reminders.add_listener(self._reminder_listener)
+        self.reminder_timer = QTimer(self)
+        self.reminder_timer.setSingleShot(True)
+        self.reminder_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.reminder_timer.timeout.connect(self.check_reminders)
+        self.arm_reminder_timer()
+
+        self.ollama_ready = None
+        self.ollama_status_changed.connect(self.handle_ollama_status)
+        self._ollama_listener = self.ollama_status_changed.emit
+        self.ollama_monitor = watch_ollama()
+        self.ollama_monitor.add_listener(self._ollama_listener)
+
+        self.feature_progress.connect(self.show_feature_progress)
+        self._feature_listener = self.feature_progress.emit
+        features.add_listener(self._feature_listener)
+
+        self.image_worker = get_image_worker()
+        self.image_event.connect(self.handle_image_event)
+        self._image_listener = self.image_event.emit
+        self.image_worker.add_listener(self._image_listener)
+
+    def after_show(self):
+        report_time_to_window(app_started)
+        # The image pipeline stays on first use here; it costs gigabytes.
+        warm_features(["voice"])
+
+    def show_feature_progress(self, name, state, detail):
+        if state == "loading":
+            self.statusBar().showMessage(f"⏳ Loading {name}: {detail}")
+        elif state == "ready":
+            self.statusBar().showMessage(f"✅ {name.capitalize()} ready ({detail})")
+        else:
+            self.statusBar().showMessage(f"⚠️ {name.capitalize()} unavailable: {detail}")
+
+    def handle_ollama_status(self, running):
+        first_check = self.ollama_ready is None
+        self.ollama_ready = running
+        if running:
+            if not first_check:
+                self.output_text.append("✅ Ollama is running again.")
+        elif first_check:
+            self.output_text.append("⚠️ Ollama is not running. Start it to use /ask; the assistant reconnects automatically.")
+        else:
+            self.output_text.append("⚠️ Lost connection to Ollama.")
 
     def init_ui(self):
         main_layout = QVBoxLayout()
 
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
+        self.output_text = LogView()
         main_layout.addWidget(self.output_text)
 
         input_layout = QHBoxLayout()
@@ -43,9 +108,14 @@ class CalendarAI(QMainWindow):
         send_button.clicked.connect(self.handle_input)
         input_layout.addWidget(send_button)
 
-        mic_button = QPushButton("🎤")
-        mic_button.clicked.connect(self.listen_voice)
-        input_layout.addWidget(mic_button)
+        self.mic_button = QPushButton("🎤")
+        self.mic_button.clicked.connect(lambda: self.listen_voice())
+        input_layout.addWidget(self.mic_button)
+
+        self.stop_button = QPushButton("⏹")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.cancel_ai)
+        input_layout.addWidget(self.stop_button)
 
         main_layout.addLayout(input_layout)
 
@@ -69,7 +139,7 @@ class CalendarAI(QMainWindow):
 
         main_layout.addLayout(button_layout)
 
-        self.calendar = QCalendarWidget()
+        self.calendar = EventCalendar(self.engine.day_counts)
         self.calendar.clicked.connect(self.display_events_for_date)
         main_layout.addWidget(self.calendar)
 
@@ -77,6 +147,10 @@ class CalendarAI(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
+        self.metrics_panel = None
+        self.metrics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), self)
+        self.metrics_shortcut.activated.connect(self.show_metrics)
+
     def handle_input(self):
         text = self.input_field.text().strip()
         self.input_field.clear()
@@ -88,66 +162,141 @@ class CalendarAI(QMainWindow):
             self.respond_ai(text[4:].strip())
         elif text.lower().startswith("/image"):
             self.generate_image(text[6:].strip())
+        elif text.lower().startswith("/illustrate"):
+            self.illustrate_month()
+        elif text.lower().startswith("/cancel"):
+            self.cancel_images(text[7:].strip())
+        elif text.lower().startswith("/profile"):
+            self.set_image_profile(text[8:].strip().lower())
+        elif text.lower().startswith("/voice"):
+            self.listen_voice(text[6:].strip() or None)
+        elif text.lower().startswith("/listen"):
+            self.toggle_listening(text[7:].strip().lower() != "off")
         else:
-            self.output_text.append("🤖: Please use /event, /ask, or /image commands.")
-
-    def listen_voice(self):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            self.output_text.append("🎙️ Listening...")
-            audio = recognizer.listen(source)
-
-        try:
-            text = recognizer.recognize_google(audio)
-            self.input_field.setText(text)
-            self.handle_input()
-        except sr.UnknownValueError:
-            self.output_text.append("🤖: Sorry, could not understand the audio.")
-        except sr.RequestError as e:
-            self.output_text.append(f"🤖: Could not request results; {e}")
+            self.output_text.append("🤖: Please use /event, /ask, /image, /illustrate, /cancel, /profile, /voice, or /listen commands.")
+
+    def listen_voice(self, wav_path=None):
+        if self.voice_listener is not None:
+            self.output_text.append("🤖: Already listening; use /listen off first.")
+            return
+        if self.voice_worker is not None:
+            # A second press ends the utterance without waiting for silence.
+            self.voice_worker.stop()
+            return
+        self.output_text.append("🎙️ Listening..." if not wav_path else f"🎙️ Transcribing {wav_path}...")
+        self.mic_button.setText("⏹🎤")
+        self.voice_worker = VoiceWorker(wav_path, parent=self)
+        self.voice_worker.partial_result.connect(self.input_field.setText)
+        self.voice_worker.latency_measured.connect(
+            lambda seconds: self.statusBar().showMessage(f"🎤 Transcribed {seconds:.2f}s after you stopped speaking")
+        )
+        self.voice_worker.recognition_complete.connect(self.process_voice_input)
+        self.voice_worker.recognition_failed.connect(lambda error: self.output_text.append(f"🤖: {error}"))
+        self.voice_worker.finished.connect(self.voice_worker_finished)
+        self.voice_worker.start()
+
+    def toggle_listening(self, enabled):
+        if not enabled:
+            if self.voice_listener is not None:
+                self.voice_listener.stop()
+            return
+        if self.voice_listener is not None:
+            return
+        self.output_text.append("👂 Listening until /listen off...")
+        self.mic_button.setEnabled(False)
+        self.voice_listener = ContinuousVoiceWorker(parent=self)
+        self.voice_listener.partial_result.connect(self.input_field.setText)
+        self.voice_listener.latency_measured.connect(
+            lambda seconds: self.statusBar().showMessage(f"🎤 Transcribed {seconds:.2f}s after you stopped speaking")
+        )
+        self.voice_listener.recognition_complete.connect(self.process_voice_input)
+        self.voice_listener.recognition_failed.connect(lambda error: self.output_text.append(f"🤖: {error}"))
+        self.voice_listener.finished.connect(self.voice_listener_finished)
+        self.voice_listener.start()
+
+    def voice_listener_finished(self):
+        self.voice_listener.deleteLater()
+        self.voice_listener = None
+        self.mic_button.setEnabled(True)
+        self.output_text.append("👂 Stopped listening.")
+
+    def process_voice_input(self, text):
+        event_text = event_command(text)
+        self.input_field.setText(f"/event {event_text}" if event_text else text)
+        self.handle_input()
+
+    def voice_worker_finished(self):
+        self.voice_worker.deleteLater()
+        self.voice_worker = None
+        self.mic_button.setText("🎤")
 
     def add_event(self, event_text):
-        selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
-        if selected_date not in self.events:
-            self.events[selected_date] = []
-        self.events[selected_date].append(event_text)
-        self.save_events()
-        self.output_text.append(f"📌 Event added on {selected_date}: {event_text}")
+        if not event_text:
+            self.output_text.append("🤖: Usage: /event dentist next Tuesday 3pm for an hour")
+            return
+        parsed = self.engine.parse(event_text, llm=False)
+        if parsed is None or parsed.ambiguous:
+            # Only text the rules could not place waits for the LLM, and
+            # not on the GUI thread.
+            self.statusBar().showMessage("⏳ Reading the event...")
+            worker = ParseWorker(event_text, self.engine, self)
+            worker.parsed.connect(self.file_event)
+            worker.finished.connect(lambda: self.parse_worker_finished(worker))
+            self.parse_workers.append(worker)
+            worker.start()
+            return
+        self.file_event(event_text, parsed)
+
+    def parse_worker_finished(self, worker):
+        self.parse_workers.remove(worker)
+        worker.deleteLater()
+
+    def file_event(self, event_text, parsed):
+        # Without a date in the text the event goes on the selected day.
+        if parsed is not None and parsed.source == "llm":
+            self.statusBar().showMessage("🤖 Event read by the LLM")
+        date = parsed.date if parsed is not None and parsed.date else self.calendar.selectedDate().toString("yyyy-MM-dd")
+        event = parsed.event if parsed is not None else as_event(event_text)
+        self.engine.add(event, date)
+        self.output_text.append(f"📌 Event added on {date}: {summary(event)}")
 
     def display_events_for_date(self):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
-        events = self.events.get(selected_date, [])
+        events = self.engine.events(selected_date)
         if events:
-            self.output_text.append(f"📆 Events on {selected_date}:\n" + "\n".join(events))
+            self.output_text.append(f"📆 Events on {selected_date}:\n" + "\n".join(map(str, events)))
         else:
             self.output_text.append(f"📆 No events for {selected_date}.")
 
     def show_daily_events(self):
         today = datetime.now().strftime("%Y-%m-%d")
-        events = self.events.get(today, [])
+        events = self.engine.events(today)
         if events:
-            self.output_text.append(f"📅 Today's Events:\n" + "\n".join(events))
+            self.output_text.append(f"📅 Today's Events:\n" + "\n".join(map(str, events)))
         else:
             self.output_text.append("📅 No events today.")
 
     def show_monthly_events(self):
-        current_month = datetime.now().strftime("%Y-%m")
-        self.output_text.append(f"📅 Events for {current_month}:")
-        found = False
-        for date, items in self.events.items():
-            if date.startswith(current_month):
-                self.output_text.append(f"{date}:\n  - " + "\n  - ".join(items))
-                found = True
-        if not found:
+        now = datetime.now()
+        self.output_text.append(f"📅 Events for {now.strftime('%Y-%m')}:")
+        month_events = self.engine.month(now.year, now.month)
+        for date, items in month_events:
+            self.output_text.append(f"{date}:\n  - " + "\n  - ".join(map(str, items)))
+        if not month_events:
             self.output_text.append("No events this month.")
 
     def confirm_clear_events(self):
         confirm = QMessageBox.question(self, "Clear Events", "Are you sure you want to delete all events?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
-            self.events = {}
-            self.save_events()
+            self.engine.clear()
             self.output_text.append("🗑️ All events cleared.")
 
+    def show_metrics(self):
+        if self.metrics_panel is None:
+            self.metrics_panel = MetricsPanel(self)
+        self.metrics_panel.show()
+        self.metrics_panel.raise_()
+
     def toggle_calendar(self):
         if self.calendar.isVisible():
             self.calendar.hide()
@@ -157,40 +306,164 @@ class CalendarAI(QMainWindow):
             self.toggle_calendar_btn.setText("Hide Calendar")
 
     def respond_ai(self, question):
-        # Dummy logic – replace with real AI call or local LLM
-        self.output_text.append(f"🤖: Let me think about '{question}'... Here’s a possible answer!")
+        if self.chat_worker is not None:
+            self.output_text.append("🤖: Still answering the previous question.")
+            return
+        if not self.ollama_monitor.is_running(wait=2.0):
+            self.output_text.append("⚠️ Ollama is not running. Please start Ollama and try again.")
+            return
+        self.output_text.append("🤖: ")
+        self.chat_worker = ChatWorker(question, self.engine, parent=self)
+        self.chat_worker.cache_hit.connect(
+            lambda stats: self.statusBar().showMessage(f"⚡ Answered from cache ({stats['hits']} hits, {stats['misses']} misses)")
+        )
+        self.chat_worker.token_received.connect(self.append_token)
+        self.chat_worker.first_token.connect(
+            lambda seconds: self.statusBar().showMessage(f"⏱ First token after {seconds:.2f}s")
+        )
+        self.chat_worker.response_cancelled.connect(lambda text: self.output_text.append("⏹ Generation stopped."))
+        self.chat_worker.response_failed.connect(self.ai_failed)
+        self.chat_worker.finished.connect(self.chat_worker_finished)
+        self.stop_button.setEnabled(True)
+        self.statusBar().showMessage("⏳ Waiting for the first token...")
+        self.chat_worker.start()
+
+    def cancel_ai(self):
+        if self.chat_worker is not None:
+            self.chat_worker.cancel()
+
+    def append_token(self, token):
+        self.output_text.write(token)
+
+    def ai_failed(self, error):
+        self.output_text.append(f"⚠️ Error talking to Ollama: {error}")
+        self.ollama_monitor.check_now()
+
+    def chat_worker_finished(self):
+        self.chat_worker.deleteLater()
+        self.chat_worker = None
+        self.stop_button.setEnabled(False)
 
     def generate_image(self, prompt):
-        if not self.pipeline:
-            self.output_text.append("🔄 Loading Stable Diffusion pipeline...")
-            model_id = "CompVis/stable-diffusion-v1-4"
-            self.pipeline = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32)
-            self.pipeline.to("cuda" if torch.cuda.is_available() else "cpu")
-        self.output_text.append(f"🎨 Generating image for prompt: '{prompt}'")
-        image = self.pipeline(prompt).images[0]
-        filename = f"generated_{datetime.now().strftime('%Y%m%d%H%M%S')}.png"
-        image.save(filename)
-        self.output_text.append(f"🖼️ Image saved as {filename}")
+        # "/image x4 seed=7 a lighthouse at dusk" asks for four variants
+        # drawn with seeds 7-10; the same request again comes from the cache.
+        # At most ``max_variants`` are drawn per request.
+        variants, seed = 1, 0
+        while True:
+            option, _, rest = prompt.partition(" ")
+            if option[:1].lower() == "x" and option[1:].isdigit() and rest:
+                variants = int(option[1:])
+                if not 1 <= variants <= max_variants:
+                    self.output_text.append(f"⚠️ /image takes x1 to x{max_variants} variants.")
+                    return
+            elif option.lower().startswith("seed=") and option[5:].isdigit() and rest:
+                seed = int(option[5:])
+            else:
+                break
+            prompt = rest.strip()
+        self.submit_images(prompt, variants, seed)
+
+    def illustrate_month(self):
+        now = datetime.now()
+        prompts = [f"An illustration of {event.title}" for date, events in self.engine.month(now.year, now.month) for event in events]
+        if not prompts:
+            self.output_text.append("📭 No events this month to illustrate.")
+            return
+        self.submit_images(prompts)
+
+    def submit_images(self, prompt, variants=1, seed=0):
+        if not features.is_ready("image"):
+            self.output_text.append("🔄 Loading Stable Diffusion pipeline; the prompt is queued...")
+            features.warm(["image"])
+        # The worker process writes the file, so the GUI never encodes PNGs.
+        filename = f"generated_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.png"
+        job_id = self.image_worker.submit(
+            prompt, variants=variants, seed=seed, save_path=filename, profile=self.image_profile
+        )
+        self.image_files[job_id] = filename
+        what = f"prompt: '{prompt}' × {variants}" if isinstance(prompt, str) else f"{len(prompt)} event illustrations"
+        self.output_text.append(f"🎨 Image job {job_id} queued for {what} (/cancel {job_id} to stop it)")
+
+    def set_image_profile(self, name):
+        if name in profiles:
+            self.image_profile = name
+            self.output_text.append(f"🎛️ Image profile set to {describe(name)}")
+            return
+        lines = [("▶ " if n == self.image_profile else "  ") + describe(n) for n in profiles]
+        self.output_text.append("🎛️ Image profiles (/profile <name> to switch):\n" + "\n".join(lines))
+
+    def cancel_images(self, job_id):
+        if job_id.isdigit():
+            self.image_worker.cancel(int(job_id))
+        else:
+            self.image_worker.cancel_all()
+
+    def handle_image_event(self, kind, job_id, payload):
+        if kind == "started":
+            self.output_text.append(f"🎨 Generating image for job {job_id}...")
+        elif kind == "progress":
+            step, total = payload
+            self.statusBar().showMessage(f"🎨 Image job {job_id}: step {step}/{total}")
+        elif kind == "image":
+            index, prompt = payload[:2]
+            self.output_text.append(f"🖼️ Image {index + 1} of job {job_id} ready: '{prompt}'")
+        elif kind == "done":
+            timing = payload
+            filename = self.image_files.pop(job_id)
+            if timing["images"] > 1:
+                root, ext = os.path.splitext(filename)
+                filename = f"{root}_1{ext} … {root}_{timing['images']}{ext}"
+            self.output_text.append(
+                f"🖼️ Saved {filename} ({timing['images']} images, {timing['cached']} from cache, "
+                f"batches of {timing['batch_size']}, "
+                f"{timing['profile']}: {timing['seconds_per_image']:.1f}s/image, {timing['peak_rss_mb'] / 1024:.1f} GB peak)"
+            )
+        elif kind == "cancelled":
+            self.image_files.pop(job_id, None)
+            self.output_text.append(f"⏹ Image job {job_id} cancelled.")
+        elif kind == "failed":
+            self.image_files.pop(job_id, None)
+            self.output_text.append(f"⚠️ Image job {job_id} failed: {payload}")
+
+    def arm_reminder_timer(self):
+        # One timer for the next due reminder; very long waits are re-armed
+        # on the way so the interval stays well inside QTimer's range.
+        delay = min(self.reminders.seconds_until_next(), 6 * 3600)
+        self.reminder_timer.start(int(delay * 1000) + 50)
 
     def check_reminders(self):
-        today = datetime.now().strftime("%Y-%m-%d")
-        todays_events = self.events.get(today, [])
-        if todays_events:
-            reminders = "\n".join(f"🔔 {event}" for event in todays_events)
-            QMessageBox.information(self, "Today's Reminders", reminders)
-
-    def load_events(self):
-        if os.path.exists("events.json"):
-            with open("events.json", "r") as f:
-                return json.load(f)
-        return {}
-
-    def save_events(self):
-        with open("events.json", "w") as f:
-            json.dump(self.events, f, indent=2)
+        due = self.reminders.pop_due()
+        self.arm_reminder_timer()
+        if due:
+            reminders = "\n".join(f"🔔 {event}" for date, event in due)
+            QMessageBox.information(self, "Reminders", reminders)
+
+    def closeEvent(self, event):
+        self.ollama_monitor.remove_listener(self._ollama_listener)
+        features.remove_listener(self._feature_listener)
+        self.image_worker.remove_listener(self._image_listener)
+        self.image_worker.shutdown()
+        self.reminders.remove_listener(self._reminder_listener)
+        if self.chat_worker is not None:
+            # The answer may still be using the store and the dispatcher.
+            self.chat_worker.cancel()
+            self.chat_worker.wait()
+        for worker in self.parse_workers:
+            # Nothing is filed once the window is closing.
+            worker.cancel()
+            worker.wait()
+        for worker in (self.voice_worker, self.voice_listener):
+            if worker is not None:
+                worker.stop()
+                worker.wait()
+        self.engine.close()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = CalendarAI()
     window.show()
+    if "--metrics" in sys.argv:
+        window.show_metrics()
+    QTimer.singleShot(0, window.after_show)
     sys.exit(app.exec())
@@ -1,77 +1,59 @@
+import time
+app_started = time.perf_counter()
+
 import sys
-import json
-import ollama
-import speech_recognition as sr
-import requests
 from PyQt6.QtWidgets import (
-    QApplication, QTextEdit, QVBoxLayout, QWidget, QPushButton, 
-    QLineEdit, QCalendarWidget, QLabel, QMessageBox, QInputDialog, QHBoxLayout
+    QApplication, QVBoxLayout, QWidget, QPushButton, 
+    QLineEdit, QLabel, QMessageBox, QInputDialog, QHBoxLayout
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QDate, QTimer
-from datetime import datetime
-
-event_file = "events.json"
-
-def load_events():
-    try:
-        with open(event_file, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-def save_events(events):
-    with open(event_file, "w") as f:
-        json.dump(events, f, indent=4)
-
-def is_ollama_running():
-    try:
-        response = requests.get("http://localhost:11434")
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
-
-class VoiceRecognitionThread(QThread):
-    recognition_complete = pyqtSignal(str)
-
-    def run(self):
-        recognizer = sr.Recognizer()
-        with sr.Microphone() as source:
-            try:
-                audio = recognizer.listen(source, timeout=15, phrase_time_limit=30)
-                text = recognizer.recognize_google(audio)
-                self.recognition_complete.emit(text)
-            except sr.UnknownValueError:
-                self.recognition_complete.emit("🤔 Could not understand the audio.")
-            except sr.RequestError:
-                self.recognition_complete.emit("⚠️ Speech service unavailable.")
-            except sr.WaitTimeoutError:
-                self.recognition_complete.emit("⏳ No speech detected.")
+from PyQt6.QtCore import Qt, pyqtSignal, QDate, QTimer
+from PyQt6.QtGui import QKeySequence, QShortcut
+from calendar_engine import CalendarEngine
+from chat_worker import ChatWorker
+from event_calendar import EventCalendar
+from event_model import as_event
+from event_parser import event_command, summary
+from feature_loader import features, report_time_to_window, warm_features
+from llm_dispatcher import watch_ollama
+from metrics_panel import MetricsPanel
+from panes import ListPane, LogView, MonthModel
+from parse_worker import ParseWorker
+from voice_worker import ContinuousVoiceWorker, VoiceWorker
 
 class CalendarAI(QWidget):
+    ollama_status_changed = pyqtSignal(bool)
+    feature_progress = pyqtSignal(str, str, str)
+    reminders_changed = pyqtSignal()
+    events_changed = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("AI Calendar Assistant")
         self.setGeometry(200, 200, 900, 600)
-        self.events = load_events()
+        self.engine = CalendarEngine()
         self.pending_event = None
+        self.chat_worker = None
+        self.parse_workers = []
+        self.voice_worker = None
+        self.voice_listener = None
 
         self.layout = QVBoxLayout()
 
         self.event_list_label = QLabel("📆 Events This Month:")
         self.layout.addWidget(self.event_list_label)
 
-        self.monthly_event_display = QTextEdit(self)
-        self.monthly_event_display.setReadOnly(True)
+        self.month_model = MonthModel(self)
+        self.monthly_event_display = ListPane(self.month_model, self, placeholder="No events this month.")
         self.monthly_event_display.setFixedHeight(80)
         self.layout.addWidget(self.monthly_event_display)
 
-        self.calendar = QCalendarWidget(self)
+        self.calendar = EventCalendar(self.engine.day_counts, self)
         self.calendar.setFixedSize(400, 300)
         self.calendar.clicked.connect(self.confirm_event)
+        self.calendar.currentPageChanged.connect(self.update_monthly_events)
         self.layout.addWidget(self.calendar)
 
-        self.event_display = QTextEdit(self)
-        self.event_display.setReadOnly(True)
+        self.event_display = LogView(self)
         self.event_display.setFixedHeight(180)
         self.layout.addWidget(self.event_display)
 
@@ -80,6 +62,9 @@ class CalendarAI(QWidget):
         self.input_field.returnPressed.connect(self.send_message)
         self.layout.addWidget(self.input_field)
 
+        self.chat_status_label = QLabel("")
+        self.layout.addWidget(self.chat_status_label)
+
         button_layout = QHBoxLayout()
 
         self.add_button = QPushButton("➕ Add Event", self)
@@ -98,10 +83,20 @@ class CalendarAI(QWidget):
         self.voice_button.clicked.connect(self.start_voice_input)
         button_layout.addWidget(self.voice_button)
 
+        self.listen_button = QPushButton("👂 Always Listen", self)
+        self.listen_button.setCheckable(True)
+        self.listen_button.toggled.connect(self.toggle_listening)
+        button_layout.addWidget(self.listen_button)
+
         self.ask_ai_button = QPushButton("🧠 Ask AI", self)
         self.ask_ai_button.clicked.connect(self.send_message)
         button_layout.addWidget(self.ask_ai_button)
 
+        self.stop_button = QPushButton("⏹ Stop", self)
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.cancel_message)
+        button_layout.addWidget(self.stop_button)
+
         self.minimize_button = QPushButton("📉 Minimize Calendar", self)
         self.minimize_button.clicked.connect(self.toggle_calendar)
         button_layout.addWidget(self.minimize_button)
@@ -109,26 +104,95 @@ class CalendarAI(QWidget):
         self.layout.addLayout(button_layout)
         self.setLayout(self.layout)
 
+        self.metrics_panel = None
+        self.metrics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), self)
+        self.metrics_shortcut.activated.connect(self.show_metrics)
+
+        self.reminders = self.engine.reminders
+        self.reminders_changed.connect(self.arm_reminder_timer)
+        self._reminder_listener = self.reminders_changed.emit
+        self.reminders.add_listener(self._reminder_listener)
         self.reminder_timer = QTimer(self)
+        self.reminder_timer.setSingleShot(True)
+        self.reminder_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.reminder_timer.timeout.connect(self.check_reminders)
-        self.reminder_timer.start(60000)
+        self.arm_reminder_timer()
 
         self.update_monthly_events()
-
-        # Check Ollama on start
-        if not is_ollama_running():
+        self.events_changed.connect(self.refresh_changed_days)
+        self._store_listener = self.events_changed.emit
+        self.engine.store.subscribe(self._store_listener)
+
+        # Ollama is probed in the background; the result arrives as a signal
+        self.ollama_ready = None
+        self.ollama_status_changed.connect(self.handle_ollama_status)
+        self._ollama_listener = self.ollama_status_changed.emit
+        self.ollama_monitor = watch_ollama()
+        self.ollama_monitor.add_listener(self._ollama_listener)
+
+        self.feature_progress.connect(self.show_feature_progress)
+        self._feature_listener = self.feature_progress.emit
+        features.add_listener(self._feature_listener)
+
+    def after_show(self):
+        report_time_to_window(app_started)
+        # Speech recognition is warmed in the background so the first
+        # "Voice Input" press does not wait for the import.
+        warm_features(["voice"])
+
+    def show_feature_progress(self, name, state, detail):
+        if state == "loading":
+            self.chat_status_label.setText(f"⏳ Loading {name}: {detail}")
+        elif state == "ready":
+            self.chat_status_label.setText(f"✅ {name.capitalize()} ready ({detail})")
+        else:
+            self.chat_status_label.setText(f"⚠️ {name.capitalize()} unavailable: {detail}")
+
+    def handle_ollama_status(self, running):
+        first_check = self.ollama_ready is None
+        self.ollama_ready = running
+        if running:
+            if not first_check:
+                self.event_display.append("✅ Ollama is running again.\n")
+        elif first_check:
             QMessageBox.critical(
                 self,
                 "Ollama Not Running",
-                "⚠️ Failed to connect to Ollama.\n\nPlease:\n1. Install Ollama: https://ollama.com/download\n2. Open it so it runs in the background.\n\nAfter starting Ollama, re-open this app."
+                "⚠️ Failed to connect to Ollama.\n\nPlease:\n1. Install Ollama: https://ollama.com/download\n2. Open it so it runs in the background.\n\nThe assistant reconnects automatically once Ollama is running."
             )
+        else:
+            self.event_display.append("⚠️ Lost connection to Ollama.\n")
 
     def prepare_event(self):
-        self.pending_event = self.input_field.text().strip()
-        if not self.pending_event:
+        text = self.input_field.text().strip()
+        if not text:
             QMessageBox.warning(self, "Input Error", "Please enter an event before adding.")
             return
 
+        parsed = self.engine.parse(text, llm=False)
+        if parsed is None or parsed.ambiguous:
+            # Only text the rules could not place waits for the LLM, and
+            # not on the GUI thread.
+            self.chat_status_label.setText("⏳ Reading the event...")
+            worker = ParseWorker(text, self.engine, self)
+            worker.parsed.connect(self.route_event)
+            worker.finished.connect(lambda: self.parse_worker_finished(worker))
+            self.parse_workers.append(worker)
+            worker.start()
+            return
+        self.route_event(text, parsed)
+
+    def parse_worker_finished(self, worker):
+        self.parse_workers.remove(worker)
+        worker.deleteLater()
+
+    def route_event(self, text, parsed):
+        self.chat_status_label.setText("🤖 Event read by the LLM" if parsed is not None and parsed.source == "llm" else "")
+        self.pending_event = parsed.event if parsed is not None else text
+        if parsed is not None and parsed.date:
+            self.confirm_event(QDate.fromString(parsed.date, "yyyy-MM-dd"))
+            return
+
         choice, ok = QInputDialog.getItem(self, "Date Selection", "How do you want to select the date?", ["Click on Calendar", "Enter Date"], 0, False)
 
         if ok:
@@ -146,82 +210,212 @@ class CalendarAI(QWidget):
             else:
                 date = date.toString("yyyy-MM-dd")
 
-            if date not in self.events:
-                self.events[date] = []
-            self.events[date].append(self.pending_event)
-            save_events(self.events)
-            self.event_display.append(f"📅 {date}: {self.pending_event}\n")
-            self.update_monthly_events()
+            self.engine.add(as_event(self.pending_event), date)
+            self.event_display.append(f"📅 {date}: {summary(as_event(self.pending_event))}\n")
             self.input_field.clear()
             self.pending_event = None
 
     def clear_event(self):
         date = self.calendar.selectedDate().toString("yyyy-MM-dd")
-        events = self.events.get(date, [])
+        events = self.engine.events(date)
 
         if not events:
             QMessageBox.information(self, "Clear Event", "No events to remove for this date.")
             return
 
-        event, ok = QInputDialog.getItem(self, "Clear Event", "Select event to remove:", events, 0, False)
-
-        if ok and event:
-            self.events[date].remove(event)
-            if not self.events[date]:
-                del self.events[date]
-            save_events(self.events)
-            self.update_monthly_events()
+        names = [str(e) for e in events]
+        name, ok = QInputDialog.getItem(self, "Clear Event", "Select event to remove:", names, 0, False)
+
+        if ok and name:
+            event = events[names.index(name)]
+            if event.rrule is None:
+                self.engine.remove(date, event)
+                return
+            answer = QMessageBox.question(
+                self, "Clear Event", f"{name} repeats. Delete every occurrence, not just {date}?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel,
+            )
+            if answer == QMessageBox.StandardButton.Yes:
+                self.engine.remove_series(date, event)
+            elif answer == QMessageBox.StandardButton.No:
+                self.engine.remove(date, event)
 
     def clear_all_events(self):
         confirm = QMessageBox.question(self, "Clear All", "Are you sure you want to delete all events?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
-            self.events = {}
-            save_events(self.events)
-            self.update_monthly_events()
+            self.engine.clear()
             self.event_display.clear()
 
     def send_message(self):
         user_input = self.input_field.text().strip()
-        if not user_input:
+        if not user_input or self.chat_worker is not None:
             return
 
         self.input_field.clear()
         self.event_display.append(f"🧑‍💻 You: {user_input}\n")
 
-        if not is_ollama_running():
+        # Only waits if the first background probe has not finished yet
+        if not self.ollama_monitor.is_running(wait=2.0):
             self.event_display.append("⚠️ Ollama is not running. Please open Ollama from your Start Menu or Applications.\n")
             return
 
-        try:
-            response = ollama.chat(model="mistral", messages=[{"role": "user", "content": user_input}])
-            ai_response = response['message']['content']
-            self.event_display.append(f"🤖 AI: {ai_response}\n")
-        except Exception as e:
-            self.event_display.append(f"⚠️ Error talking to Ollama: {str(e)}\n")
+        self.event_display.append("🤖 AI: ")
+        self.chat_status_label.setText("⏳ Waiting for the first token...")
+        self.chat_worker = ChatWorker(user_input, self.engine, parent=self)
+        self.chat_worker.cache_hit.connect(self.show_cache_hit)
+        self.chat_worker.token_received.connect(self.append_token)
+        self.chat_worker.first_token.connect(self.show_first_token_time)
+        self.chat_worker.response_complete.connect(self.finish_response)
+        self.chat_worker.response_cancelled.connect(self.cancel_response)
+        self.chat_worker.response_failed.connect(self.fail_response)
+        self.chat_worker.finished.connect(self.chat_worker_finished)
+        self.stop_button.setEnabled(True)
+        self.chat_worker.start()
+
+    def cancel_message(self):
+        if self.chat_worker is not None:
+            self.chat_worker.cancel()
+
+    def append_token(self, token):
+        self.event_display.write(token)
+
+    def show_first_token_time(self, seconds):
+        self.chat_status_label.setText(f"⏱ First token after {seconds:.2f}s")
+
+    def show_cache_hit(self, stats):
+        self.chat_status_label.setText(f"⚡ Answered from cache ({stats['hits']} hits, {stats['misses']} misses)")
+
+    def finish_response(self, text):
+        self.event_display.append("")
+
+    def cancel_response(self, text):
+        self.event_display.append("⏹ Generation stopped.\n")
+
+    def fail_response(self, error):
+        self.event_display.append(f"⚠️ Error talking to Ollama: {error}\n")
+        self.ollama_monitor.check_now()
+
+    def chat_worker_finished(self):
+        self.chat_worker.deleteLater()
+        self.chat_worker = None
+        self.stop_button.setEnabled(False)
 
     def start_voice_input(self):
+        if self.voice_listener is not None:
+            return
+        if self.voice_worker is not None:
+            # A second press ends the utterance without waiting for silence.
+            self.voice_worker.stop()
+            return
         self.event_display.append("🎤 Listening...\n")
-        self.voice_thread = VoiceRecognitionThread()
-        self.voice_thread.recognition_complete.connect(self.process_voice_input)
-        self.voice_thread.start()
+        self.voice_button.setText("⏹ Done Speaking")
+        self.voice_worker = VoiceWorker(parent=self)
+        self.voice_worker.partial_result.connect(self.input_field.setText)
+        self.voice_worker.latency_measured.connect(self.show_voice_latency)
+        self.voice_worker.recognition_complete.connect(self.process_voice_input)
+        self.voice_worker.recognition_failed.connect(self.event_display.append)
+        self.voice_worker.finished.connect(self.voice_worker_finished)
+        self.voice_worker.start()
+
+    def toggle_listening(self, enabled):
+        if not enabled:
+            if self.voice_listener is not None:
+                self.voice_listener.stop()
+            return
+        if self.voice_listener is not None:
+            return
+        self.event_display.append("👂 Listening until switched off...\n")
+        self.voice_button.setEnabled(False)
+        self.voice_listener = ContinuousVoiceWorker(parent=self)
+        self.voice_listener.partial_result.connect(self.input_field.setText)
+        self.voice_listener.latency_measured.connect(self.show_voice_latency)
+        self.voice_listener.recognition_complete.connect(self.process_voice_input)
+        self.voice_listener.recognition_failed.connect(self.event_display.append)
+        self.voice_listener.finished.connect(self.voice_listener_finished)
+        self.voice_listener.start()
+
+    def voice_listener_finished(self):
+        self.voice_listener.deleteLater()
+        self.voice_listener = None
+        self.voice_button.setEnabled(True)
+        self.listen_button.setChecked(False)
+
+    def show_voice_latency(self, seconds):
+        self.chat_status_label.setText(f"🎤 Transcribed {seconds:.2f}s after you stopped speaking")
 
     def process_voice_input(self, text):
-        self.input_field.setText(text)
-        self.send_message()
+        event_text = event_command(text)
+        self.input_field.setText(event_text or text)
+        if event_text:
+            self.prepare_event()
+        else:
+            self.send_message()
+
+    def voice_worker_finished(self):
+        self.voice_worker.deleteLater()
+        self.voice_worker = None
+        self.voice_button.setText("🎙️ Voice Input")
+
+    def show_metrics(self):
+        if self.metrics_panel is None:
+            self.metrics_panel = MetricsPanel(self)
+        self.metrics_panel.show()
+        self.metrics_panel.raise_()
 
     def toggle_calendar(self):
         self.calendar.setVisible(not self.calendar.isVisible())
 
-    def update_monthly_events(self):
-        month_events = [f"{date}: {', '.join(events)}" for date, events in sorted(self.events.items())]
-        self.monthly_event_display.setText("\n".join(month_events) if month_events else "No events this month.")
+    def update_monthly_events(self, year=None, month=None):
+        if year is None:
+            year, month = self.calendar.yearShown(), self.calendar.monthShown()
+        self.month_model.set_month(year, month, self.engine.month(year, month))
+
+    def refresh_changed_days(self, dates):
+        # Store changes update just the rows of the days that changed.
+        if dates is None:
+            self.update_monthly_events()
+            return
+        for key in dates:
+            if self.month_model.contains(key):
+                self.month_model.update_day(key, self.engine.events(key))
+
+    def arm_reminder_timer(self):
+        # One timer for the next due reminder; very long waits are re-armed
+        # on the way so the interval stays well inside QTimer's range.
+        delay = min(self.reminders.seconds_until_next(), 6 * 3600)
+        self.reminder_timer.start(int(delay * 1000) + 50)
 
     def check_reminders(self):
-        today = datetime.today().strftime("%Y-%m-%d")
-        if today in self.events:
-            QMessageBox.information(self, "Reminder", f"📌 Today's Events:\n{', '.join(self.events[today])}")
-
-app = QApplication(sys.argv)
-window = CalendarAI()
-window.show()
-sys.exit(app.exec())
+        due = self.reminders.pop_due()
+        self.arm_reminder_timer()
+        if due:
+            QMessageBox.information(self, "Reminder", "\n".join(f"📌 {event}" for date, event in due))
+
+    def closeEvent(self, event):
+        self.ollama_monitor.remove_listener(self._ollama_listener)
+        features.remove_listener(self._feature_listener)
+        self.reminders.remove_listener(self._reminder_listener)
+        self.engine.store.unsubscribe(self._store_listener)
+        if self.chat_worker is not None:
+            # The answer may still be using the store and the dispatcher.
+            self.chat_worker.cancel()
+            self.chat_worker.wait()
+        for worker in self.parse_workers:
+            # Nothing is filed once the window is closing.
+            worker.cancel()
+            worker.wait()
+        for worker in (self.voice_worker, self.voice_listener):
+            if worker is not None:
+                worker.stop()
+                worker.wait()
+        self.engine.close()
+        super().closeEvent(event)
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = CalendarAI()
+    window.show()
+    if "--metrics" in sys.argv:
+        window.show_metrics()
+    QTimer.singleShot(0, window.after_show)
+    sys.exit(app.exec())
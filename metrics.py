@@ -0,0 +1,245 @@
+"""Latency spans, counters and percentile histograms.
+
+Collection is off unless ``ORION_METRICS=1`` is set or a window is started
+with ``--metrics``.  While it is off ``span()`` hands back one shared
+do-nothing context manager and ``record()``/``count()`` return at once, so
+the instrumented paths cost a function call.
+
+    with metrics.span("ollama.chat", model=model):
+        ...
+    metrics.record("image.per_image", seconds)
+    metrics.count("assistant.cache_hit")
+
+Durations go into log-bucketed histograms (within 5% of the true value,
+fixed memory however long the session) for p50/p95/p99, and the most recent
+spans are kept for export as JSON lines or as a Chrome trace
+(chrome://tracing, Perfetto).
+
+    python metrics.py spans.jsonl
+    python metrics.py spans.jsonl --chrome trace.json
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+metrics_enabled = os.environ.get("ORION_METRICS", "") not in ("", "0")
+trace_limit = int(os.environ.get("ORION_METRICS_SPANS", "100000"))
+bucket_growth = 1.05
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        bucket = math.ceil(math.log(micros, bucket_growth))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Seconds below which ``q`` percent of the samples fall."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(bucket_growth ** bucket / 1e6, self.min), self.max)
+        return self.max
+
+
+class Metrics:
+    def __init__(self, trace_limit=trace_limit):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.spans = deque(maxlen=trace_limit)  # (name, start ns, duration ns, thread id, args)
+        self.started = time.perf_counter_ns()
+
+    def record(self, name, seconds, start_ns=None, args=None):
+        if start_ns is None:
+            start_ns = time.perf_counter_ns() - int(seconds * 1e9)
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+            self.spans.append((name, start_ns, int(seconds * 1e9), threading.get_ident(), args))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def counts(self):
+        with self._lock:
+            return sorted(self.counters.items())
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.spans.clear()
+
+    # --- Reporting ---
+    def summary(self):
+        """``{operation: {count, p50_ms, p95_ms, p99_ms, max_ms, total_ms}}``."""
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count,
+                    "p50_ms": h.percentile(50) * 1000,
+                    "p95_ms": h.percentile(95) * 1000,
+                    "p99_ms": h.percentile(99) * 1000,
+                    "max_ms": h.max * 1000,
+                    "total_ms": h.total * 1000,
+                }
+                for name, h in sorted(self.histograms.items())
+            }
+
+    def report(self):
+        lines = [f"{'operation':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name:<28} {s['count']:>7} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}"
+            )
+        lines.extend(f"{name:<28} {value:>7}" for name, value in self.counts())
+        return "\n".join(lines)
+
+    # --- Export ---
+    def records(self):
+        """The kept spans as dicts: name, ts and dur in microseconds, tid, args."""
+        with self._lock:
+            spans = list(self.spans)
+        return [
+            {"name": name, "ts": (start - self.started) / 1000, "dur": duration / 1000, "tid": tid, "args": args or {}}
+            for name, start, duration, tid, args in spans
+        ]
+
+    def export_jsonl(self, path):
+        records = self.records()
+        return _write_atomic(path, lambda f: f.writelines(json.dumps(r) + "\n" for r in records), len(records))
+
+    def export_chrome_trace(self, path):
+        records = self.records()
+        return _write_atomic(path, lambda f: json.dump(chrome_trace(records, os.getpid()), f), len(records))
+
+
+def chrome_trace(records, pid=0):
+    """Trace Event Format "complete" events for JSONL-style span records."""
+    return {
+        "traceEvents": [
+            {
+                "name": r["name"], "cat": r["name"].split(".", 1)[0], "ph": "X",
+                "ts": r["ts"], "dur": r["dur"], "pid": pid, "tid": r["tid"], "args": r["args"],
+            }
+            for r in records
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+def _write_atomic(path, write, count):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        write(f)
+    os.replace(tmp_path, path)
+    return count
+
+
+# --- Instrumentation ---
+class _Span:
+    __slots__ = ("metrics", "name", "args", "start")
+
+    def __init__(self, metrics, name, args):
+        self.metrics = metrics
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter_ns() - self.start
+        if exc_type is not None:
+            self.args = {**(self.args or {}), "error": exc_type.__name__}
+        self.metrics.record(self.name, elapsed / 1e9, self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_null_span = _NullSpan()
+_metrics = Metrics() if metrics_enabled else None
+_metrics_lock = threading.Lock()
+
+
+def enable():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
+
+
+def get_metrics():
+    """The recorder, or None while collection is off."""
+    return _metrics
+
+
+def span(name, **args):
+    metrics = _metrics
+    if metrics is None:
+        return _null_span
+    return _Span(metrics, name, args or None)
+
+
+def record(name, seconds, **args):
+    metrics = _metrics
+    if metrics is not None:
+        metrics.record(name, seconds, args=args or None)
+
+
+def count(name, n=1):
+    metrics = _metrics
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize or convert exported spans.")
+    parser.add_argument("spans", help="JSON lines file exported from the metrics panel")
+    parser.add_argument("--chrome", metavar="PATH", help="write a Chrome trace here instead of a summary")
+    args = parser.parse_args()
+
+    with open(args.spans, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if args.chrome:
+        print(f"Wrote {_write_atomic(args.chrome, lambda f: json.dump(chrome_trace(records), f), len(records))} spans")
+    else:
+        metrics = Metrics()
+        for r in records:
+            metrics.record(r["name"], r["dur"] / 1e6)
+        print(metrics.report())
@@ -0,0 +1,94 @@
+"""Live table of the ``metrics`` timings.
+
+Hidden by default: the windows open it with Ctrl+Shift+M, or at start-up
+when run with ``--metrics``.  Opening it switches collection on.
+"""
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import (
+    QDialog, QFileDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout
+)
+
+import metrics
+
+columns = ["Operation", "Count", "p50 ms", "p95 ms", "p99 ms", "Max ms"]
+
+
+class MetricsPanel(QDialog):
+    def __init__(self, parent=None, interval_ms=1000):
+        super().__init__(parent)
+        self.setWindowTitle("Metrics")
+        self.resize(640, 420)
+        self.metrics = metrics.enable()
+
+        self.table = QTableWidget(0, len(columns), self)
+        self.table.setHorizontalHeaderLabels(columns)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.counters_label = QLabel("")
+        self.status_label = QLabel("")
+
+        buttons = QHBoxLayout()
+        for text, slot in (
+            ("Export JSON lines…", self.export_jsonl),
+            ("Export Chrome trace…", self.export_chrome_trace),
+            ("Reset", self.reset),
+        ):
+            button = QPushButton(text, self)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.table)
+        layout.addWidget(self.counters_label)
+        layout.addLayout(buttons)
+        layout.addWidget(self.status_label)
+
+        # Refreshed only while the panel is on screen.
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = self.metrics.summary()
+        self.table.setRowCount(len(summary))
+        for row, (name, stats) in enumerate(summary.items()):
+            cells = [name, str(stats["count"])] + [
+                f"{stats[key]:.2f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+            ]
+            for column, text in enumerate(cells):
+                item = self.table.item(row, column)
+                if item is None:
+                    self.table.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+        self.counters_label.setText("   ".join(f"{name}: {value}" for name, value in self.metrics.counts()))
+
+    def export_jsonl(self):
+        self._export("Export spans", "metrics.jsonl", "JSON lines (*.jsonl)", self.metrics.export_jsonl)
+
+    def export_chrome_trace(self):
+        self._export("Export Chrome trace", "trace.json", "Chrome trace (*.json)", self.metrics.export_chrome_trace)
+
+    def _export(self, title, default, filter, export):
+        path, _ = QFileDialog.getSaveFileName(self, title, default, filter)
+        if not path:
+            return
+        try:
+            self.status_label.setText(f"Wrote {export(path)} spans to {path}")
+        except OSError as e:
+            self.status_label.setText(f"Export failed: {e}")
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
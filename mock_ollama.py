@@ -0,0 +1,143 @@
+"""A stand-in for the Ollama HTTP server.
+
+Speaks enough of Ollama's protocol for the app and the benchmarks: ``GET /``
+for health probes, ``POST /api/chat`` (streamed as one JSON object per line,
+or as a single object with ``"stream": false``) and ``POST /api/embeddings``.
+Replies are canned, with a configurable delay before the first token and
+between tokens, so chat latency can be measured without a model.
+
+    python mock_ollama.py --port 11434 --first-token-ms 300 --token-ms 20
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOllama:
+    def __init__(self, port=0, first_token_ms=50, token_ms=5, tokens=20, reply="This is a canned reply."):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.reply = reply
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def chunks(self):
+        words = self.reply.split()
+        return [words[i % len(words)] + " " for i in range(self.tokens)]
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small chunk writes on a kept-alive connection otherwise wait
+            # ~40ms for the client's delayed ACK, as Ollama's do not.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._send(200, b"Ollama is running", "text/plain")
+
+            def do_POST(self):
+                mock.requests += 1
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError:
+                    self._send(400, b'{"error": "invalid JSON"}')
+                    return
+                if self.path == "/api/chat":
+                    self._chat(body)
+                elif self.path == "/api/embeddings":
+                    # A stable vector per prompt, so reranking is repeatable.
+                    digest = hashlib.sha256(body.get("prompt", "").encode("utf-8")).digest()
+                    vector = [b / 255 for b in digest[:16]]
+                    self._send(200, json.dumps({"embedding": vector}).encode())
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+            def _chat(self, body):
+                model = body.get("model", "mock")
+                time.sleep(mock.first_token_ms / 1000)
+                if not body.get("stream", True):
+                    content = "".join(mock.chunks())
+                    reply = {"model": model, "message": {"role": "assistant", "content": content}, "done": True}
+                    self._send(200, json.dumps(reply).encode())
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i, token in enumerate(mock.chunks()):
+                        if i:
+                            time.sleep(mock.token_ms / 1000)
+                        self._chunk({"model": model, "message": {"role": "assistant", "content": token}, "done": False})
+                    self._chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the stream.
+                    pass
+
+            def _chunk(self, obj):
+                data = json.dumps(obj).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send(self, status, data, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve canned Ollama replies.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--first-token-ms", type=float, default=50)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+
+    server = MockOllama(args.port, args.first_token_ms, args.token_ms, args.tokens)
+    print(f"Mock Ollama on {server.host}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,189 @@
+"""Shared HTTP client for the local Ollama server.
+
+All chat traffic and health probes go through one ``requests.Session`` so
+connections are kept alive between calls, and every request carries an
+explicit timeout.  ``HealthMonitor`` probes the server on a background
+thread and caches the result, so the send path never waits on the network
+just to find out whether Ollama is up.
+"""
+
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+ollama_host = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+
+
+class OllamaError(Exception):
+    pass
+
+
+class OllamaClient:
+    def __init__(self, host=ollama_host, connect_timeout=2.0, read_timeout=120.0, probe_timeout=1.0):
+        if "://" not in host:
+            host = "http://" + host
+        self.host = host.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.probe_timeout = (connect_timeout, probe_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def ping(self):
+        with metrics.span("ollama.ping"):
+            try:
+                response = self.session.get(self.host, timeout=self.probe_timeout)
+                return response.status_code == 200
+            except requests.exceptions.RequestException:
+                return False
+
+    def chat(self, model, messages, stream=False, **fields):
+        payload = {"model": model, "messages": messages, "stream": stream}
+        payload.update(fields)
+        return self._post("/api/chat", payload, stream)
+
+    def embeddings(self, model, prompt):
+        return self._post("/api/embeddings", {"model": model, "prompt": prompt}, False)["embedding"]
+
+    def _post(self, path, payload, stream):
+        # Streamed calls are timed to the response headers here, and to the
+        # first and last chunk in ``_iter_chunks``.
+        name = "ollama." + path.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        with metrics.span(name + ".connect" if stream else name, model=payload.get("model")):
+            try:
+                response = self.session.post(self.host + path, json=payload, stream=stream, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                raise OllamaError(str(e)) from e
+            if response.status_code >= 400:
+                message = response.text
+                response.close()
+                try:
+                    message = json.loads(message)["error"]
+                except (ValueError, KeyError, TypeError):
+                    pass
+                raise OllamaError(message)
+            if not stream:
+                return response.json()
+        return self._iter_chunks(response, name, started)
+
+    def _iter_chunks(self, response, name, started):
+        # Ollama streams one JSON object per line.  Closing this generator
+        # closes the response, which aborts the generation server-side.
+        first = True
+        with response:
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise OllamaError(chunk["error"])
+                    if first:
+                        metrics.record(name + ".first_token", time.perf_counter() - started)
+                        first = False
+                    yield chunk
+            except requests.exceptions.RequestException as e:
+                raise OllamaError(str(e)) from e
+            finally:
+                metrics.record(name + ".stream", time.perf_counter() - started)
+
+
+class HealthMonitor:
+    def __init__(self, client, interval=10.0, retry_interval=3.0):
+        self.client = client
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.running = False
+        self.checked = threading.Event()
+        self._listeners = []
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        # Listeners are called from the monitor thread with the new state.
+        # Qt code should pass a signal's ``emit`` so delivery is queued onto
+        # the GUI thread.
+        with self._lock:
+            self._listeners.append(listener)
+            notify = self.checked.is_set()
+        if notify:
+            listener(self.running)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def check_now(self):
+        self._wake.set()
+
+    def is_running(self, wait=None):
+        if wait is not None:
+            self.checked.wait(wait)
+        return self.running
+
+    def _run(self):
+        while not self._stopped:
+            # Clear before pinging: a check_now() during the ping then cuts
+            # the following wait short instead of being lost.
+            self._wake.clear()
+            state = self.client.ping()
+            with self._lock:
+                changed = state != self.running or not self.checked.is_set()
+                self.running = state
+                self.checked.set()
+                listeners = list(self._listeners) if changed else []
+            for listener in listeners:
+                try:
+                    listener(state)
+                except Exception as e:
+                    print(f"Ollama health listener failed: {e}")
+            self._wake.wait(self.interval if state else self.retry_interval)
+
+
+_client = None
+_monitor = None
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _shared_lock:
+        if _client is None:
+            _client = OllamaClient()
+        return _client
+
+
+def get_monitor():
+    global _monitor
+    client = get_client()
+    with _shared_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor(client).start()
+        return _monitor
+
+
+def is_ollama_running(wait=None):
+    with metrics.span("ollama.is_running"):
+        return get_monitor().is_running(wait)
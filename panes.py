@@ -0,0 +1,202 @@
+"""List-backed panes for the chat log and the month's events.
+
+Both are ``QListView``s over small models with uniform row heights, so a
+change inserts, updates or removes single rows and the view repaints only
+what is on screen.  ``LogView`` keeps the ``append``/``clear`` calls of the
+``QTextEdit`` logs it replaces, plus ``write`` for streamed tokens.  Its
+model holds one row per line and at most ``ORION_SCROLLBACK`` of them;
+older lines are appended to a session file under ``ORION_SCROLLBACK_DIR``,
+so a long session costs the same memory and redraw time as a short one.
+
+``MonthModel`` holds one row per day with events for the page the calendar
+shows and is updated a day at a time from store changes.
+"""
+
+import bisect
+import os
+from datetime import datetime
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt6.QtGui import QGuiApplication, QKeySequence, QPainter
+from PyQt6.QtWidgets import QAbstractItemView, QListView
+
+from calendar_engine import day_line
+from event_index import month_bounds
+
+scrollback = int(os.environ.get("ORION_SCROLLBACK", "1000"))  # lines kept in memory
+scrollback_dir = os.environ.get("ORION_SCROLLBACK_DIR", "scrollback")
+
+
+class LogModel(QAbstractListModel):
+    def __init__(self, parent=None, limit=scrollback, name="chat", spill_dir=scrollback_dir):
+        super().__init__(parent)
+        self.limit = limit
+        self.spill_path = os.path.join(spill_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.log")
+        self.spilled = 0
+        self._lines = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self._lines[index.row()]
+        return None
+
+    def append(self, text):
+        """Start a new entry, one row per line of ``text``."""
+        lines = str(text).split("\n")
+        row = len(self._lines)
+        self.beginInsertRows(QModelIndex(), row, row + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+        self._trim()
+
+    def write(self, text):
+        """Continue the last row, starting new rows at line breaks."""
+        if not self._lines:
+            self.append(text)
+            return
+        first, *rest = str(text).split("\n")
+        if first:
+            row = len(self._lines) - 1
+            self._lines[row] += first
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+        if rest:
+            self.append("\n".join(rest))
+
+    def clear(self):
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+    def _trim(self):
+        excess = len(self._lines) - self.limit
+        if excess <= 0:
+            return
+        # Trimmed a tenth of the limit at a time, so the view does not
+        # shift its rows on every new line.
+        count = min(len(self._lines), max(excess, self.limit // 10))
+        self._spill(self._lines[:count])
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        del self._lines[:count]
+        self.endRemoveRows()
+
+    def _spill(self, lines):
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(line + "\n" for line in lines)
+            self.spilled += len(lines)
+        except OSError as e:
+            # The lines are dropped; the pane keeps working.
+            print(f"Could not save chat scrollback: {e}")
+
+
+class ListPane(QListView):
+    """Read-only list view with uniform rows, Ctrl+C and a placeholder."""
+
+    def __init__(self, model, parent=None, placeholder=""):
+        super().__init__(parent)
+        self.setModel(model)
+        self.placeholder = placeholder
+        self.setUniformItemSizes(True)
+        self.setWordWrap(False)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            model = self.model()
+            QGuiApplication.clipboard().setText("\n".join(model.data(model.index(row)) for row in rows))
+            return
+        super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.placeholder and not self.model().rowCount():
+            painter = QPainter(self.viewport())
+            painter.setPen(self.palette().placeholderText().color())
+            painter.drawText(self.viewport().rect().adjusted(4, 2, -4, -2), Qt.AlignmentFlag.AlignLeft, self.placeholder)
+
+
+class LogView(ListPane):
+    def __init__(self, parent=None, limit=scrollback, name="chat"):
+        model = LogModel(None, limit, name)
+        super().__init__(model, parent)
+        model.setParent(self)
+        self._follow = True
+        self.verticalScrollBar().valueChanged.connect(self._track_bottom)
+        self.model().rowsInserted.connect(self._scroll)
+        self.model().dataChanged.connect(self._scroll)
+
+    def append(self, text):
+        self.model().append(text)
+
+    def write(self, text):
+        self.model().write(text)
+
+    def clear(self):
+        self.model().clear()
+
+    def _track_bottom(self, value):
+        # Only follow new lines while the user has not scrolled up.
+        self._follow = value >= self.verticalScrollBar().maximum()
+
+    def _scroll(self, *args):
+        if self._follow:
+            self.scrollToBottom()
+
+
+class MonthModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.start = self.end = None
+        self._keys = []
+        self._events = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return day_line(self._keys[index.row()], self._events[index.row()])
+        return None
+
+    def set_month(self, year, month, days):
+        """Show ``days``, the ``(date key, events)`` pairs of the month."""
+        self.beginResetModel()
+        self.start, self.end = (day.isoformat() for day in month_bounds(year, month))
+        self._keys = [key for key, _ in days]
+        self._events = [list(events) for _, events in days]
+        self.endResetModel()
+
+    def contains(self, key):
+        return self.start is not None and self.start <= key <= self.end
+
+    def update_day(self, key, events):
+        """Insert, change or remove the row for ``key``."""
+        if not self.contains(key):
+            return
+        row = bisect.bisect_left(self._keys, key)
+        present = row < len(self._keys) and self._keys[row] == key
+        if present and events:
+            self._events[row] = list(events)
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+        elif present:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._keys[row], self._events[row]
+            self.endRemoveRows()
+        elif events:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._keys.insert(row, key)
+            self._events.insert(row, list(events))
+            self.endInsertRows()
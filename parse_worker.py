@@ -0,0 +1,26 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+class ParseWorker(QThread):
+    """Reads one event the rules were unsure about, off the GUI thread.
+
+    ``CalendarEngine.parse`` may ask the LLM, which takes seconds.  The
+    result arrives on ``parsed`` as ``(text, ParsedEvent or None)``; after
+    ``cancel()`` (the window closing) nothing is delivered.
+    """
+
+    parsed = pyqtSignal(str, object)
+
+    def __init__(self, text, engine, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.engine = engine
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        result = self.engine.parse(self.text)
+        if not self._cancelled:
+            self.parsed.emit(self.text, result)
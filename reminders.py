@@ -0,0 +1,221 @@
+"""Reminder scheduling over the event store.
+
+Upcoming reminder instants are kept in a min-heap.  The GUI arms one
+single-shot timer for ``seconds_until_next()`` and calls ``pop_due()`` when
+it fires, so nothing wakes up between reminders.  Store changes reschedule
+only the dates they touch, and delivered reminders are remembered in
+``reminders_delivered.json`` so each one fires once, across restarts too,
+until its event is removed.
+
+An event reminds ``lead`` minutes before its start time, or a time written
+in its title ("dentist at 3pm"); an event without a time reminds once at
+``day_start`` on its day, or as soon as the app is running after that.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+from datetime import datetime, time, timedelta
+
+from event_index import parse_date
+
+reminder_lead = int(os.environ.get("ORION_REMINDER_LEAD", "10"))  # minutes
+day_start = time.fromisoformat(os.environ.get("ORION_REMINDER_DAY_START", "08:00"))
+delivered_file = "reminders_delivered.json"
+
+clock_pattern = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\s*([ap]m)?\b", re.IGNORECASE)
+hour_pattern = re.compile(r"\b(1[0-2]|0?[1-9])\s*([ap]m)\b", re.IGNORECASE)
+
+
+def event_time(text):
+    match = clock_pattern.search(text)
+    if match:
+        hour, minute, suffix = int(match[1]), int(match[2]), match[3]
+    else:
+        match = hour_pattern.search(text)
+        if not match:
+            return None
+        hour, minute, suffix = int(match[1]), 0, match[2]
+    if suffix:
+        if hour > 12:
+            return None
+        hour = hour % 12 + (12 if suffix.lower() == "pm" else 0)
+    return time(hour, minute)
+
+
+def occurrences(items):
+    """``(event, n)`` for a day's events, n counting earlier identical ones,
+    so two "09:00 standup" entries remind (and are remembered) separately."""
+    seen = {}
+    for event in items:
+        n = seen[event] = seen.get(event, -1) + 1
+        yield event, n
+
+
+def delivered_name(key, event, n):
+    # The first copy keeps the plain name older delivered files used.
+    return f"{key} {event}" if n == 0 else f"{key} {event} #{n + 1}"
+
+
+def reminder_at(day, event, lead=reminder_lead):
+    at = event.start or event_time(event.title)
+    if at is None:
+        return datetime.combine(day, day_start)
+    return datetime.combine(day, at) - timedelta(minutes=lead)
+
+
+class ReminderScheduler:
+    def __init__(self, store, lead=reminder_lead, horizon_days=2, path=delivered_file):
+        self.store = store
+        self.lead = lead
+        self.horizon_days = horizon_days
+        self.path = path
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._heap = []  # (instant, seq, date key, event, n)
+        self._live = {}  # date key -> {(instant, event, n)} still to fire
+        self._seq = itertools.count()
+        self._horizon = None
+        self._delivered = self._load_delivered()
+        with self._lock:
+            now = datetime.now()
+            # Events may have been removed while the app was closed.
+            self._forget_removed(set(self._delivered.values()), now)
+            self._extend(now)
+        store.subscribe(self.on_store_changed)
+
+    def add_listener(self, listener):
+        # Called with no arguments whenever the next due time may have moved.
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def close(self):
+        self.store.unsubscribe(self.on_store_changed)
+
+    # --- Scheduling ---
+    def _schedule(self, key, items, now):
+        day = parse_date(key)
+        if day is None or day < now.date():
+            return
+        old = self._live.get(key, set())
+        live = {
+            (reminder_at(day, event, self.lead), event, n) for event, n in occurrences(items)
+            if self._delivered.get(delivered_name(key, event, n)) is None
+        }
+        # Entries dropped from ``live`` stay in the heap and are skipped when
+        # they reach the top.
+        for instant, event, n in live - old:
+            heapq.heappush(self._heap, (instant, next(self._seq), key, event, n))
+        if live:
+            self._live[key] = live
+        else:
+            self._live.pop(key, None)
+
+    def _extend(self, now):
+        end = now.date() + timedelta(days=self.horizon_days)
+        if self._horizon is not None and self._horizon >= end:
+            return
+        start = now.date() if self._horizon is None else self._horizon + timedelta(days=1)
+        for key, items in self.store.between(start, end):
+            self._schedule(key, items, now)
+        self._horizon = end
+
+    def _valid(self, entry):
+        instant, _, key, event, n = entry
+        return (instant, event, n) in self._live.get(key, ())
+
+    def _drop_stale(self):
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+        live = sum(len(entries) for entries in self._live.values())
+        if len(self._heap) > 2 * live + 64:
+            self._heap = [entry for entry in self._heap if self._valid(entry)]
+            heapq.heapify(self._heap)
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next reminder, or until the horizon moves on."""
+        now = now or datetime.now()
+        with self._lock:
+            self._extend(now)
+            self._drop_stale()
+            next_day = datetime.combine(now.date() + timedelta(days=1), time())
+            due = min(self._heap[0][0], next_day) if self._heap else next_day
+            return max(0.0, (due - now).total_seconds())
+
+    def pop_due(self, now=None):
+        """Return ``(date key, event)`` for reminders that are due, once each."""
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            self._extend(now)
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                if not self._valid(entry):
+                    continue
+                instant, _, key, event, n = entry
+                self._live[key].discard((instant, event, n))
+                if not self._live[key]:
+                    del self._live[key]
+                self._delivered[delivered_name(key, event, n)] = key
+                due.append((key, event))
+            if due:
+                self._save_delivered(now)
+        return due
+
+    def on_store_changed(self, dates):
+        now = datetime.now()
+        with self._lock:
+            self._forget_removed(set(self._delivered.values()) if dates is None else dates, now)
+            if dates is None:
+                self._heap.clear()
+                self._live.clear()
+                self._horizon = None
+                self._extend(now)
+            else:
+                for key in dates:
+                    day = parse_date(key)
+                    if day is not None and now.date() <= day <= self._horizon:
+                        self._schedule(key, self.store.get(key), now)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    # --- Delivered reminders ---
+    def _load_delivered(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _forget_removed(self, dates, now):
+        # Delivered reminders are keyed by date and text, so an event that is
+        # removed must be forgotten here, or adding it again never reminds.
+        dates = set(dates) & set(self._delivered.values())
+        present = {delivered_name(key, event, n) for key in dates for event, n in occurrences(self.store.get(key))}
+        removed = [name for name, key in self._delivered.items() if key in dates and name not in present]
+        for name in removed:
+            del self._delivered[name]
+        if removed:
+            self._save_delivered(now)
+
+    def _save_delivered(self, now):
+        # Only today's and later reminders can fire again, so older entries
+        # are dropped.
+        today = now.date().isoformat()
+        self._delivered = {name: key for name, key in self._delivered.items() if key >= today}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._delivered, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save delivered reminders: {e}")
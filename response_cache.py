@@ -0,0 +1,188 @@
+"""Two-tier cache for assistant replies.
+
+Replies are keyed on the model plus a normalized message list.  The
+assistant passes its calendar context and the question, without the
+conversation so far, so a question asked again in a session still matches.  Recent entries live in
+an in-memory LRU; everything is also written to a small SQLite file so
+answers survive restarts.  Both tiers expire entries after ``ttl`` seconds
+and are trimmed to a fixed size.  Entries name the dates they depend on (the
+days asked about and the events used), and ``invalidate`` drops them when
+any of those dates change.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+response_cache_file = "response_cache.db"
+
+schema = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_access ON responses (accessed);
+CREATE TABLE IF NOT EXISTS response_deps (
+    key TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_deps_by_date ON response_deps (date);
+CREATE INDEX IF NOT EXISTS response_deps_by_key ON response_deps (key);
+"""
+
+
+def normalize_messages(messages):
+    return [
+        {"role": message["role"], "content": " ".join(message["content"].split()).casefold()}
+        for message in messages
+    ]
+
+
+def cache_key(model, messages):
+    payload = json.dumps([model, normalize_messages(messages)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=response_cache_file, max_memory=256, max_disk=5000, ttl=6 * 3600):
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (response, created, dependent dates)
+        self._memory = OrderedDict()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(schema)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, model, messages):
+        key = cache_key(model, messages)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ? AND created > ?",
+                    (key, now - self.ttl),
+                ).fetchone()
+                if row is not None:
+                    deps = {date for (date,) in self._db.execute("SELECT date FROM response_deps WHERE key = ?", (key,))}
+                    with self._db:
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[0], row[1], deps)
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, model, messages, response, depends_on=()):
+        key = cache_key(model, messages)
+        now = time.time()
+        deps = set(depends_on)
+        with self._lock:
+            self._remember(key, response, now, deps)
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute("DELETE FROM response_deps WHERE key = ?", (key,))
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now))
+                self._db.executemany("INSERT INTO response_deps VALUES (?, ?)", [(key, date) for date in deps])
+                self._trim_disk(now)
+
+    def _remember(self, key, response, created, deps):
+        self._memory[key] = (response, created, deps)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _trim_disk(self, now):
+        self._db.execute(
+            "DELETE FROM response_deps WHERE key IN (SELECT key FROM responses WHERE created <= ?)",
+            (now - self.ttl,),
+        )
+        self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk:
+            stale = "SELECT key FROM responses ORDER BY accessed LIMIT ?"
+            self._db.execute(f"DELETE FROM response_deps WHERE key IN ({stale})", (count - self.max_disk,))
+            self._db.execute(f"DELETE FROM responses WHERE key IN ({stale})", (count - self.max_disk,))
+
+    def invalidate(self, dates):
+        """Drop replies built from any of ``dates``; None (a clear, a series
+        changing) drops every reply.  Replies stored without dates are
+        dropped by any change, since nothing says what they depend on."""
+        if dates is None:
+            self.clear()
+            return
+        dates = set(dates)
+        with self._lock:
+            stale = [key for key, entry in self._memory.items() if not entry[2] or entry[2] & dates]
+            for key in stale:
+                del self._memory[key]
+
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute("DELETE FROM responses WHERE key NOT IN (SELECT key FROM response_deps)")
+                dates = list(dates)
+                # Stay under SQLite's bound-parameter limit on bulk imports.
+                for i in range(0, len(dates), 500):
+                    chunk = dates[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    keys = f"SELECT key FROM response_deps WHERE date IN ({marks})"
+                    self._db.execute(f"DELETE FROM responses WHERE key IN ({keys})", chunk)
+                    self._db.execute(f"DELETE FROM response_deps WHERE key IN ({keys})", chunk)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.execute("DELETE FROM response_deps")
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = 0
+            if self._db is not None:
+                (disk_entries,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
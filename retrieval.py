@@ -0,0 +1,338 @@
+"""Calendar context for the assistant prompt.
+
+``EventRetriever`` looks events up by keyword, through the store's own word
+index when it has one (``SqliteEventStore``) and otherwise through an
+inverted index kept in memory and updated from the store's change
+notifications.  It picks the events most
+relevant to a question by keyword overlap and distance from the dates the
+question mentions (optionally re-ranked with Ollama embeddings).  Only as
+many events as fit in a token budget go into the prompt.
+
+``Conversation`` keeps the last few turns verbatim and folds older ones into
+a running summary, so the prompt stays roughly the same size however large
+the calendar or the chat history gets.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from datetime import date, timedelta
+
+from event_index import month_bounds, parse_date, tokenize, week_bounds, word_pattern
+from llm_dispatcher import BACKGROUND, get_dispatcher
+from ollama_client import OllamaError, get_client
+
+embed_model = os.environ.get("ORION_EMBED_MODEL")  # e.g. "nomic-embed-text"
+
+weekdays = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+months = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+iso_pattern = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def query_ranges(text, today):
+    """Date ranges a question refers to, e.g. "tomorrow" or "next week"."""
+    lowered = text.casefold()
+    words = set(word_pattern.findall(lowered))
+    ranges = []
+    if "today" in words or "tonight" in words:
+        ranges.append((today, today))
+    if "tomorrow" in words:
+        ranges.append((today + timedelta(days=1),) * 2)
+    if "yesterday" in words:
+        ranges.append((today - timedelta(days=1),) * 2)
+    if "next week" in lowered:
+        ranges.append(week_bounds(today + timedelta(days=7)))
+    elif "week" in words:
+        ranges.append(week_bounds(today))
+    if "next month" in lowered:
+        first = month_bounds(today.year, today.month)[1] + timedelta(days=1)
+        ranges.append(month_bounds(first.year, first.month))
+    elif "month" in words:
+        ranges.append(month_bounds(today.year, today.month))
+    for i, name in enumerate(weekdays):
+        if name in words:
+            day = today + timedelta(days=(i - today.weekday()) % 7)
+            ranges.append((day, day))
+    for i, name in enumerate(months, start=1):
+        if name in words:
+            year = today.year if i >= today.month else today.year + 1
+            ranges.append(month_bounds(year, i))
+    for match in iso_pattern.findall(text):
+        day = parse_date(match)
+        if day:
+            ranges.append((day, day))
+    return ranges
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class EventRetriever:
+    def __init__(self, store, embed_model=embed_model, upcoming_days=7, max_candidates=200):
+        self.store = store
+        self.embed_model = embed_model
+        self.upcoming_days = upcoming_days
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._built = False
+        self._by_date = {}
+        self._postings = {}
+        self._doc_count = 0
+        self._embeddings = OrderedDict()
+        # A store with a word index (SQLite) answers keyword lookups itself,
+        # so the calendar is never copied into memory for them.
+        self._store_indexed = hasattr(store, "matching")
+        store.subscribe(self.on_store_changed)
+
+    # --- Index maintenance ---
+    def on_store_changed(self, dates):
+        with self._lock:
+            if not self._built:
+                return
+            if dates is None:
+                self._by_date.clear()
+                self._postings.clear()
+                self._doc_count = 0
+                self._built = False
+                return
+            for key in dates:
+                self._reindex(key, self.store.records(key))
+
+    def _matching(self, term):
+        if self._store_indexed:
+            return self.store.matching(term)
+        self._ensure_built()
+        return self._postings.get(term, set())
+
+    def _total(self):
+        if self._store_indexed:
+            return self.store.record_count()
+        self._ensure_built()
+        return self._doc_count
+
+    def _ensure_built(self):
+        # Built on first use, so opening the app never pays for it.
+        if self._built:
+            return
+        for key, event in self.store.iter_events():
+            self._by_date.setdefault(key, []).append(event)
+        for key, items in self._by_date.items():
+            for event in set(items):
+                self._post(key, event)
+        self._built = True
+
+    def _post(self, key, event):
+        self._doc_count += 1
+        for token in set(tokenize(str(event))):
+            self._postings.setdefault(token, set()).add((key, event))
+
+    def _reindex(self, key, items):
+        for event in set(self._by_date.get(key, ())) - set(items):
+            self._doc_count -= 1
+            for token in set(tokenize(str(event))):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.discard((key, event))
+                    if not postings:
+                        del self._postings[token]
+        for event in set(items) - set(self._by_date.get(key, ())):
+            self._post(key, event)
+        if items:
+            self._by_date[key] = list(items)
+        else:
+            self._by_date.pop(key, None)
+
+    # --- Selection ---
+    def select(self, question, budget_tokens=600, k=20, today=None):
+        """Return prompt lines for the most relevant events, and the dates the
+        answer depends on: theirs and every day in the queried range."""
+        today = today or date.today()
+        ranges = query_ranges(question, today)
+        # Dates the question names outweigh keywords; with no dates named,
+        # upcoming events are only a weak default.
+        weight = 2.0 if ranges else 0.5
+        ranges = ranges or [(today, today + timedelta(days=self.upcoming_days))]
+        terms = tokenize(question)
+
+        scores = {}
+        for start, end in ranges:
+            for key, items in self.store.between(start, end):
+                for event in items:
+                    scores[(key, event)] = weight
+        with self._lock:
+            total = max(self._total(), 1)
+            for term in terms:
+                postings = self._matching(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for doc in postings:
+                    scores[doc] = scores.get(doc, 0.0) + idf
+
+        focus = [start + (end - start) / 2 for start, end in ranges]
+        for doc in scores:
+            day = parse_date(doc[0])
+            if day is not None:
+                distance = min(abs((day - f).days) for f in focus)
+                scores[doc] += 1.0 / (1 + distance)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.max_candidates]
+        if self.embed_model and ranked:
+            ranked = self._rerank(question, ranked, scores)
+
+        lines, dates, used = [], set(), 0
+        for key, event in ranked:
+            line = f"{key}: {event}"
+            cost = estimate_tokens(line)
+            if used + cost > budget_tokens or len(lines) >= k:
+                break
+            lines.append(line)
+            dates.add(key)
+            used += cost
+        lines.sort()
+        # The answer also depends on the days asked about, events or not:
+        # "am I free tomorrow?" changes when tomorrow gets its first event.
+        for start, end in ranges:
+            dates.update((start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1))
+        return lines, dates
+
+    def search(self, query, limit=50):
+        """Stored ``(key, event)`` pairs containing every keyword of ``query``."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            docs = set(self._matching(terms[0]))
+            for term in terms[1:]:
+                if not docs:
+                    break
+                docs &= self._matching(term)
+        return sorted(docs, key=lambda doc: (doc[0], str(doc[1])))[:limit]
+
+    def _rerank(self, question, ranked, scores):
+        try:
+            query = self._embed(question)
+            similarity = {doc: _cosine(query, self._embed(str(doc[1]))) for doc in ranked}
+        except OllamaError as e:
+            print(f"Embedding lookup failed, using keyword ranking: {e}")
+            return ranked
+        return sorted(ranked, key=lambda doc: scores[doc] + 3.0 * similarity[doc], reverse=True)
+
+    def _embed(self, text):
+        vector = self._embeddings.get(text)
+        if vector is None:
+            vector = get_client().embeddings(self.embed_model, text)
+            self._embeddings[text] = vector
+            if len(self._embeddings) > 5000:
+                self._embeddings.popitem(last=False)
+        else:
+            self._embeddings.move_to_end(text)
+        return vector
+
+
+class Conversation:
+    def __init__(self, max_turns=6, summary_tokens=200):
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.summary = ""
+        self.turns = deque()
+        self._overflow = []
+        self._pending = None  # (summary reply, overflow messages it covers)
+
+    def record(self, question, answer):
+        self.turns.append(({"role": "user", "content": question}, {"role": "assistant", "content": answer}))
+        while len(self.turns) > self.max_turns:
+            self._overflow.extend(self.turns.popleft())
+
+    def summarize(self, model):
+        """Start folding turns that fell out of the window into the summary.
+
+        The summary is a BACKGROUND request and nothing waits for it: it is
+        started after an answer and picked up by ``update`` before a later
+        question, so it never holds up (or jumps ahead of) the questions.
+        """
+        if not self._overflow or self._pending is not None:
+            return
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in self._overflow)
+        prompt = (
+            f"Update this summary of a conversation with a calendar assistant in at most "
+            f"{self.summary_tokens * 3 // 4} words.\n\nSummary so far:\n{self.summary or '(none)'}"
+            f"\n\nNew messages:\n{transcript}"
+        )
+        try:
+            reply = get_dispatcher().submit(model, [{"role": "user", "content": prompt}], priority=BACKGROUND)
+        except OllamaError as e:
+            print(f"Conversation summary failed: {e}")
+            return
+        self._pending = (reply, len(self._overflow))
+
+    def update(self):
+        """Take in a finished summary; the overflow is retried after a failure."""
+        if self._pending is None or not self._pending[0].done:
+            return
+        (reply, folded), self._pending = self._pending, None
+        try:
+            self.summary = reply.result()["message"]["content"].strip()
+        except OllamaError as e:
+            print(f"Conversation summary failed: {e}")
+            return
+        del self._overflow[:folded]
+
+    def clear(self):
+        if self._pending is not None:
+            self._pending[0].close()
+            self._pending = None
+        self.summary = ""
+        self.turns.clear()
+        self._overflow = []
+
+
+class AssistantContext:
+    """Builds the message list for one question and remembers the answer."""
+
+    instructions = (
+        "You are an AI calendar assistant. Answer using the user's calendar "
+        "events below when they are relevant. Today is {today}."
+    )
+
+    def __init__(self, store, budget_tokens=600, max_turns=6):
+        self.retriever = EventRetriever(store)
+        self.conversation = Conversation(max_turns=max_turns)
+        self.budget_tokens = budget_tokens
+
+    def build(self, question, model):
+        """Return the messages to send, the dates the answer depends on, and
+        the messages to cache it under.
+
+        The cache key leaves out the conversation so far: otherwise the same
+        question asked twice in a session would never match, since the
+        second one carries the first in its history.
+        """
+        self.conversation.update()
+        lines, dates = self.retriever.select(question, budget_tokens=self.budget_tokens)
+        system = self.instructions.format(today=date.today().isoformat())
+        system += "\n\nRelevant events:\n" + ("\n".join(lines) if lines else "(none)")
+        key = [{"role": "system", "content": system}, {"role": "user", "content": question}]
+        if self.conversation.summary:
+            system += "\n\nEarlier in this conversation:\n" + self.conversation.summary
+
+        messages = [{"role": "system", "content": system}]
+        for turn in self.conversation.turns:
+            messages.extend(turn)
+        messages.append({"role": "user", "content": question})
+        return messages, dates, key
+
+    def record(self, question, answer, model=None):
+        self.conversation.record(question, answer)
+        if model is not None:
+            self.conversation.summarize(model)
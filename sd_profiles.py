@@ -0,0 +1,218 @@
+"""Stable Diffusion speed/quality profiles for CPU hosts.
+
+A profile fixes the step count, scheduler, resolution and the CPU-side
+tuning knobs (attention slicing, VAE tiling, torch threads, channels_last,
+bf16 autocast).  The image worker applies the requested profile before each
+job and records the measured seconds per image and peak RSS per profile in
+``sd_profile_stats.json``, so the numbers shown next to a profile come from
+this machine rather than from a guess.
+"""
+
+import contextlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+profile_stats_file = "sd_profile_stats.json"
+max_batch = int(os.environ.get("ORION_SD_MAX_BATCH", "8"))
+batch_image_mb = 1200  # extra resident memory per image in a 512x512 batch
+
+
+@dataclass(frozen=True)
+class SDProfile:
+    name: str
+    steps: int
+    scheduler: str  # "default" keeps the model's own scheduler
+    width: int
+    height: int
+    attention_slicing: bool
+    vae_tiling: bool
+    channels_last: bool
+    bf16: bool
+    threads: int = 0  # 0 means one per physical core
+
+
+profiles = {
+    "draft": SDProfile("draft", steps=12, scheduler="dpm++", width=384, height=384,
+                       attention_slicing=True, vae_tiling=False, channels_last=True, bf16=True),
+    "balanced": SDProfile("balanced", steps=20, scheduler="dpm++", width=512, height=512,
+                          attention_slicing=True, vae_tiling=False, channels_last=True, bf16=True),
+    "quality": SDProfile("quality", steps=50, scheduler="default", width=512, height=512,
+                         attention_slicing=False, vae_tiling=True, channels_last=True, bf16=False),
+}
+default_profile = os.environ.get("ORION_SD_PROFILE", "balanced")
+
+
+def get_profile(name=None):
+    return profiles.get(name or default_profile, profiles["balanced"])
+
+
+def physical_cores():
+    # Hyperthreads share a (physical id, core id) pair; torch runs faster
+    # with one thread per physical core.
+    cores = set()
+    physical = None
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("physical id"):
+                    physical = line.split(":")[1].strip()
+                elif line.startswith("core id"):
+                    cores.add((physical, line.split(":")[1].strip()))
+    except OSError:
+        pass
+    return len(cores) or os.cpu_count() or 1
+
+
+def cpu_supports_bf16():
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = next((line for line in f if line.startswith("flags")), "")
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+class ProfileApplier:
+    """Switches a loaded pipeline between profiles inside the worker."""
+
+    def __init__(self, pipeline):
+        import torch
+
+        self.torch = torch
+        self.pipeline = pipeline
+        self.device = pipeline.device.type
+        self.default_scheduler = pipeline.scheduler
+        self.bf16 = self.device == "cpu" and cpu_supports_bf16()
+        self.current = None
+
+    def apply(self, profile):
+        if profile == self.current:
+            return
+        torch, pipeline = self.torch, self.pipeline
+        if self.device == "cpu":
+            torch.set_num_threads(profile.threads or physical_cores())
+
+        if profile.scheduler == "dpm++":
+            from diffusers import DPMSolverMultistepScheduler
+
+            pipeline.scheduler = DPMSolverMultistepScheduler.from_config(self.default_scheduler.config)
+        else:
+            pipeline.scheduler = self.default_scheduler
+
+        if profile.attention_slicing:
+            pipeline.enable_attention_slicing()
+        else:
+            pipeline.disable_attention_slicing()
+        if profile.vae_tiling:
+            pipeline.enable_vae_tiling()
+        else:
+            pipeline.disable_vae_tiling()
+
+        memory_format = torch.channels_last if profile.channels_last else torch.contiguous_format
+        pipeline.unet.to(memory_format=memory_format)
+        pipeline.vae.to(memory_format=memory_format)
+        self.current = profile
+
+    def call_kwargs(self, profile):
+        return {"num_inference_steps": profile.steps, "width": profile.width, "height": profile.height}
+
+    def generator(self, seed):
+        return self.torch.Generator(device=self.device).manual_seed(seed)
+
+    def autocast(self, profile):
+        if profile.bf16 and self.bf16:
+            return self.torch.autocast("cpu", dtype=self.torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def dtype(self, profile):
+        """The precision ``profile`` runs in, e.g. "bfloat16" or "float32"."""
+        if profile.bf16 and self.bf16:
+            return "bfloat16"
+        return str(self.pipeline.unet.dtype).removeprefix("torch.")
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM on Linux, so the next reading is
+    # the peak of this job only.  Elsewhere the lifetime peak is reported.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def available_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def auto_batch_size(profile, headroom_mb=1536, max_batch=max_batch):
+    """How many images of ``profile`` fit in one pipeline call right now."""
+    available = available_memory_mb()
+    if available is None:
+        return 1
+    # Activations grow with pixel count; classifier-free guidance doubles the
+    # UNet batch, which the per-image figure already accounts for.
+    per_image = batch_image_mb * profile.width * profile.height / (512 * 512)
+    if profile.attention_slicing:
+        per_image /= 2
+    return max(1, min(max_batch, int((available - headroom_mb) // per_image)))
+
+
+def load_stats(path=profile_stats_file):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def record_run(profile_name, seconds_per_image, peak_mb, path=profile_stats_file):
+    stats = load_stats(path)
+    entry = stats.setdefault(profile_name, {"runs": 0, "seconds_per_image": 0.0, "peak_rss_mb": 0.0})
+    entry["runs"] += 1
+    # Running mean over all measured runs of this profile.
+    entry["seconds_per_image"] += (seconds_per_image - entry["seconds_per_image"]) / entry["runs"]
+    entry["last_seconds_per_image"] = seconds_per_image
+    entry["peak_rss_mb"] = max(entry["peak_rss_mb"], peak_mb)
+    entry["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=4)
+    os.replace(tmp_path, path)
+    return entry
+
+
+def describe(profile_name, stats=None):
+    stats = load_stats() if stats is None else stats
+    profile = profiles[profile_name]
+    text = f"{profile.name}: {profile.steps} steps, {profile.width}x{profile.height}"
+    entry = stats.get(profile_name)
+    if entry:
+        text += f", {entry['seconds_per_image']:.1f}s/image, {entry['peak_rss_mb'] / 1024:.1f} GB peak"
+    return text
@@ -0,0 +1,544 @@
+"""Speech-to-text engines and audio sources.
+
+A recognizer turns 16-bit mono PCM chunks into text and calls
+``on_partial`` with the transcript so far while audio is still arriving.
+``VoskRecognizer`` and ``WhisperRecognizer`` run offline from models already
+on disk and keep them loaded for the life of the process; neither downloads
+one.  ``GoogleRecognizer`` is the previous online path and is used only when
+``ORION_SPEECH_ENGINE=google`` asks for it.  ``load_recognizer`` picks the
+engine named by ``ORION_SPEECH_ENGINE`` and falls back along the offline
+``engine_order`` when it cannot be loaded.
+
+Audio comes from the microphone or from a WAV file (``WavSource``), so the
+pipeline can be tested and timed without a microphone:
+
+    python speech.py recording.wav --engine whisper --realtime
+
+On the microphone a ``VoiceActivityDetector``, calibrated by a cached
+``NoiseProfile``, decides where speech starts and ends.  ``MicrophoneSource``
+records one utterance per press; ``ContinuousListener`` keeps one stream open
+and hands only the speech segments to the recognizer.
+"""
+
+import argparse
+import array
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass
+
+import metrics
+
+speech_engine = os.environ.get("ORION_SPEECH_ENGINE", "vosk")
+vosk_model_path = os.environ.get("ORION_VOSK_MODEL", "models/vosk-model-small-en-us-0.15")
+whisper_model = os.environ.get("ORION_WHISPER_MODEL", "base.en")
+noise_profile_file = os.environ.get("ORION_NOISE_PROFILE", "noise_profile.json")
+engine_order = ("vosk", "whisper")  # offline fallbacks; google is opt-in
+sample_rate = 16000
+chunk_ms = 100
+
+
+class SpeechError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Transcript:
+    text: str
+    engine: str
+    audio_seconds: float
+    latency: float  # seconds from the end of speech to the final text
+
+
+def rms(chunk):
+    samples = array.array("h", chunk)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+# --- Voice activity ---
+class NoiseProfile:
+    """Running estimate of the ambient noise level (RMS of quiet audio).
+
+    It follows the room slowly, ``rate`` of the way per quiet chunk, and is
+    saved to ``path`` so a new session starts calibrated instead of sampling
+    the room first.
+    """
+
+    def __init__(self, path=noise_profile_file, rate=0.02, ratio=3.0, floor=150):
+        self.path = path
+        self.rate = rate
+        self.ratio = ratio
+        self.floor = floor
+        self.level = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.level = float(json.load(f)["level"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @property
+    def calibrated(self):
+        return self.level is not None
+
+    @property
+    def threshold(self):
+        return max(self.floor, (self.level or 0.0) * self.ratio)
+
+    def update(self, energy, rate=None):
+        if self.level is None:
+            self.level = energy
+        else:
+            self.level += (rate or self.rate) * (energy - self.level)
+
+    def save(self):
+        if self.level is None:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"level": round(self.level, 2)}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save noise profile: {e}")
+
+
+class VoiceActivityDetector:
+    """Cuts a chunk stream into speech segments.
+
+    A chunk counts as speech when its energy clears the noise threshold and,
+    when the ``webrtcvad`` package is installed, its classifier agrees.  A
+    segment opens after ``start_ms`` of speech (with ``lead_ms`` of audio
+    from before it) and closes after ``silence_ms`` without speech or at
+    ``max_seconds``.  Quiet chunks outside segments update the noise
+    profile; an uncalibrated profile spends its first ``calibration_ms``
+    only listening.
+
+    ``feed(chunk, now)`` returns a list of ``("start", [chunks])``,
+    ``("audio", chunk)`` and ``("end", speech_ended)`` events.
+    """
+
+    def __init__(self, noise=None, start_ms=200, silence_ms=700, lead_ms=300, max_seconds=30, calibration_ms=500):
+        self.noise = noise or NoiseProfile()
+        self.start_chunks = max(1, start_ms // chunk_ms)
+        self.silence_ms = silence_ms
+        self.max_ms = max_seconds * 1000
+        self.calibration_left = 0 if self.noise.calibrated else calibration_ms
+        self.active = False
+        self._lead = deque(maxlen=max(1, lead_ms // chunk_ms) + self.start_chunks)
+        self._onset = 0
+        self._quiet_ms = 0
+        self._total_ms = 0
+        self._ended = None
+        try:
+            import webrtcvad
+
+            self._webrtc = webrtcvad.Vad(2)
+        except ImportError:
+            self._webrtc = None
+
+    def is_speech(self, chunk, energy=None):
+        if (rms(chunk) if energy is None else energy) <= self.noise.threshold:
+            return False
+        if self._webrtc is None:
+            return True
+        frame = sample_rate * 20 // 1000 * 2
+        return any(
+            self._webrtc.is_speech(chunk[i:i + frame], sample_rate)
+            for i in range(0, len(chunk) - frame + 1, frame)
+        )
+
+    def feed(self, chunk, now):
+        energy = rms(chunk)
+        if self.calibration_left > 0:
+            self.noise.update(energy, rate=0.3)
+            self.calibration_left -= chunk_ms
+            return []
+        speech = self.is_speech(chunk, energy)
+        if not self.active:
+            self._lead.append(chunk)
+            if not speech:
+                self._onset = 0
+                self.noise.update(energy)
+                return []
+            self._onset += 1
+            if self._onset < self.start_chunks:
+                return []
+            self.active = True
+            self._quiet_ms, self._total_ms, self._ended = 0, 0, None
+            lead = list(self._lead)
+            self._lead.clear()
+            return [("start", lead)]
+
+        events = [("audio", chunk)]
+        self._total_ms += chunk_ms
+        if speech:
+            self._quiet_ms, self._ended = 0, None
+        else:
+            if self._ended is None:
+                self._ended = now
+            self._quiet_ms += chunk_ms
+        if self._quiet_ms >= self.silence_ms or self._total_ms >= self.max_ms:
+            events.append(("end", self._ended or now))
+            self.active = False
+            self._onset = 0
+        return events
+
+
+# --- Audio sources ---
+class WavSource:
+    """A 16-bit mono WAV file; ``realtime`` paces it like live audio."""
+
+    def __init__(self, path, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        self.speech_ended = None
+        with wave.open(path, "rb") as f:
+            if f.getnchannels() != 1 or f.getsampwidth() != 2:
+                raise SpeechError(f"{path}: expected 16-bit mono PCM")
+            self.sample_rate = f.getframerate()
+
+    def __iter__(self):
+        frames = self.sample_rate * chunk_ms // 1000
+        started = time.perf_counter()
+        sent = 0
+        with wave.open(self.path, "rb") as f:
+            while True:
+                chunk = f.readframes(frames)
+                if not chunk:
+                    break
+                if self.realtime:
+                    delay = started + sent / self.sample_rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                sent += len(chunk) // 2
+                yield chunk
+        self.speech_ended = time.perf_counter()
+
+
+class MicrophoneSource:
+    """One utterance from the microphone, as cut by a ``VoiceActivityDetector``;
+    ``stop()`` ends it early."""
+
+    def __init__(self, vad=None, start_timeout=15, stop=None):
+        self.sample_rate = sample_rate
+        self.vad = vad or VoiceActivityDetector()
+        self.start_timeout = start_timeout
+        self.stop = stop or (lambda: False)
+        self.speech_ended = None
+
+    def __iter__(self):
+        import speech_recognition as sr
+
+        frames = self.sample_rate * chunk_ms // 1000
+        try:
+            with sr.Microphone(sample_rate=self.sample_rate, chunk_size=frames) as source:
+                started = time.perf_counter()
+                while not self.stop():
+                    chunk = source.stream.read(frames)
+                    now = time.perf_counter()
+                    for kind, value in self.vad.feed(chunk, now):
+                        if kind == "start":
+                            yield from value
+                        elif kind == "audio":
+                            yield value
+                        else:
+                            self.speech_ended = value
+                            return
+                    if not self.vad.active and now - started > self.start_timeout:
+                        raise SpeechError("⏳ No speech detected.")
+        finally:
+            self.vad.noise.save()
+            if self.speech_ended is None:
+                self.speech_ended = time.perf_counter()
+
+
+class ContinuousListener:
+    """Always-on listening over one microphone stream.
+
+    ``run()`` keeps the device open and passes every chunk through the
+    voice-activity detector; only speech segments reach the recognizer,
+    which runs on its own thread so decoding never stalls the stream.
+    ``on_result(transcript)``, ``on_partial(text)`` and ``on_error(message)``
+    are called from that thread.  Segments that decode to nothing (a cough,
+    a door) are dropped.
+    """
+
+    def __init__(self, recognizer, on_result, on_partial=None, on_error=None, vad=None, save_every=60):
+        self.recognizer = recognizer
+        self.on_result = on_result
+        self.on_partial = on_partial
+        self.on_error = on_error or (lambda message: None)
+        self.vad = vad or VoiceActivityDetector()
+        self.save_every = save_every
+        self._segments = queue.Queue()
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        import speech_recognition as sr
+
+        recognition = threading.Thread(target=self._recognize, name="speech-recognition", daemon=True)
+        recognition.start()
+        frames = sample_rate * chunk_ms // 1000
+        segment = None
+        try:
+            with sr.Microphone(sample_rate=sample_rate, chunk_size=frames) as source:
+                saved = time.perf_counter()
+                while not self._stopped:
+                    chunk = source.stream.read(frames)
+                    now = time.perf_counter()
+                    for kind, value in self.vad.feed(chunk, now):
+                        if kind == "start":
+                            segment = _Segment()
+                            for lead in value:
+                                segment.put(lead)
+                            self._segments.put(segment)
+                        elif kind == "audio":
+                            segment.put(value)
+                        else:
+                            segment.finish(value)
+                            segment = None
+                    if now - saved > self.save_every:
+                        self.vad.noise.save()
+                        saved = now
+        except Exception as e:
+            self.on_error(f"⚠️ Microphone failed: {e}")
+        finally:
+            if segment is not None:
+                segment.finish(time.perf_counter())
+            self.vad.noise.save()
+            self._segments.put(None)
+            recognition.join()
+
+    def _recognize(self):
+        while True:
+            segment = self._segments.get()
+            if segment is None:
+                return
+            try:
+                transcript = listen(self.recognizer, segment, self.on_partial)
+            except SpeechError as e:
+                self.on_error(str(e))
+                continue
+            except Exception as e:
+                self.on_error(f"⚠️ Speech recognition failed: {e}")
+                continue
+            if transcript.text:
+                self.on_result(transcript)
+
+
+class _Segment:
+    # Audio of one speech segment, filled by the reader while it is being
+    # recognized.
+    def __init__(self):
+        self.sample_rate = sample_rate
+        self.speech_ended = None
+        self._chunks = queue.Queue()
+
+    def put(self, chunk):
+        self._chunks.put(chunk)
+
+    def finish(self, speech_ended):
+        self.speech_ended = speech_ended
+        self._chunks.put(None)
+
+    def __iter__(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+
+# --- Engines ---
+class VoskRecognizer:
+    name = "vosk"
+
+    def __init__(self, model_path=vosk_model_path):
+        import vosk
+
+        vosk.SetLogLevel(-1)
+        # vosk.Model() would fetch a model over the network; this engine is
+        # meant to work offline, so a missing model is an error.
+        if not os.path.isdir(model_path):
+            raise SpeechError(f"vosk model not found at {os.path.abspath(model_path)} (set ORION_VOSK_MODEL)")
+        self.model = vosk.Model(model_path)
+
+    def transcribe(self, chunks, rate, on_partial=None):
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.model, rate)
+        done, last = [], None
+        for chunk in chunks:
+            if recognizer.AcceptWaveform(chunk):
+                text = json.loads(recognizer.Result())["text"]
+                if text:
+                    done.append(text)
+                partial = ""
+            else:
+                partial = json.loads(recognizer.PartialResult())["partial"]
+            current = " ".join(done + [partial]).strip()
+            if on_partial is not None and current != last:
+                on_partial(current)
+                last = current
+        text = json.loads(recognizer.FinalResult())["text"]
+        if text:
+            done.append(text)
+        return " ".join(done)
+
+
+class WhisperRecognizer:
+    name = "whisper"
+
+    def __init__(self, model_size=whisper_model, partial_every=1.0, partial_window=8.0):
+        from faster_whisper import WhisperModel
+
+        # Only a model already on disk (a path, or one in the local cache),
+        # never a download from the Hugging Face hub.
+        try:
+            self.model = WhisperModel(model_size, device="cpu", compute_type="int8", local_files_only=True)
+        except Exception as e:
+            raise SpeechError(f"whisper model {model_size} not found locally (set ORION_WHISPER_MODEL): {e}")
+        self.partial_every = partial_every
+        self.partial_window = partial_window
+
+    def _decode(self, pcm, rate):
+        import numpy as np
+
+        audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+        if rate != 16000:
+            positions = np.arange(0, len(audio), rate / 16000)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        segments, _ = self.model.transcribe(audio, beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe(self, chunks, rate, on_partial=None):
+        # Whisper is not incremental.  About once a second a partial decodes
+        # the audio after the last full ``partial_window``; each full window
+        # is decoded once and its text kept, so a long utterance is not
+        # re-decoded from the start every time.  The final text decodes the
+        # whole utterance.
+        audio = bytearray()
+        step = int(self.partial_every * rate) * 2
+        window = int(self.partial_window * rate) * 2
+        next_partial = step
+        settled, start = [], 0
+        for chunk in chunks:
+            audio += chunk
+            if on_partial is None or len(audio) < next_partial:
+                continue
+            while len(audio) - start >= window:
+                settled.append(self._decode(bytes(audio[start:start + window]), rate))
+                start += window
+            tail = self._decode(bytes(audio[start:]), rate) if len(audio) > start else ""
+            on_partial(" ".join(text for text in settled + [tail] if text))
+            next_partial = len(audio) + step
+        return self._decode(bytes(audio), rate)
+
+
+class GoogleRecognizer:
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, chunks, rate, on_partial=None):
+        audio = self.sr.AudioData(b"".join(chunks), rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio)
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            raise SpeechError(f"⚠️ Speech service unavailable: {e}")
+
+
+engines = {"vosk": VoskRecognizer, "whisper": WhisperRecognizer, "google": GoogleRecognizer}
+
+
+def load_recognizer(progress=None, engine=speech_engine):
+    report = progress or (lambda detail: None)
+    errors = []
+    for name in [engine] + [name for name in engine_order if name != engine]:
+        if name not in engines:
+            errors.append(f"{name}: unknown engine")
+            continue
+        report(f"loading {name} speech engine")
+        try:
+            return engines[name]()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    raise SpeechError("no speech engine available (" + "; ".join(errors) + ")")
+
+
+def listen(recognizer, source=None, on_partial=None):
+    """Transcribe one utterance from ``source`` (the microphone by default)."""
+    source = source or MicrophoneSource()
+    chunks = queue.Queue()
+
+    # The source is read on its own thread so a slow partial decode never
+    # stalls the audio device.
+    def read():
+        try:
+            for chunk in source:
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+
+    threading.Thread(target=read, name="audio-source", daemon=True).start()
+    received = 0
+
+    def drain():
+        nonlocal received
+        while True:
+            item = chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            received += len(item)
+            yield item
+
+    with metrics.span("speech.transcribe", engine=recognizer.name):
+        text = recognizer.transcribe(drain(), source.sample_rate, on_partial)
+    latency = time.perf_counter() - (source.speech_ended or time.perf_counter())
+    # Time from the end of speech to the final text, what the user waits for.
+    metrics.record("speech.latency", latency, engine=recognizer.name)
+    return Transcript(text, recognizer.name, received / 2 / source.sample_rate, latency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe a WAV file and report latency.")
+    parser.add_argument("wav", help="16-bit mono WAV file")
+    parser.add_argument("--engine", default=speech_engine, choices=sorted(engines))
+    parser.add_argument("--realtime", action="store_true", help="feed audio at its real speed")
+    args = parser.parse_args()
+
+    loading = time.perf_counter()
+    recognizer = load_recognizer(print, args.engine)
+    print(f"Loaded {recognizer.name} in {time.perf_counter() - loading:.2f}s")
+    started = time.perf_counter()
+    transcript = listen(recognizer, WavSource(args.wav, args.realtime), lambda text: print(f"  … {text}"))
+    elapsed = time.perf_counter() - started
+    print(f"Text: {transcript.text}")
+    print(
+        f"{transcript.audio_seconds:.1f}s of audio, {elapsed:.2f}s total "
+        f"(real-time factor {elapsed / max(transcript.audio_seconds, 1e-9):.2f}), "
+        f"{transcript.latency * 1000:.0f} ms from end of speech to text"
+    )
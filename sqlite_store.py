@@ -0,0 +1,281 @@
+"""SQLite event storage.
+
+Same interface as ``event_store.JsonEventStore`` but one-off events are not
+loaded up front: every lookup is a query against an index on the date
+column, so opening a large calendar costs only what the visible month needs.
+Recurring series (rows flagged ``recurring``, holding a JSON record) are few
+and kept in memory for expansion.  An ``event_words`` table maps each
+keyword of an event (``event_index.tokenize``) to its row, so the assistant's
+keyword lookups (``matching``) are queries too rather than an in-memory copy
+of the calendar.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import metrics
+from event_index import month_bounds, parse_date, tokenize, week_bounds
+from event_model import Event, as_event, count_days, expand, find
+
+schema = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    event TEXT NOT NULL,
+    recurring INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (date);
+CREATE TABLE IF NOT EXISTS event_words (
+    word TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (word, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS event_words_by_id ON event_words (id);
+"""
+
+
+def _dump(event):
+    # Only a series is a JSON record; exdates mean nothing without a rule.
+    if event.rrule is None:
+        return str(event), 0
+    return json.dumps(event.to_record(), ensure_ascii=False), 1
+
+
+def _load(text, recurring):
+    return Event.from_record(json.loads(text) if recurring else text)
+
+
+def _words(row_id, event):
+    return [(word, row_id) for word in set(tokenize(str(event)))]
+
+
+class SqliteEventStore:
+    def __init__(self, path, batch_size=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(events)")}
+        if columns and "recurring" not in columns:
+            # Databases from before recurring events.
+            with self._db:
+                self._db.execute("ALTER TABLE events ADD COLUMN recurring INTEGER NOT NULL DEFAULT 0")
+        indexed = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'event_words'").fetchone()
+        self._db.executescript(schema)
+        if columns and not indexed:
+            self._index_words()
+        self.series = [
+            (date, _load(event, 1))
+            for date, event in self._db.execute("SELECT date, event FROM events WHERE recurring = 1 ORDER BY id")
+        ]
+
+    def _index_words(self):
+        # Databases from before the word index are indexed once, in batches.
+        rows = self._db.execute("SELECT id, event, recurring FROM events").fetchmany
+        with self._db:
+            while True:
+                batch = rows(self.batch_size)
+                if not batch:
+                    return
+                self._db.executemany(
+                    "INSERT INTO event_words VALUES (?, ?)",
+                    [pair for row_id, event, recurring in batch for pair in _words(row_id, _load(event, recurring))],
+                )
+
+    # --- Lookups ---
+    def get(self, date):
+        day = parse_date(date)
+        with self._lock:
+            rows = self._db.execute("SELECT event FROM events WHERE date = ? AND recurring = 0 ORDER BY id", (date,))
+            items = [Event.from_text(event) for (event,) in rows]
+            if day is None or not self.series:
+                return items
+            days = expand([(date, items)], self.series, day, day)
+        return [event for _, items in days for event in items]
+
+    def records(self, date):
+        with self._lock:
+            rows = self._db.execute("SELECT event, recurring FROM events WHERE date = ? ORDER BY id", (date,))
+            return [_load(event, recurring) for event, recurring in rows]
+
+    def iter_events(self):
+        # Exports read through their own read-only connection, so a long one
+        # neither holds the lock nor shares a connection with writers; WAL
+        # gives it a consistent snapshot while changes go on.
+        db = sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            for date, event, recurring in db.execute("SELECT date, event, recurring FROM events ORDER BY date, id"):
+                yield date, _load(event, recurring)
+        finally:
+            db.close()
+
+    def matching(self, word):
+        """``{(date key, Event)}`` for the stored records with keyword ``word``."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT date, event, recurring FROM event_words JOIN events USING (id) WHERE word = ?",
+                (word,),
+            ).fetchall()
+        return {(date, _load(event, recurring)) for date, event, recurring in rows}
+
+    def record_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def between(self, start, end):
+        with metrics.span("store.between"), self._lock:
+            rows = self._db.execute(
+                "SELECT date, event FROM events WHERE date BETWEEN ? AND ? AND recurring = 0 ORDER BY date, id",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+            series = list(self.series)
+        grouped = []
+        for date, event in rows:
+            event = Event.from_text(event)
+            if grouped and grouped[-1][0] == date:
+                grouped[-1][1].append(event)
+            else:
+                grouped.append((date, [event]))
+        return expand(grouped, series, start, end) if series else grouped
+
+    def day_counts(self, start, end):
+        """``{date key: number of events}`` for the days in [start, end] with any."""
+        with metrics.span("store.day_counts"), self._lock:
+            rows = self._db.execute(
+                "SELECT date, COUNT(*) FROM events WHERE date BETWEEN ? AND ? AND recurring = 0 GROUP BY date",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+            series = list(self.series)
+        return count_days(rows, series, start, end)
+
+    def day(self, day):
+        return self.between(day, day)
+
+    def week(self, day):
+        return self.between(*week_bounds(day))
+
+    def month(self, year, month):
+        return self.between(*month_bounds(year, month))
+
+    # --- Changes ---
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, dates):
+        for listener in list(self._listeners):
+            listener(dates)
+
+    def add(self, date, event):
+        event = as_event(event)
+        with metrics.span("store.write"), self._lock, self._db:
+            cursor = self._db.execute("INSERT INTO events (date, event, recurring) VALUES (?, ?, ?)", (date, *_dump(event)))
+            self._db.executemany("INSERT INTO event_words VALUES (?, ?)", _words(cursor.lastrowid, event))
+            if event.rrule is not None:
+                self.series.append((date, event))
+        self._notify(None if event.rrule is not None else {date})
+
+    def add_many(self, pairs):
+        count = 0
+        batch = []
+        for pair in pairs:
+            batch.append(pair)
+            if len(batch) >= self.batch_size:
+                count += self._insert(batch)
+                batch = []
+        return count + self._insert(batch)
+
+    def _insert(self, batch):
+        if not batch:
+            return 0
+        batch = [(date, as_event(event)) for date, event in batch]
+        series = [(date, event) for date, event in batch if event.rrule is not None]
+        with metrics.span("store.write"), self._lock, self._db:
+            # Ids are given explicitly so the word index can refer to them.
+            first = self._db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM events").fetchone()[0]
+            self._db.executemany(
+                "INSERT INTO events (id, date, event, recurring) VALUES (?, ?, ?, ?)",
+                [(first + i, date, *_dump(event)) for i, (date, event) in enumerate(batch)],
+            )
+            self._db.executemany(
+                "INSERT INTO event_words VALUES (?, ?)",
+                [pair for i, (date, event) in enumerate(batch) for pair in _words(first + i, event)],
+            )
+            self.series.extend(series)
+        self._notify(None if series else {date for date, _ in batch})
+        return len(batch)
+
+    def _row_id(self, date, event):
+        # Rows are matched on the parsed event, so legacy text such as
+        # "9:05 call" still matches the "09:05 call" it reads back as.
+        rows = self._db.execute(
+            "SELECT id, event, recurring FROM events WHERE date = ? AND recurring = ? ORDER BY id",
+            (date, int(event.rrule is not None)),
+        )
+        return next((row_id for row_id, text, recurring in rows if _load(text, recurring) == event), None)
+
+    def remove(self, date, event):
+        # ``event`` may also be the text shown for it; removing one date of
+        # a series, the first included, excludes just that occurrence.
+        item = find(self.get(date), event)
+        if item is None:
+            return False
+        with metrics.span("store.write"), self._lock, self._db:
+            if item.rrule is None:
+                key, row_id = date, self._row_id(date, item)
+                if row_id is None:
+                    return False
+                self._db.execute("DELETE FROM events WHERE id = ?", (row_id,))
+                self._db.execute("DELETE FROM event_words WHERE id = ?", (row_id,))
+            else:
+                i, key = self._series_index(item)
+                row_id = None if i is None else self._row_id(key, item)
+                if row_id is None:
+                    return False
+                self.series[i] = (key, item.without(date))
+                self._db.execute("UPDATE events SET event = ? WHERE id = ?", (_dump(self.series[i][1])[0], row_id))
+        self._notify({date, key})
+        return True
+
+    def remove_series(self, date, event):
+        """Delete the whole series that ``event`` on ``date`` belongs to."""
+        item = find(self.get(date), event)
+        if item is None or item.rrule is None:
+            return False
+        with metrics.span("store.write"), self._lock, self._db:
+            i, key = self._series_index(item)
+            row_id = None if i is None else self._row_id(key, item)
+            if row_id is None:
+                return False
+            self._db.execute("DELETE FROM events WHERE id = ?", (row_id,))
+            self._db.execute("DELETE FROM event_words WHERE id = ?", (row_id,))
+            del self.series[i]
+        self._notify(None)
+        return True
+
+    def _series_index(self, item):
+        return next(((i, key) for i, (key, series) in enumerate(self.series) if series == item), (None, None))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM events")
+            self._db.execute("DELETE FROM event_words")
+            self.series.clear()
+        self._notify(None)
+
+    def compact(self, wait=True):
+        with metrics.span("store.snapshot"), self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.compact()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,101 @@
+from datetime import date
+
+import pytest
+
+from event_model import Event, Recurrence
+
+
+def occurrences(rule, start, first, last, exdates=()):
+    event = Event("Series", rrule=rule, exdates=exdates)
+    return list(event.occurrences(start, date.fromisoformat(first), date.fromisoformat(last)))
+
+
+@pytest.mark.parametrize("rule, start, first, last, expected", [
+    # DAILY
+    ("FREQ=DAILY;COUNT=3", "2026-10-16", "2026-10-01", "2026-10-31",
+     ["2026-10-16", "2026-10-17", "2026-10-18"]),
+    ("FREQ=DAILY;INTERVAL=3;UNTIL=20261025", "2026-10-16", "2026-10-01", "2026-10-31",
+     ["2026-10-16", "2026-10-19", "2026-10-22", "2026-10-25"]),
+    ("FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR", "2026-10-16", "2026-10-16", "2026-10-21",
+     ["2026-10-16", "2026-10-19", "2026-10-20", "2026-10-21"]),
+    ("FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR;COUNT=3", "2026-10-16", "2026-10-01", "2026-10-31",
+     ["2026-10-16", "2026-10-19", "2026-10-20"]),
+    ("FREQ=DAILY;INTERVAL=2;BYDAY=SA,SU", "2026-10-17", "2026-10-17", "2026-11-08",
+     ["2026-10-17", "2026-10-25", "2026-10-31", "2026-11-08"]),
+    # Counted from the start, not from the queried range.
+    ("FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR;COUNT=12", "2026-10-16", "2026-10-30", "2026-11-30",
+     ["2026-10-30", "2026-11-02"]),
+    # WEEKLY
+    ("FREQ=WEEKLY", "2026-10-19", "2026-10-19", "2026-11-09",
+     ["2026-10-19", "2026-10-26", "2026-11-02", "2026-11-09"]),
+    ("FREQ=WEEKLY;BYDAY=TU,TH;COUNT=3", "2026-10-20", "2026-10-01", "2026-12-31",
+     ["2026-10-20", "2026-10-22", "2026-10-27"]),
+    ("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO;UNTIL=20261116", "2026-10-19", "2026-10-01", "2026-12-31",
+     ["2026-10-19", "2026-11-02", "2026-11-16"]),
+    # MONTHLY
+    ("FREQ=MONTHLY;COUNT=3", "2026-10-31", "2026-10-01", "2027-12-31",
+     ["2026-10-31", "2026-12-31", "2027-01-31"]),
+    ("FREQ=MONTHLY;BYDAY=2TU", "2026-10-13", "2026-10-01", "2027-01-31",
+     ["2026-10-13", "2026-11-10", "2026-12-08", "2027-01-12"]),
+    ("FREQ=MONTHLY;BYDAY=-1FR;UNTIL=20261231", "2026-10-30", "2026-10-01", "2027-12-31",
+     ["2026-10-30", "2026-11-27", "2026-12-25"]),
+    ("FREQ=MONTHLY;BYDAY=MO;COUNT=5", "2026-10-19", "2026-10-01", "2027-12-31",
+     ["2026-10-19", "2026-10-26", "2026-11-02", "2026-11-09", "2026-11-16"]),
+    ("FREQ=MONTHLY;INTERVAL=2;BYDAY=1MO,3MO", "2026-10-05", "2026-10-01", "2027-01-31",
+     ["2026-10-05", "2026-10-19", "2026-12-07", "2026-12-21"]),
+    # A 5th Monday only some months have.
+    ("FREQ=MONTHLY;BYDAY=5MO", "2026-11-30", "2026-11-01", "2027-05-31",
+     ["2026-11-30", "2027-03-29", "2027-05-31"]),
+    # YEARLY
+    ("FREQ=YEARLY;COUNT=2", "2026-10-19", "2026-01-01", "2030-12-31",
+     ["2026-10-19", "2027-10-19"]),
+    ("FREQ=YEARLY;UNTIL=20301231", "2024-02-29", "2024-01-01", "2032-12-31",
+     ["2024-02-29", "2028-02-29"]),
+])
+def test_occurrences(rule, start, first, last, expected):
+    assert occurrences(rule, start, first, last) == expected
+
+
+@pytest.mark.parametrize("rule, start", [
+    ("FREQ=DAILY;BYDAY=MO,WE", "2026-10-19"),
+    ("FREQ=WEEKLY;BYDAY=TU", "2026-10-20"),
+    ("FREQ=MONTHLY;BYDAY=2TU", "2026-10-13"),
+    ("FREQ=YEARLY", "2026-10-19"),
+])
+def test_exdates(rule, start):
+    dates = occurrences(rule, start, start, "2029-12-31")[:3]
+    assert occurrences(rule, start, start, "2029-12-31", exdates=dates[:2])[0] == dates[2]
+
+
+@pytest.mark.parametrize("text", [
+    "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR;COUNT=10",
+    "FREQ=MONTHLY;BYDAY=MO,-1FR,2TU;UNTIL=20271231",
+])
+def test_round_trip(text):
+    assert str(Recurrence.parse(text)) == text
+
+
+@pytest.mark.parametrize("text", [
+    "FREQ=HOURLY",
+    "FREQ=YEARLY;BYDAY=MO",
+    "FREQ=YEARLY;BYMONTH=11;BYDAY=4TH",
+    "FREQ=WEEKLY;BYDAY=1MO",
+    "FREQ=DAILY;BYDAY=2MO",
+    "FREQ=MONTHLY;BYDAY=6MO",
+    "FREQ=MONTHLY;BYMONTHDAY=15",
+    "FREQ=MONTHLY;BYDAY=MO;BYSETPOS=-1",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,SU;WKST=SU",
+    "FREQ=WEEKLY;BYDAY=XX",
+])
+def test_rejects_what_it_cannot_express(text):
+    with pytest.raises(ValueError):
+        Recurrence.parse(text)
+
+
+def test_wkst_that_does_not_matter_is_accepted():
+    assert Recurrence.parse("FREQ=WEEKLY;BYDAY=MO,FR;WKST=SU") == Recurrence("WEEKLY", byday=(0, 4))
+
+
+def test_never_matching_rule_yields_nothing():
+    assert occurrences("FREQ=DAILY;INTERVAL=7;BYDAY=MO", "2026-10-20", "2026-10-01", "2027-12-31") == []
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+
+from event_parser import event_command, parse
+
+friday = date(2026, 10, 16)
+
+
+# text, date key, event text, RRULE, ambiguous
+@pytest.mark.parametrize("text, key, event, rrule, ambiguous", [
+    # Dates
+    ("dentist next Tuesday 3pm for an hour", "2026-10-20", "15:00-16:00 dentist", None, False),
+    ("call mom tomorrow", "2026-10-17", "call mom", None, False),
+    ("meeting today at noon", "2026-10-16", "12:00 meeting", None, False),
+    ("lunch friday", "2026-10-23", "lunch", None, False),
+    ("lunch this friday", "2026-10-16", "lunch", None, False),
+    ("party on 12/31 at 8pm", "2026-12-31", "20:00 party", None, False),
+    ("flight 2026-11-03 at 06:40", "2026-11-03", "06:40 flight", None, False),
+    ("trip on the 3rd of november", "2026-11-03", "trip", None, False),
+    ("doctor nov 20 at 9:30", "2026-11-20", "09:30 doctor", None, False),
+    ("checkup jan 5", "2027-01-05", "checkup", None, False),
+    ("coffee in 2 weeks", "2026-10-30", "coffee", None, False),
+    ("retro next week", "2026-10-19", "retro", None, False),
+    ("bills on the 28th", "2026-10-28", "bills", None, False),
+    ("rent on the 2nd", "2026-11-02", "rent", None, False),
+    ("dentist", None, "dentist", None, False),
+    # Times: a bare "at 1" to "at 6" is the afternoon, other hours as written.
+    ("lunch with Sam at 3", None, "15:00 lunch with Sam", None, False),
+    ("gym at 7", None, "07:00 gym", None, False),
+    ("call at 3 o'clock", None, "15:00 call", None, False),
+    ("review 10am-2pm", None, "10:00-14:00 review", None, False),
+    ("meeting 11-1pm", None, "11:00-13:00 meeting", None, False),
+    ("shift 10-2am", None, "22:00-02:00 shift", None, False),
+    ("meet at 5 till 6", None, "17:00-18:00 meet", None, False),
+    ("talk from 2 to 3", None, "14:00-15:00 talk", None, False),
+    # A bare "9-5" may be a score or a date; it stays in the title.
+    ("workshop 9-5", None, "workshop 9-5", None, False),
+    ("physio at 4:15pm for 45 minutes", None, "16:15-17:00 physio", None, False),
+    # Recurrence
+    ("standup every weekday 9:30-9:45", "2026-10-16", "09:30-09:45 standup", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR", False),
+    ("book club mondays and wednesdays at 7pm", "2026-10-19", "19:00 book club", "FREQ=WEEKLY;BYDAY=MO,WE", False),
+    ("physio every other thursday at 4:15pm", "2026-10-22", "16:15 physio", "FREQ=WEEKLY;INTERVAL=2;BYDAY=TH", False),
+    ("team sync weekly at 10", "2026-10-16", "10:00 team sync", "FREQ=WEEKLY", False),
+    ("rent monthly", "2026-10-16", "rent", "FREQ=MONTHLY", False),
+    ("budget review every 2 months", "2026-10-16", "budget review", "FREQ=MONTHLY;INTERVAL=2", False),
+    ("weekly report", None, "weekly report", None, False),
+    # "until" with a date ends the series, with a time it ends the meeting.
+    ("piano every tuesday until 2026-12-01", "2026-10-20", "piano", "FREQ=WEEKLY;BYDAY=TU;UNTIL=20261201", False),
+    ("yoga every monday 6-7pm until dec 1", "2026-10-19", "18:00-19:00 yoga", "FREQ=WEEKLY;BYDAY=MO;UNTIL=20261201", False),
+    ("yoga every monday 6 until 7pm", "2026-10-19", "18:00-19:00 yoga", "FREQ=WEEKLY;BYDAY=MO", False),
+    ("class every day for 3 weeks", "2026-10-16", "class", "FREQ=DAILY;UNTIL=20261105", False),
+    ("pills every day 5 times", "2026-10-16", "pills", "FREQ=DAILY;COUNT=5", False),
+    # Left for the LLM
+    ("dinner saturday evening", "2026-10-17", "dinner evening", None, True),
+    ("yoga every monday until 5pm", "2026-10-19", "17:00 yoga", "FREQ=WEEKLY;BYDAY=MO", True),
+    ("run for 30 minutes tomorrow", "2026-10-17", "run", None, True),
+    ("walk through design tomorrow", "2026-10-17", "walk through design", None, False),
+])
+def test_parse(text, key, event, rrule, ambiguous):
+    parsed = parse(text, friday)
+    assert parsed.date == key
+    assert str(parsed.event) == event
+    assert (str(parsed.event.rrule) if parsed.event.rrule else None) == rrule
+    assert parsed.ambiguous == ambiguous
+
+
+@pytest.mark.parametrize("text", ["3pm", "tomorrow at 9", "every monday"])
+def test_nothing_but_a_date_or_time(text):
+    assert parse(text, friday) is None
+
+
+@pytest.mark.parametrize("text, event", [
+    ("add dentist tomorrow at 3", "dentist tomorrow at 3"),
+    ("please schedule lunch friday to my calendar", "lunch friday"),
+    ("remind me to call mom", "call mom"),
+    ("what's on tomorrow", None),
+])
+def test_event_command(text, event):
+    assert event_command(text) == event
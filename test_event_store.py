@@ -0,0 +1,128 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from event_model import Event
+from event_store import JsonEventStore
+from retrieval import EventRetriever
+from sqlite_store import SqliteEventStore
+
+weekly = Event("Standup", rrule="FREQ=WEEKLY")
+
+
+@pytest.fixture(params=[JsonEventStore, SqliteEventStore], ids=["json", "sqlite"])
+def store(request, tmp_path):
+    store = request.param(str(tmp_path / ("events.json" if request.param is JsonEventStore else "events.db")))
+    yield store
+    if not getattr(store, "reopened", False):
+        store.close()
+
+
+def reopen(store):
+    store.close()
+    store.reopened = True
+    return type(store)(store.path)
+
+
+def days(store, year, month):
+    return [key for key, _ in store.month(year, month)]
+
+
+def test_removing_the_first_occurrence_keeps_the_series(store):
+    store.add("2026-10-19", weekly)
+    assert store.remove("2026-10-19", weekly)
+    assert days(store, 2026, 10) == ["2026-10-26"]
+    assert len(days(store, 2026, 11)) == 5
+    store = reopen(store)
+    assert days(store, 2026, 10) == ["2026-10-26"]
+    store.close()
+
+
+def test_removing_a_later_occurrence(store):
+    store.add("2026-10-19", weekly)
+    assert store.remove("2026-10-26", str(weekly))
+    assert days(store, 2026, 10) == ["2026-10-19"]
+    assert store.records("2026-10-19")[0].exdates == {"2026-10-26"}
+
+
+def test_remove_series(store):
+    store.add("2026-10-19", weekly)
+    store.add("2026-10-26", "Dentist")
+    assert not store.remove_series("2026-10-26", "Dentist")
+    assert store.remove_series("2026-11-02", weekly)
+    assert days(store, 2026, 10) == ["2026-10-26"]
+    assert days(store, 2026, 11) == []
+    store = reopen(store)
+    assert days(store, 2026, 11) == []
+    store.close()
+
+
+def test_removing_a_one_off_event(store):
+    store.add("2026-10-19", "Dentist")
+    store.add("2026-10-19", weekly)
+    assert store.remove("2026-10-19", "Dentist")
+    assert store.get("2026-10-19") == [weekly]
+    assert not store.remove("2026-10-19", "Dentist")
+
+
+def test_export_is_a_snapshot_while_changes_go_on(store):
+    store.add_many([(f"2026-10-{day:02}", Event(f"event {day}")) for day in range(1, 29)])
+    pairs = store.iter_events()
+    first = next(pairs)
+    store.add("2026-10-30", Event("late"))
+    store.remove("2026-10-28", Event("event 28"))
+    rest = list(pairs)
+    assert [first[0]] + [key for key, _ in rest] == [f"2026-10-{day:02}" for day in range(1, 29)]
+
+
+def test_keyword_search_follows_changes(store):
+    retriever = EventRetriever(store, embed_model=None)
+    store.add_many([("2026-10-20", Event("dentist checkup")), ("2026-10-21", Event("team lunch"))])
+    series = Event("Dentist", rrule="FREQ=WEEKLY")
+    store.add("2026-10-19", series)
+    assert retriever.search("dentist") == [("2026-10-19", series), ("2026-10-20", Event("dentist checkup"))]
+    store.remove("2026-10-20", Event("dentist checkup"))
+    store.remove_series("2026-10-19", series)
+    assert retriever.search("dentist") == []
+    assert retriever.search("team lunch") == [("2026-10-21", Event("team lunch"))]
+
+
+def test_sqlite_keyword_lookups_do_not_load_the_calendar(tmp_path):
+    path = str(tmp_path / "events.db")
+    db = sqlite3.connect(path)
+    # A database from before the word index.
+    db.execute(
+        "CREATE TABLE events (id INTEGER PRIMARY KEY, date TEXT NOT NULL, event TEXT NOT NULL,"
+        " recurring INTEGER NOT NULL DEFAULT 0)"
+    )
+    db.execute("INSERT INTO events (date, event) VALUES ('2026-10-20', '15:00 dentist')")
+    db.commit()
+    db.close()
+    store = SqliteEventStore(path)
+    store.iter_events = None
+    retriever = EventRetriever(store, embed_model=None)
+    assert retriever.search("dentist") == [("2026-10-20", Event.from_text("15:00 dentist"))]
+    lines, _ = retriever.select("when is the dentist?", today=date(2026, 10, 16))
+    assert lines == ["2026-10-20: 15:00 dentist"]
+    store.close()
+
+
+def test_sqlite_series_without_its_row_is_left_alone(tmp_path):
+    store = SqliteEventStore(str(tmp_path / "events.db"))
+    store.add("2026-10-19", weekly)
+    with store._db:
+        store._db.execute("DELETE FROM events")
+    assert not store.remove("2026-10-26", weekly)
+    assert not store.remove_series("2026-10-26", weekly)
+    assert store.series == [("2026-10-19", weekly)]
+    store.close()
+
+
+def test_sqlite_only_series_are_stored_as_recurring(tmp_path):
+    store = SqliteEventStore(str(tmp_path / "events.db"))
+    store.add("2026-10-19", Event("Dentist", exdates={"2026-10-19"}))
+    assert store._db.execute("SELECT event, recurring FROM events").fetchall() == [("Dentist", 0)]
+    assert store.series == []
+    assert store.get("2026-10-19") == [Event("Dentist")]
+    store.close()
@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+from event_model import Recurrence
+from ics import parse_rule, read_events
+
+
+def feed(*events):
+    lines = ["BEGIN:VCALENDAR"]
+    for dtstart, rrule in events:
+        lines += ["BEGIN:VEVENT", f"DTSTART;VALUE=DATE:{dtstart}", "SUMMARY:Series"]
+        lines += [f"RRULE:{rrule}"] if rrule else []
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return [line + "\r\n" for line in lines]
+
+
+@pytest.mark.parametrize("rrule, start, expected", [
+    ("FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR", date(2026, 10, 16), "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR"),
+    ("FREQ=MONTHLY;BYDAY=2TU", date(2026, 10, 13), "FREQ=MONTHLY;BYDAY=2TU"),
+    ("FREQ=MONTHLY;BYDAY=TU;BYSETPOS=2", date(2026, 10, 13), "FREQ=MONTHLY;BYDAY=2TU"),
+    ("FREQ=MONTHLY;BYDAY=FR;BYSETPOS=-1", date(2026, 10, 30), "FREQ=MONTHLY;BYDAY=-1FR"),
+    ("FREQ=MONTHLY;BYMONTHDAY=15", date(2026, 10, 15), "FREQ=MONTHLY"),
+    ("FREQ=YEARLY;BYMONTHDAY=19;BYMONTH=10", date(2026, 10, 19), "FREQ=YEARLY"),
+])
+def test_parse_rule(rrule, start, expected):
+    assert parse_rule(rrule, start) == Recurrence.parse(expected)
+
+
+@pytest.mark.parametrize("rrule, start", [
+    ("FREQ=MONTHLY;BYMONTHDAY=1,15", date(2026, 10, 15)),
+    ("FREQ=YEARLY;BYMONTH=11;BYDAY=4TH", date(2026, 11, 26)),
+    ("FREQ=MONTHLY;BYDAY=MO,TU;BYSETPOS=1", date(2026, 11, 2)),
+])
+def test_parse_rule_rejects(rrule, start):
+    with pytest.raises(ValueError):
+        parse_rule(rrule, start)
+
+
+def test_unsupported_rules_import_as_one_occurrence():
+    stats = {}
+    pairs = list(read_events(feed(("20261126", "FREQ=YEARLY;BYMONTH=11;BYDAY=4TH"), ("20261013", "FREQ=MONTHLY;BYDAY=2TU")), stats))
+    assert [(key, event.rrule) for key, event in pairs] == [
+        ("2026-11-26", None), ("2026-10-13", Recurrence("MONTHLY", nth=[(2, 1)])),
+    ]
+    assert stats["unsupported_rules"] == 1
+
+
+def test_skipped_events_are_reported_in_stats(capsys):
+    stats = {}
+    lines = feed(("20261013", None))
+    lines[-1:-1] = ["BEGIN:VEVENT\r\n", "SUMMARY:Broken\r\n", "DTSTART:not-a-date\r\n", "END:VEVENT\r\n"]
+    assert len(list(read_events(lines, stats))) == 1
+    assert stats["skipped"] == 1
+    assert stats["errors"][0].startswith("Broken: ")
+    assert capsys.readouterr().out == ""
+
+
+def test_a_malformed_line_skips_only_itself():
+    stats = {}
+    lines = feed(("20261013", None), ("20261014", None))
+    lines.insert(len(lines) // 2, "garbage line\r\n")
+    assert [key for key, _ in read_events(lines, stats)] == ["2026-10-13", "2026-10-14"]
+    assert stats["skipped"] == 1
+    assert stats["errors"] == ["malformed line 'garbage line'"]
@@ -0,0 +1,94 @@
+import gc
+import threading
+import time
+
+import pytest
+
+from llm_dispatcher import BACKGROUND, INTERACTIVE, PARSE, LLMDispatcher
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+
+
+@pytest.fixture
+def mock():
+    with MockOllama(first_token_ms=100, token_ms=2, tokens=5) as mock:
+        yield mock
+
+
+@pytest.fixture
+def dispatcher(mock):
+    return LLMDispatcher(OllamaClient(mock.host))
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def settle(dispatcher):
+    # Wait until the worker has drained the queue.
+    dispatcher.chat("m", ask("settle"), priority=BACKGROUND + 1)
+
+
+def test_identical_streams_share_one_generation(dispatcher, mock):
+    answers = []
+    threads = [
+        threading.Thread(target=lambda: answers.append([c["message"]["content"] for c in dispatcher.chat("m", ask("hi"), stream=True)]))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mock.requests == 1
+    assert answers[0] == answers[1] == answers[2] and len(answers[0]) == 6
+
+
+@pytest.mark.parametrize("drop", ["close", "gc"])
+def test_stream_dropped_before_its_first_chunk_is_not_generated(dispatcher, mock, drop):
+    blocker = threading.Thread(target=lambda: dispatcher.chat("m", ask("busy")))
+    blocker.start()
+    time.sleep(0.02)
+    stream = dispatcher.chat("m", ask("never read"), stream=True)
+    if drop == "close":
+        stream.close()
+    else:
+        del stream
+        gc.collect()
+    blocker.join()
+    settle(dispatcher)
+    assert mock.requests == 2
+
+
+def test_priorities(dispatcher):
+    order = []
+    blocker = threading.Thread(target=lambda: dispatcher.chat("m", ask("busy")))
+    blocker.start()
+    time.sleep(0.02)
+
+    def job(name, priority):
+        dispatcher.chat("m", ask(name), priority=priority)
+        order.append(name)
+
+    threads = []
+    for name, priority in (("background", BACKGROUND), ("parse", PARSE), ("interactive", INTERACTIVE)):
+        threads.append(threading.Thread(target=job, args=(name, priority)))
+        threads[-1].start()
+        time.sleep(0.02)
+    for thread in [blocker] + threads:
+        thread.join()
+    assert order == ["interactive", "parse", "background"]
+
+
+def test_submit_does_not_wait(dispatcher):
+    started = time.perf_counter()
+    reply = dispatcher.submit("m", ask("later"))
+    assert time.perf_counter() - started < 0.05 and not reply.done
+    assert reply.result()["done"]
+
+
+def test_closing_a_stream_from_another_thread_ends_the_wait_for_its_first_chunk(dispatcher):
+    stream = dispatcher.chat("m", ask("slow"), stream=True)
+    threading.Timer(0.02, stream.close).start()
+    started = time.perf_counter()
+    assert list(stream) == []
+    assert time.perf_counter() - started < 0.08
@@ -0,0 +1,30 @@
+import threading
+import time
+
+from ollama_client import HealthMonitor
+
+
+class SlowClient:
+    # The second ping blocks until ``release`` is set.
+    def __init__(self):
+        self.pings = 0
+        self.release = threading.Event()
+
+    def ping(self):
+        self.pings += 1
+        if self.pings == 2:
+            self.release.wait()
+        return True
+
+
+def test_check_now_during_a_ping_is_not_lost():
+    client = SlowClient()
+    monitor = HealthMonitor(client, interval=30).start()
+    assert monitor.is_running(wait=1)
+    monitor.check_now()
+    time.sleep(0.1)
+    monitor.check_now()
+    client.release.set()
+    time.sleep(0.2)
+    monitor.stop()
+    assert client.pings == 3
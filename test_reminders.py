@@ -0,0 +1,43 @@
+from datetime import date, datetime, time, timedelta
+
+from event_model import Event
+from event_store import JsonEventStore
+from reminders import ReminderScheduler
+
+
+def test_an_event_removed_and_added_again_reminds_again(tmp_path):
+    store = JsonEventStore(str(tmp_path / "events.json"))
+    reminders = ReminderScheduler(store, path=str(tmp_path / "delivered.json"))
+    later = datetime.combine(date.today() + timedelta(days=1), time(23, 59))
+    key = later.date().isoformat()
+    event = Event("dentist")
+    store.add(key, event)
+    assert reminders.pop_due(later) == [(key, event)]
+    assert reminders.pop_due(later) == []
+
+    store.remove(key, event)
+    store.add(key, event)
+    assert reminders.pop_due(later) == [(key, event)]
+
+    # Forgetting survives a restart.
+    reminders.close()
+    store.remove(key, event)
+    reminders = ReminderScheduler(store, path=str(tmp_path / "delivered.json"))
+    store.add(key, event)
+    assert reminders.pop_due(later) == [(key, event)]
+    reminders.close()
+    store.close()
+
+
+def test_identical_events_on_one_day_each_remind(tmp_path):
+    store = JsonEventStore(str(tmp_path / "events.json"))
+    reminders = ReminderScheduler(store, path=str(tmp_path / "delivered.json"))
+    later = datetime.combine(date.today() + timedelta(days=1), time(23, 59))
+    key = later.date().isoformat()
+    store.add(key, Event("standup"))
+    assert reminders.pop_due(later) == [(key, Event("standup"))]
+    store.add(key, Event("standup"))
+    assert reminders.pop_due(later) == [(key, Event("standup"))]
+    assert reminders.pop_due(later) == []
+    reminders.close()
+    store.close()
@@ -0,0 +1,73 @@
+from datetime import date
+
+import pytest
+
+import calendar_engine
+from calendar_engine import CalendarEngine
+from event_model import Event
+from event_store import JsonEventStore
+from llm_dispatcher import LLMDispatcher
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+from response_cache import ResponseCache
+from retrieval import EventRetriever
+
+friday = date(2026, 10, 16)
+
+
+@pytest.fixture(params=["memory", "disk"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return ResponseCache(path=None)
+    # A tiny memory tier, so gets are answered from SQLite.
+    return ResponseCache(path=str(tmp_path / "responses.db"), max_memory=0)
+
+
+def ask(text):
+    return [{"role": "user", "content": text}]
+
+
+def test_invalidate_drops_replies_depending_on_a_date(cache):
+    cache.put("m", ask("a"), "A", {"2026-10-17"})
+    cache.put("m", ask("b"), "B", {"2026-10-18"})
+    cache.invalidate(["2026-10-17"])
+    assert cache.get("m", ask("a")) is None
+    assert cache.get("m", ask("b")) == "B"
+
+
+def test_invalidate_none_drops_everything(cache):
+    cache.put("m", ask("a"), "A", {"2026-10-17"})
+    cache.put("m", ask("b"), "B")
+    cache.invalidate(None)
+    assert cache.get("m", ask("a")) is None
+    assert cache.get("m", ask("b")) is None
+
+
+def test_replies_without_dates_are_dropped_by_any_change(cache):
+    cache.put("m", ask("b"), "B")
+    cache.invalidate(["2026-12-01"])
+    assert cache.get("m", ask("b")) is None
+
+
+def test_answers_depend_on_the_days_asked_about(tmp_path):
+    store = JsonEventStore(str(tmp_path / "events.json"))
+    store.add("2026-10-20", Event("dentist"))
+    retriever = EventRetriever(store, embed_model=None)
+    lines, dates = retriever.select("am I free tomorrow?", today=friday)
+    assert lines == [] and dates == {"2026-10-17"}
+    lines, dates = retriever.select("what's on next week?", today=friday)
+    assert "2026-10-20" in dates and "2026-10-25" in dates
+    store.close()
+
+
+def test_a_question_asked_again_in_a_session_is_a_hit(tmp_path, monkeypatch):
+    with MockOllama(first_token_ms=10, token_ms=1, tokens=3) as mock:
+        monkeypatch.setattr(calendar_engine, "get_response_cache", lambda: ResponseCache(path=None))
+        monkeypatch.setattr(calendar_engine, "get_dispatcher", lambda: LLMDispatcher(OllamaClient(mock.host)))
+        engine = CalendarEngine(store=JsonEventStore(str(tmp_path / "events.json")))
+        first = list(engine.ask("what do I have today?", "m"))
+        second = list(engine.ask("what do I have today?", "m"))
+        engine.close()
+    assert [kind for kind, _ in first] == ["token"] * 3
+    assert second == [("cached", "".join(text for _, text in first))]
+    assert mock.requests == 1
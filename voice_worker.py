@@ -0,0 +1,88 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from feature_loader import FeatureError, features
+from speech import ContinuousListener, MicrophoneSource, SpeechError, WavSource, listen
+
+
+class VoiceWorker(QThread):
+    """Transcribes one utterance off the GUI thread.
+
+    Audio comes from the microphone, or from ``wav_path`` when given.  The
+    text recognized so far is sent through ``partial_result`` while the user
+    is still speaking; ``stop()`` ends the utterance early.  Errors arrive on
+    ``recognition_failed`` rather than as text, so they are never sent on to
+    the assistant.
+    """
+
+    partial_result = pyqtSignal(str)
+    recognition_complete = pyqtSignal(str)
+    recognition_failed = pyqtSignal(str)
+    latency_measured = pyqtSignal(float)
+
+    def __init__(self, wav_path=None, parent=None):
+        super().__init__(parent)
+        self.wav_path = wav_path
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        try:
+            recognizer = features.get("voice")
+        except FeatureError as e:
+            self.recognition_failed.emit(f"⚠️ Speech recognition is not available: {e}")
+            return
+        try:
+            if self.wav_path:
+                source = WavSource(self.wav_path)
+            else:
+                source = MicrophoneSource(stop=lambda: self._stopped)
+            transcript = listen(recognizer, source, self.partial_result.emit)
+        except SpeechError as e:
+            self.recognition_failed.emit(str(e))
+            return
+        except Exception as e:
+            self.recognition_failed.emit(f"⚠️ Speech recognition failed: {e}")
+            return
+        if not transcript.text:
+            self.recognition_failed.emit("🤔 Could not understand the audio.")
+            return
+        self.latency_measured.emit(transcript.latency)
+        self.recognition_complete.emit(transcript.text)
+
+
+class ContinuousVoiceWorker(QThread):
+    """Always-on listening: keeps one microphone stream open until ``stop()``
+    and reports each recognized speech segment as it finishes."""
+
+    partial_result = pyqtSignal(str)
+    recognition_complete = pyqtSignal(str)
+    recognition_failed = pyqtSignal(str)
+    latency_measured = pyqtSignal(float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._listener = None
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        if self._listener is not None:
+            self._listener.stop()
+
+    def run(self):
+        try:
+            recognizer = features.get("voice")
+        except FeatureError as e:
+            self.recognition_failed.emit(f"⚠️ Speech recognition is not available: {e}")
+            return
+        self._listener = ContinuousListener(
+            recognizer, self._finish, self.partial_result.emit, self.recognition_failed.emit
+        )
+        if not self._stopped:
+            self._listener.run()
+
+    def _finish(self, transcript):
+        self.latency_measured.emit(transcript.latency)
+        self.recognition_complete.emit(transcript.text)